@@ -0,0 +1,313 @@
+"""
+Marshall Triangle Adaptive-Resolution Rendering
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+
+Usage (verify against the full-resolution reference):
+    python adaptive_render.py
+    python adaptive_render.py --size 2000 --trials 20 --factor 8 --tolerance 2
+"""
+
+import argparse
+import functools
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import scipy.sparse
+from PIL import Image, ImageFilter
+from scipy import ndimage
+
+import metrics
+from harmony_index import HarmonyIndex, triangle_geometry
+from render_spec import RenderSpec
+
+# Coarse samples are this many pixels apart by default
+DEFAULT_FACTOR = 8
+# Largest accepted difference from the full-resolution render before blur, in 8-bit levels
+DEFAULT_TOLERANCE = 2
+# A cell is evaluated exactly when a switching quantity is within this share of its variation
+# across the cell's stencil of zero (0 catches only sign changes at nodes, which misses curves
+# that clip a cell; 0.5 held every pixel within tolerance over 760 random specs)
+SWITCH_MARGIN = 0.5
+
+
+@dataclass(frozen=True)
+class AdaptiveStats:
+    """
+    What an adaptive render evaluated.
+
+    Attributes:
+    -----------
+    size : int
+        Edge length of the rendering
+    factor : int
+        Pixels between coarse samples
+    coarse_points : int
+        Colour model evaluations on the coarse grid
+    check_points : int
+        Evaluations at cell centres used to verify interpolated cells
+    exact_pixels : int
+        Pixels evaluated at full resolution (cells that are not smooth or failed their check)
+    exact_cells : int
+        Coarse cells evaluated at full resolution
+    cells : int
+        Coarse cells that overlap the triangle
+    seconds : float
+        Wall time
+    """
+    size: int
+    factor: int
+    coarse_points: int
+    check_points: int
+    exact_pixels: int
+    exact_cells: int
+    cells: int
+    seconds: float
+
+    @property
+    def evaluated_fraction(self) -> float:
+        """Colour model evaluations as a fraction of a full-resolution render's pixels."""
+        return (self.coarse_points + self.check_points + self.exact_pixels) / (self.size * self.size)
+
+
+@functools.lru_cache(maxsize=8)
+def _interpolation_matrix(size: int, factor: int, nodes: int) -> scipy.sparse.csr_matrix:
+    # (size x nodes) Catmull-Rom weights; pixel i sits at node coordinate i / factor
+    position = np.arange(size) / factor
+    base = np.floor(position).astype(np.int64)
+    t = position - base
+    weights = ((-t**3 + 2 * t**2 - t) / 2, (3 * t**3 - 5 * t**2 + 2) / 2,
+               (-3 * t**3 + 4 * t**2 + t) / 2, (t**3 - t**2) / 2)
+    rows = np.tile(np.arange(size), 4)
+    cols = np.concatenate([np.clip(base + offset, 0, nodes - 1) for offset in (-1, 0, 1, 2)])
+    return scipy.sparse.csr_matrix((np.concatenate(weights).astype(np.float32), (rows, cols)), shape=(size, nodes))
+
+
+def _unclipped_colors(harmony: HarmonyIndex, x, y, state, falloff_type) -> Tuple[np.ndarray, np.ndarray]:
+    # Unmasked (the full-resolution mask cuts the edges exactly) and before clipping
+    return harmony._unclipped_colors(x, y, harmony._state_weights(state), falloff_type)
+
+
+def _normalized_colors(harmony: HarmonyIndex, x, y, state, falloff_type) -> np.ndarray:
+    return np.clip(_unclipped_colors(harmony, x, y, state, falloff_type)[0], 0, 1)
+
+
+def _quantize(colors: np.ndarray) -> np.ndarray:
+    return (colors * 255).astype(np.uint8)
+
+
+def render_adaptive_array(spec: RenderSpec, factor: int = DEFAULT_FACTOR,
+                          tolerance: float = DEFAULT_TOLERANCE) -> Tuple[np.ndarray, AdaptiveStats]:
+    """
+    Render to a (size, size, 3) uint8 array, before blur, evaluating the model mostly on a coarse grid.
+
+    The normalized colour is sampled every factor pixels and upsampled with
+    separable Catmull-Rom interpolation (two sparse matrix products). It is
+    smooth except where normalization switches: the dominant channel
+    changes, a channel clips at 1, or the peak crosses the 0.1 threshold
+    below which colours are left unnormalized. Coarse cells whose
+    interpolation stencil spans such a switch are evaluated exactly at full
+    resolution, a band whose area grows with the length of those curves, not
+    with the triangle's area. Every other cell that overlaps the triangle is
+    checked at its centre, where interpolation error peaks, and evaluated
+    exactly if it is off by more than tolerance. The triangle mask is
+    applied at full resolution, so the edges are exact.
+
+    Parameters:
+    -----------
+    spec : RenderSpec
+        The rendering specification
+    factor : int
+        Pixels between coarse samples (1 evaluates every pixel)
+    tolerance : float
+        Largest interpolation error accepted at a cell's check point, in 8-bit levels
+
+    Returns:
+    --------
+    Tuple[np.ndarray, AdaptiveStats]
+        The pixels and what was evaluated
+    """
+    start = time.perf_counter()
+    harmony = HarmonyIndex.from_spec(spec)
+    size, state, falloff_type = spec.size, spec.harmony_state, spec.falloff_type
+    factor = max(1, min(int(factor), size - 1))
+    step = 2.0 / (size - 1)
+    # Cell j holds pixels j * factor .. j * factor + factor - 1; its nodes run past the last pixel
+    cells_per_side = -(-size // factor)
+    nodes = -(-(size - 1) // factor) + 1
+
+    # Coarse nodes coincide with pixels (node j is pixel j * factor), in image orientation
+    node_coords = np.arange(nodes) * factor * step
+    xg, yg = np.meshgrid(-1 + node_coords, 1 - node_coords)
+    unclipped, peak = _unclipped_colors(harmony, xg, yg, state, falloff_type)
+    coarse = np.clip(unclipped, 0, 1)
+
+    # Where normalization switches between nodes, interpolation across them is not trustworthy:
+    # the dominant channel, whether the peak is over the 0.1 threshold, and which channels clip
+    regime = unclipped.argmax(axis=-1) * 16 + (peak > 0.1) * 8 + (unclipped > 1.0) @ np.array([4, 2, 1])
+    # Cell (j, k) interpolates from nodes j-1..j+2 and k-1..k+2
+    footprint = np.ones((4, 4), dtype=bool)
+
+    def stencil_range(values):
+        return (ndimage.minimum_filter(values, footprint=footprint, origin=(-1, -1), mode='nearest'),
+                ndimage.maximum_filter(values, footprint=footprint, origin=(-1, -1), mode='nearest'))
+
+    low, high = stencil_range(regime)
+    varies = low != high
+    # A switch curve can also clip a cell without separating its nodes: treat a cell as switching
+    # when a quantity that switches at zero comes near it for its variation across the stencil
+    # (the peak at the threshold and at 1, a tie for the top channel, the runner-up clipping at 1)
+    ranked = np.sort(unclipped, axis=-1)
+    for switch in (peak - 0.1, peak - 1.0, ranked[..., 2] - ranked[..., 1], ranked[..., 1] - 1.0):
+        low, high = stencil_range(switch)
+        varies |= np.minimum(np.abs(low), np.abs(high)) <= SWITCH_MARGIN * (high - low)
+    exact_cells = varies[:cells_per_side, :cells_per_side]
+
+    # Cells that overlap the triangle
+    mask = triangle_geometry(size).mask
+    padded = np.zeros((cells_per_side * factor, cells_per_side * factor), dtype=bool)
+    padded[:size, :size] = mask
+    overlaps = padded.reshape(cells_per_side, factor, cells_per_side, factor).any(axis=(1, 3))
+    exact_cells &= overlaps
+
+    matrix = _interpolation_matrix(size, factor, nodes)
+    coarse32 = coarse.astype(np.float32)
+    interpolated = np.empty((size, size, 3), dtype=np.float32)
+    for channel in range(3):
+        interpolated[..., channel] = (matrix @ (matrix @ coarse32[..., channel]).T).T
+
+    # Check interpolated cells at their centres
+    check = overlaps & ~exact_cells
+    centre = min(factor // 2, size - 1)
+    rows, cols = np.nonzero(check)
+    pixel_rows = np.minimum(rows * factor + centre, size - 1)
+    pixel_cols = np.minimum(cols * factor + centre, size - 1)
+    exact_at_check = _normalized_colors(harmony, -1 + pixel_cols * step, 1 - pixel_rows * step, state, falloff_type)
+    # Compared before quantization, with a level of margin for rounding either side
+    error = np.abs(exact_at_check - np.clip(interpolated[pixel_rows, pixel_cols], 0, 1)).max(axis=-1) * 255
+    failed = error > tolerance - 1
+    exact_cells[rows[failed], cols[failed]] = True
+
+    pixels = _quantize(np.clip(interpolated, 0, 1))
+    del interpolated
+
+    # Full-resolution evaluation of the exact cells
+    cell_rows, cell_cols = np.nonzero(exact_cells)
+    offsets = np.arange(factor)
+    pixel_rows = (cell_rows[:, None, None] * factor + offsets[None, :, None]).repeat(factor, axis=2).ravel()
+    pixel_cols = (cell_cols[:, None, None] * factor + offsets[None, None, :]).repeat(factor, axis=1).ravel()
+    inside = (pixel_rows < size) & (pixel_cols < size)
+    pixel_rows, pixel_cols = pixel_rows[inside], pixel_cols[inside]
+    pixels[pixel_rows, pixel_cols] = _quantize(
+        _normalized_colors(harmony, -1 + pixel_cols * step, 1 - pixel_rows * step, state, falloff_type))
+
+    pixels[~mask] = 0
+    stats = AdaptiveStats(size=size, factor=factor, coarse_points=nodes * nodes, check_points=len(rows),
+                          exact_pixels=len(pixel_rows), exact_cells=len(cell_rows), cells=int(overlaps.sum()),
+                          seconds=time.perf_counter() - start)
+    return pixels, stats
+
+
+def render_adaptive(spec: RenderSpec, factor: int = DEFAULT_FACTOR,
+                    tolerance: float = DEFAULT_TOLERANCE) -> Tuple[Image.Image, AdaptiveStats]:
+    """
+    Render a spec adaptively (see render_adaptive_array), then blur as HarmonyIndex.render does.
+
+    Returns:
+    --------
+    Tuple[PIL.Image.Image, AdaptiveStats]
+        The rendering and what was evaluated
+    """
+    start = time.perf_counter()
+    pixels, stats = render_adaptive_array(spec, factor, tolerance)
+    img = Image.fromarray(pixels).filter(ImageFilter.GaussianBlur(radius=spec.edge_blur))
+    metrics.observe_render(time.perf_counter() - start, spec.size, spec.falloff_type, 'adaptive')
+    return img, stats
+
+
+@dataclass(frozen=True)
+class Verification:
+    """Difference between an adaptive render and the full-resolution reference, before blur."""
+    max_error: int
+    mean_error: float
+    pixels_over_tolerance: int
+    adaptive_seconds: float
+    reference_seconds: float
+    stats: AdaptiveStats
+
+    @property
+    def speedup(self) -> float:
+        return self.reference_seconds / max(self.adaptive_seconds, 1e-9)
+
+
+def verify(spec: RenderSpec, factor: int = DEFAULT_FACTOR, tolerance: float = DEFAULT_TOLERANCE,
+           reference: Optional[np.ndarray] = None) -> Verification:
+    """
+    Compare render_adaptive_array with the full-resolution render of the same spec.
+
+    The reference is the matrix engine's unblurred array, which matches the
+    per-pixel loop exactly; pass reference to reuse one.
+    """
+    from source_engine import SourceEngine
+
+    reference_start = time.perf_counter()
+    if reference is None:
+        harmony = HarmonyIndex.from_spec(spec)
+        reference = SourceEngine.marshall_triangle(harmony, spec.falloff_type).render_array(
+            spec.harmony_state, harmony.calibrated_white_point)
+    reference_seconds = time.perf_counter() - reference_start
+
+    pixels, stats = render_adaptive_array(spec, factor, tolerance)
+    error = np.abs(pixels.astype(np.int16) - reference.astype(np.int16)).max(axis=-1)
+    return Verification(max_error=int(error.max()), mean_error=float(error.mean()),
+                        pixels_over_tolerance=int((error > tolerance).sum()), adaptive_seconds=stats.seconds,
+                        reference_seconds=reference_seconds, stats=stats)
+
+
+def random_spec(rng: np.random.Generator, size: int) -> RenderSpec:
+    """A spec drawn across the ranges the app's sliders allow."""
+    return RenderSpec(size=size, sigma=float(rng.uniform(0.1, 0.6)), intensity=float(rng.uniform(0.5, 2.0)),
+                      edge_blur=float(rng.uniform(0.0, 2.0)), edge_factor=float(rng.uniform(0.0, 1.0)),
+                      falloff_type=str(rng.choice(['gaussian', 'inverse_square'])),
+                      state=tuple(rng.uniform(0.0, 1.0, 3)), calibration=tuple(rng.uniform(0.2, 1.0, 3)))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Verify adaptive-resolution renders against the full-resolution reference.")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--factor", type=int, default=DEFAULT_FACTOR)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    failures = 0
+    for trial in range(args.trials):
+        spec = random_spec(rng, args.size)
+        result = verify(spec, args.factor, args.tolerance)
+        failures += result.pixels_over_tolerance > 0
+        print(f"{spec.key} {spec.falloff_type:14} max {result.max_error:3d} mean {result.mean_error:.3f} "
+              f"over {result.pixels_over_tolerance:6d}  evaluated {result.stats.evaluated_fraction:6.1%}  "
+              f"{result.adaptive_seconds * 1000:6.0f} ms vs {result.reference_seconds * 1000:6.0f} ms "
+              f"({result.speedup:.1f}x)")
+    print(f"{args.trials - failures}/{args.trials} within {args.tolerance:g} levels")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Marshall Triangle Transition Animations
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from PIL import Image
+
+from harmony_index import FrameRenderer
+
+FORMATS = ('gif', 'apng', 'mp4')
+MIME_TYPES = {'gif': 'image/gif', 'apng': 'image/apng', 'mp4': 'video/mp4'}
+EXTENSIONS = {'gif': 'gif', 'apng': 'png', 'mp4': 'mp4'}
+
+_BALANCED = {'r': 1.0, 'g': 1.0, 'b': 1.0}
+# Sample frames are reduced to at most this edge length before the GIF palette is built from them
+PALETTE_SAMPLE_PX = 256
+
+
+@dataclass(frozen=True)
+class Keyframe:
+    """A state vector and white point calibration the animation passes through."""
+    state: Dict[str, float]
+    calibration: Dict[str, float]
+
+
+@dataclass(frozen=True)
+class AnimationStats:
+    """Throughput of a finished animation export."""
+    frames: int
+    seconds: float
+    nbytes: int
+    format: str
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+
+def ffmpeg_available() -> bool:
+    """Whether an ffmpeg binary is on PATH (it is provided by replit.nix in deployment)."""
+    return shutil.which('ffmpeg') is not None
+
+
+def keyframes_from_saved_states(saved_states: List[Dict]) -> List[Keyframe]:
+    """Build keyframes from saved Marshall states, in the order given."""
+    return [
+        Keyframe(state=dict(saved.get('target', _BALANCED)), calibration=dict(saved.get('calibration') or _BALANCED))
+        for saved in saved_states
+    ]
+
+
+def _smoothstep(t: float) -> float:
+    return t * t * (3 - 2 * t)
+
+
+def _lerp(a: Dict[str, float], b: Dict[str, float], t: float) -> Dict[str, float]:
+    return {key: a.get(key, 1.0) + (b.get(key, 1.0) - a.get(key, 1.0)) * t for key in ['r', 'g', 'b']}
+
+
+def interpolate_keyframes(keyframes: List[Keyframe], frames_per_transition: int, hold_frames: int = 0,
+                          easing: Callable[[float], float] = _smoothstep) -> Iterator[Keyframe]:
+    """
+    Yield the interpolated state and calibration for every frame of the animation.
+
+    Parameters:
+    -----------
+    keyframes : List[Keyframe]
+        The states to pass through, at least one
+    frames_per_transition : int
+        Number of frames between consecutive keyframes
+    hold_frames : int
+        Extra frames to hold on each keyframe
+    easing : Callable[[float], float]
+        Maps linear progress in [0, 1] to eased progress
+
+    Yields:
+    -------
+    Keyframe
+        The interpolated state for one frame
+    """
+    if not keyframes:
+        return
+    frames_per_transition = max(1, frames_per_transition)
+    for start, end in zip(keyframes, keyframes[1:]):
+        for _ in range(hold_frames):
+            yield start
+        for step in range(frames_per_transition):
+            t = easing(step / frames_per_transition)
+            yield Keyframe(state=_lerp(start.state, end.state, t), calibration=_lerp(start.calibration, end.calibration, t))
+    for _ in range(hold_frames + 1):
+        yield keyframes[-1]
+
+
+def render_transition(renderer: FrameRenderer, keyframes: List[Keyframe], frames_per_transition: int,
+                      hold_frames: int = 0, sigma_for_state: Optional[Callable[[Dict[str, float]], float]] = None) -> Iterator[Image.Image]:
+    """
+    Lazily render the frames of a transition between keyframes.
+
+    Parameters:
+    -----------
+    renderer : FrameRenderer
+        Shared-geometry renderer for the output size
+    keyframes, frames_per_transition, hold_frames
+        As for interpolate_keyframes
+    sigma_for_state : Callable, optional
+        Chooses sigma per frame from its state (e.g. adaptive sigma); defaults to the renderer's sigma
+
+    Yields:
+    -------
+    PIL.Image.Image
+        One rendered frame at a time
+    """
+    for frame in interpolate_keyframes(keyframes, frames_per_transition, hold_frames):
+        yield _render_keyframe(renderer, frame, sigma_for_state)
+
+
+def render_keyframes(renderer: FrameRenderer, keyframes: List[Keyframe],
+                     sigma_for_state: Optional[Callable[[Dict[str, float]], float]] = None) -> List[Image.Image]:
+    """Render each keyframe once, as render_transition does (e.g. for write_animation's GIF palette)."""
+    return [_render_keyframe(renderer, keyframe, sigma_for_state) for keyframe in keyframes]
+
+
+def _render_keyframe(renderer: FrameRenderer, keyframe: Keyframe,
+                     sigma_for_state: Optional[Callable[[Dict[str, float]], float]]) -> Image.Image:
+    sigma = sigma_for_state(keyframe.state) if sigma_for_state is not None else None
+    return renderer.render_frame(keyframe.state, calibration=keyframe.calibration, sigma=sigma)
+
+
+def gif_palette(images: Sequence[Image.Image]) -> Image.Image:
+    """One 256-colour palette for a GIF, from sample frames, as the 16x16 image ffmpeg's paletteuse reads."""
+    samples = []
+    for image in images:
+        sample = image.convert('RGB')
+        sample.thumbnail((PALETTE_SAMPLE_PX, PALETTE_SAMPLE_PX))
+        samples.append(sample)
+    if not samples:
+        raise ValueError("No frames to build a palette from")
+    sheet = Image.new('RGB', (sum(sample.width for sample in samples), max(sample.height for sample in samples)))
+    left = 0
+    for sample in samples:
+        sheet.paste(sample, (left, 0))
+        left += sample.width
+    colors = sheet.quantize(colors=256).getpalette()[:768]
+    return Image.frombytes('RGB', (16, 16), bytes(colors + [0] * (768 - len(colors))))
+
+
+def _ffmpeg_command(fmt: str, width: int, height: int, fps: int, path: str,
+                    palette_path: Optional[str] = None) -> List[str]:
+    command = ['ffmpeg', '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-']
+    if fmt == 'mp4':
+        # yuv420p needs even dimensions
+        command += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+                    '-movflags', '+faststart', '-f', 'mp4']
+    elif fmt == 'gif':
+        # A precomputed palette: palettegen in the same graph would hold every frame until the last
+        command += ['-i', palette_path, '-lavfi', '[0:v][1:v]paletteuse', '-loop', '0', '-f', 'gif']
+    else:
+        command += ['-plays', '0', '-f', 'apng']
+    return command + [path]
+
+
+def _write_with_ffmpeg(frames: Iterator[Image.Image], fmt: str, fps: int, path: str,
+                       palette: Optional[Sequence[Image.Image]] = None) -> int:
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("No frames to encode")
+    width, height = first.size
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        palette_path = None
+        if fmt == 'gif':
+            palette_path = os.path.join(tmp_dir, 'palette.png')
+            gif_palette(palette or [first]).save(palette_path)
+        process = subprocess.Popen(_ffmpeg_command(fmt, width, height, fps, path, palette_path),
+                                   stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        count = 0
+        try:
+            # Frames are piped one at a time, so memory stays at a single frame
+            for frame in _chain(first, frames):
+                process.stdin.write(frame.convert('RGB').tobytes())
+                count += 1
+        except BrokenPipeError:
+            # ffmpeg exited early; its exit status and stderr below say why
+            pass
+        except BaseException:
+            # A frame failed (or the run was stopped): don't leave ffmpeg running, waiting for input
+            process.kill()
+            process.wait()
+            process.stderr.close()
+            raise
+        finally:
+            with contextlib.suppress(BrokenPipeError):
+                process.stdin.close()
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+    return count
+
+
+def _write_with_pil(frames: Iterator[Image.Image], fmt: str, fps: int, output: BinaryIO) -> int:
+    # PIL needs every frame up front; GIF frames are palettized first to keep
+    # them at one byte per pixel
+    if fmt == 'gif':
+        collected = [frame.convert('RGB').quantize(colors=256) for frame in frames]
+    else:
+        collected = [frame.convert('RGB') for frame in frames]
+    if not collected:
+        raise ValueError("No frames to encode")
+    collected[0].save(output, format='GIF' if fmt == 'gif' else 'PNG', save_all=True,
+                      append_images=collected[1:], duration=int(round(1000 / fps)), loop=0)
+    return len(collected)
+
+
+def _chain(first: Image.Image, rest: Iterator[Image.Image]) -> Iterator[Image.Image]:
+    yield first
+    yield from rest
+
+
+def write_animation(frames: Iterable[Image.Image], output: Union[str, BinaryIO], fmt: str = 'gif',
+                    fps: int = 24, palette: Optional[Sequence[Image.Image]] = None) -> AnimationStats:
+    """
+    Stream frames into an animated GIF, APNG or MP4.
+
+    Frames are piped to an ffmpeg subprocess when ffmpeg is available, so only
+    one frame is held in memory at a time. A GIF then uses one palette for
+    every frame, built up front from palette (e.g. render_keyframes) or else
+    from the first frame. Without ffmpeg, GIF and APNG fall back to PIL,
+    which collects the frames first; MP4 requires ffmpeg.
+
+    Parameters:
+    -----------
+    frames : Iterable[PIL.Image.Image]
+        The frames, typically from render_transition
+    output : str or binary file-like
+        Destination path or writable binary stream
+    fmt : str
+        One of 'gif', 'apng' or 'mp4'
+    fps : int
+        Playback frame rate
+    palette : Sequence[PIL.Image.Image], optional
+        Frames whose colours the GIF palette covers; used by ffmpeg GIF output only
+
+    Returns:
+    --------
+    AnimationStats
+        Frame count, wall time (render and encode) and output size
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown animation format '{fmt}', expected one of {FORMATS}")
+    if fmt == 'mp4' and not ffmpeg_available():
+        raise RuntimeError("MP4 export requires ffmpeg")
+
+    start = time.perf_counter()
+    frames = iter(frames)
+
+    if ffmpeg_available():
+        if isinstance(output, str):
+            count = _write_with_ffmpeg(frames, fmt, fps, output, palette)
+            nbytes = os.path.getsize(output)
+        else:
+            # MP4 muxing needs a seekable file, so encode to a temporary path and copy
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, f"animation.{EXTENSIONS[fmt]}")
+                count = _write_with_ffmpeg(frames, fmt, fps, path, palette)
+                with open(path, 'rb') as f:
+                    shutil.copyfileobj(f, output)
+                nbytes = os.path.getsize(path)
+    else:
+        buf = io.BytesIO()
+        count = _write_with_pil(frames, fmt, fps, buf)
+        nbytes = buf.tell()
+        if isinstance(output, str):
+            with open(output, 'wb') as f:
+                f.write(buf.getvalue())
+        else:
+            output.write(buf.getvalue())
+
+    return AnimationStats(frames=count, seconds=time.perf_counter() - start, nbytes=nbytes, format=fmt)
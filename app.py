@@ -17,13 +17,57 @@ Repository: https://github.com/Paul-W-Marshall/marshall-triangle
 
 import streamlit as st
 import numpy as np
-from harmony_index import HarmonyIndex
-import matplotlib.pyplot as plt
+from harmony_index import HarmonyIndex, FrameRenderer
+from render_spec import RenderSpec
+from state_store import StateStore
+import thumbnails
+import animation
+import mesh_export
+import metrics
+import profiler
+import render_governor
+import render_pipeline  # backs the default 'pipeline' engine; loaded up front with the rest of the stack
+import similarity_index
+import single_flight
+import tile_server
+import warmup
+from image_output import EncodeOptions, EncodedImage, encode_image, PRESETS as ENCODE_PRESETS, DEFAULT_PRESET as DEFAULT_ENCODE_PRESET
 from PIL import Image
 import io
-import base64
+import os
 import time
-from typing import Dict, Optional, List, Any
+import functools
+import hmac
+import pickle
+import threading
+import uuid
+from typing import Dict, Optional, List, Any, Callable
+
+# Approximate content width (CSS px) of Streamlit's page layouts
+LAYOUT_CONTENT_WIDTH = {'centered': 704, 'wide': 1200}
+# Render on-screen images at this multiple of their CSS width so they stay sharp on HiDPI screens
+DISPLAY_PIXEL_RATIO = 2
+# Labelled diagram resolution: the 8 inch figure at 100 dpi per display pixel ratio
+LABELED_DPI = 100 * DISPLAY_PIXEL_RATIO
+# Share of the page width the unlabelled image column takes (st.columns([3, 2]))
+IMAGE_COLUMN_FRACTION = 3 / 5
+# Saved states and presets shown per gallery page
+GALLERY_PAGE_SIZE = 12
+# Matches listed by "Find Similar States"
+SIMILAR_STATES = 5
+# Engine for on-screen and export renders; all but 'adaptive' (within two levels of
+# the others) produce identical pixels, 'pipeline' reuses unchanged stages between
+# settings and 'reference' (the per-pixel loop) is kept for verification
+RENDER_ENGINE = os.environ.get('MARSHALL_RENDER_ENGINE', 'pipeline')
+# Seconds a session waits for another session's identical render or encode before giving up
+RENDER_WAIT = float(os.environ.get('MARSHALL_RENDER_WAIT', 120))
+RENDER_TIMEOUT_MESSAGE = "This rendering is taking longer than usual to finish. Rerun the app to check on it."
+# SVG export: colour tolerance in 8-bit levels, and blur (viewBox units of 1000) that hides facets
+VECTOR_TOLERANCE = 12.0
+VECTOR_SMOOTHING = 4.0
+# Deep zoom: edge length of the composed view, and the points it can centre on
+DEEP_ZOOM_VIEW_PX = 512
+DEEP_ZOOM_FOCI = ["White point", "Centroid", "Top vertex", "Bottom-left vertex", "Bottom-right vertex"]
 
 def custom_css():
     """Custom CSS for sliders and loading animation replacement"""
@@ -201,83 +245,379 @@ def set_calibration(calibration_data: Dict[str, float]) -> bool:
     st.session_state["calibration"] = calibration_data
     return True
 
-def get_marshall_states() -> List[Dict]:
-    """Get all Marshall states from session state (ephemeral)"""
-    if "marshall_states" not in st.session_state:
-        st.session_state["marshall_states"] = {}
-    return list(st.session_state["marshall_states"].values())
-
-def save_marshall_state(name: str, icon_params: Dict, r_target: float, g_target: float, b_target: float, thumbnail_base64: Optional[str] = None) -> bool:
-    """Save a Marshall state to session state with thumbnail (ephemeral)"""
-    if "marshall_states" not in st.session_state:
-        st.session_state["marshall_states"] = {}
-    
-    st.session_state["marshall_states"][name] = {
-        'name': name,
-        'icon_params': icon_params,
-        'target': {'r': r_target, 'g': g_target, 'b': b_target},
-        'thumbnail': thumbnail_base64
-    }
+@st.cache_resource(show_spinner=False)
+def get_state_store() -> StateStore:
+    """Process-wide SQLite store for saved states and presets (persists across restarts)"""
+    return StateStore()
+
+def get_owner() -> str:
+    """Identify whose saved states to show: an anonymous id kept in the page URL so it survives reloads"""
+    if "owner" not in st.session_state:
+        owner = st.query_params.get("owner")
+        if not owner:
+            owner = uuid.uuid4().hex
+            st.query_params["owner"] = owner
+        st.session_state["owner"] = owner
+    return st.session_state["owner"]
+
+def count_marshall_states() -> int:
+    """Count the saved Marshall states of the current owner"""
+    return get_state_store().count('marshall_states', get_owner())
+
+def get_marshall_states(limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+    """Get a page of Marshall states (metadata only, thumbnails are fetched lazily)"""
+    return get_state_store().list_states(get_owner(), limit=limit, offset=offset)
+
+def save_marshall_state(name: str, icon_params: Dict, r_target: float, g_target: float, b_target: float, thumbnail: Optional[bytes] = None, calibration: Optional[Dict[str, float]] = None) -> bool:
+    """Save a Marshall state and its white point calibration with PNG thumbnail bytes (persistent)"""
+    target = {'r': r_target, 'g': g_target, 'b': b_target}
+    get_state_store().save_state(
+        get_owner(),
+        name,
+        icon_params,
+        target,
+        calibration,
+        thumbnail
+    )
+    metrics.STORE_OPERATIONS.inc(operation='save', table='marshall_states')
+    get_similarity_index('marshall_states', get_owner()).insert(name, similarity_spec(icon_params, target, calibration))
     return True
 
 def delete_marshall_state(name: str) -> bool:
-    """Delete a Marshall state from session state (ephemeral)"""
-    if "marshall_states" in st.session_state and name in st.session_state["marshall_states"]:
-        del st.session_state["marshall_states"][name]
-        return True
-    return False
-
-def get_rendering_presets() -> List[Dict]:
-    """Get all rendering presets from session state (ephemeral)"""
-    if "rendering_presets" not in st.session_state:
-        st.session_state["rendering_presets"] = {}
-    return [{'name': name, 'data': data} for name, data in st.session_state["rendering_presets"].items()]
-
-def save_rendering_preset(name: str, params: Dict, thumbnail_base64: Optional[str] = None) -> bool:
-    """Save a rendering preset to session state with thumbnail (ephemeral)"""
-    if "rendering_presets" not in st.session_state:
-        st.session_state["rendering_presets"] = {}
-    
-    st.session_state["rendering_presets"][name] = {
-        'params': params,
-        'thumbnail': thumbnail_base64
-    }
+    """Delete a Marshall state (persistent)"""
+    metrics.STORE_OPERATIONS.inc(operation='delete', table='marshall_states')
+    get_similarity_index('marshall_states', get_owner()).delete(name)
+    return get_state_store().delete('marshall_states', get_owner(), name)
+
+def count_rendering_presets() -> int:
+    """Count the rendering presets of the current owner"""
+    return get_state_store().count('rendering_presets', get_owner())
+
+def get_rendering_presets(limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+    """Get a page of rendering presets (metadata only, thumbnails are fetched lazily)"""
+    return [
+        {'name': preset['name'], 'data': preset, 'updated_at': preset['updated_at']}
+        for preset in get_state_store().list_presets(get_owner(), limit=limit, offset=offset)
+    ]
+
+def save_rendering_preset(name: str, params: Dict, thumbnail: Optional[bytes] = None) -> bool:
+    """Save a rendering preset with PNG thumbnail bytes (persistent)"""
+    get_state_store().save_preset(get_owner(), name, params, thumbnail)
+    metrics.STORE_OPERATIONS.inc(operation='save', table='rendering_presets')
+    get_similarity_index('rendering_presets', get_owner()).insert(name, similarity_spec(params))
     return True
 
 def delete_rendering_preset(name: str) -> bool:
-    """Delete a rendering preset from session state (ephemeral)"""
-    if "rendering_presets" in st.session_state and name in st.session_state["rendering_presets"]:
-        del st.session_state["rendering_presets"][name]
-        return True
-    return False
-
-def generate_thumbnail(harmony_state: Dict, params: Dict, calibrated_white_point: Dict, size: int = 100) -> Optional[str]:
-    """Generate a thumbnail of the current rendering as base64"""
+    """Delete a rendering preset (persistent)"""
+    metrics.STORE_OPERATIONS.inc(operation='delete', table='rendering_presets')
+    get_similarity_index('rendering_presets', get_owner()).delete(name)
+    return get_state_store().delete('rendering_presets', get_owner(), name)
+
+def similarity_spec(params: Dict, harmony_state: Optional[Dict] = None, calibration: Optional[Dict] = None) -> RenderSpec:
+    """The spec a saved state is indexed under; presets (params only) are indexed at the balanced state"""
+    return resolve_render_spec(params, harmony_state or {}, calibration or {})
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def get_similarity_index(table: str, owner: str) -> similarity_index.SimilarityIndex:
+    """One owner's saved states or presets indexed for similarity queries, built from the store on first use"""
+    store = get_state_store()
+    if table == 'marshall_states':
+        rows = store.list_states(owner)
+        specs = [similarity_spec(row['icon_params'], row['target'], row['calibration']) for row in rows]
+        index = similarity_index.SimilarityIndex('states')
+    else:
+        rows = store.list_presets(owner)
+        specs = [similarity_spec(row['params']) for row in rows]
+        index = similarity_index.SimilarityIndex('presets')
+    index.build([row['name'] for row in rows], specs)
+    return index
+
+def similar_states_view(spec: RenderSpec):
+    """Saved states most like the current one, or whose mean colour is closest to a picked colour"""
+    index = get_similarity_index('marshall_states', get_owner())
+    mode = st.radio("Match", ["Current state", "A colour"], key="similar_mode", horizontal=True)
+    if mode == "A colour":
+        picked = st.color_picker("Colour", value="#808080", key="similar_color")
+        matches = index.closest_to_color([int(picked[i:i + 2], 16) / 255 for i in (1, 3, 5)], k=SIMILAR_STATES)
+    else:
+        matches = index.similar(spec, k=SIMILAR_STATES)
+
+    signatures = similarity_index.color_signatures([index.specs[name] for name, _ in matches])
+    for (name, distance), signature in zip(matches, signatures):
+        col1, col2 = st.columns([4, 1])
+        swatch = '#{:02x}{:02x}{:02x}'.format(*(signature * 255).astype(int))
+        col1.markdown(f'<span style="display:inline-block;width:1em;height:1em;background:{swatch};'
+                      f'vertical-align:middle;border-radius:2px"></span> **{name}** · distance `{distance:.3f}`',
+                      unsafe_allow_html=True)
+        if col2.button("Load", key=f"similar_load_{name}"):
+            st.session_state.load_state = index.specs[name].harmony_state
+            st.rerun()
+
+def gallery_page(label: str, total: int, key: str) -> int:
+    """Show a page selector for a gallery and return the offset of the selected page"""
+    pages = max(1, -(-total // GALLERY_PAGE_SIZE))
+    if pages == 1:
+        return 0
+    page = st.number_input(f"{label} page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=key)
+    return (int(page) - 1) * GALLERY_PAGE_SIZE
+
+def resolve_render_spec(params: Dict, harmony_state: Dict, calibrated_white_point: Dict) -> RenderSpec:
+    """Resolve rendering params, state and calibration into a RenderSpec, applying adaptive sigma"""
+    adaptive_sigma, _, _ = calculate_adaptive_sigma(
+        params.get('sigma', 0.30),
+        harmony_state.get('r', 1.0),
+        harmony_state.get('g', 1.0),
+        harmony_state.get('b', 1.0)
+    )
+    return RenderSpec.from_params(dict(params, sigma=adaptive_sigma), harmony_state, calibrated_white_point)
+
+# Cached functions key on the spec's content hash instead of hashing its fields
+SPEC_HASH_FUNCS = {RenderSpec: lambda spec: spec.key}
+
+@st.cache_resource(show_spinner=False)
+def get_render_governor() -> render_governor.RenderGovernor:
+    """Process-wide memory budget for renders (MARSHALL_RENDER_BUDGET_MB)"""
+    return render_governor.RenderGovernor.from_env()
+
+@st.cache_resource(show_spinner=False)
+def get_flights() -> Dict[str, single_flight.SingleFlight]:
+    """Process-wide single-flight groups for renders and encodes"""
+    return {'render': single_flight.SingleFlight('render'), 'encode': single_flight.SingleFlight('encode')}
+
+@st.cache_data(max_entries=8, show_spinner=False, hash_funcs=SPEC_HASH_FUNCS)
+def cached_render(spec: RenderSpec) -> Image.Image:
+    """Render the Marshall Triangle once per spec (shared across sessions)"""
+    metrics.CACHE_FILLS.inc(function='render_marshall_triangle')
+    # The result is cached under spec, so only fallbacks with identical pixels (banded) are allowed
+    with get_render_governor().admit(spec, RENDER_ENGINE) as admission:
+        return admission.render()
+
+def render_marshall_triangle(spec: RenderSpec) -> Image.Image:
+    """The cached rendering of a spec; sessions asking for one that is still rendering share that render"""
+    # Outside the cache: a miss is one render and one outcome (value or error) for every session
+    # waiting on it, each waiting at most RENDER_WAIT, instead of a queue on the cache's own lock
+    return get_flights()['render'].do((spec.key, RENDER_ENGINE), lambda: cached_render(spec), timeout=RENDER_WAIT)
+
+@st.cache_data(max_entries=8, show_spinner=False, hash_funcs=SPEC_HASH_FUNCS)
+def cached_encode(spec: RenderSpec, options: EncodeOptions) -> EncodedImage:
+    """Encode a rendering once per spec and codec; display and download share the bytes"""
+    metrics.CACHE_FILLS.inc(function='encode_render')
+    return encode_image(render_marshall_triangle(spec), options)
+
+def encode_render(spec: RenderSpec, options: EncodeOptions) -> EncodedImage:
+    """The cached encoding of a spec's rendering, shared with sessions encoding the same one"""
+    return get_flights()['encode'].do((spec.key, RENDER_ENGINE, options), lambda: cached_encode(spec, options),
+                                      timeout=RENDER_WAIT)
+
+@st.cache_data(max_entries=8, show_spinner=False, hash_funcs=SPEC_HASH_FUNCS)
+def labeled_diagram(spec: RenderSpec, options: EncodeOptions) -> EncodedImage:
+    """The labelled diagram of a rendering, drawn on a reused figure and encoded once per spec and codec"""
+    metrics.CACHE_FILLS.inc(function='labeled_diagram')
+    labeled = HarmonyIndex.from_spec(spec).labeled_image(img=render_marshall_triangle(spec), dpi=LABELED_DPI)
+    return encode_image(labeled.convert('RGB'), options)
+
+def export_image(spec: RenderSpec, options: EncodeOptions) -> bytes:
+    """Produce the full-resolution export bytes (called lazily on download)"""
     try:
-        base_sigma = params.get('sigma', 0.30)
-        r = harmony_state.get('r', 1.0)
-        g = harmony_state.get('g', 1.0)
-        b = harmony_state.get('b', 1.0)
-        adaptive_sigma, _, _ = calculate_adaptive_sigma(base_sigma, r, g, b)
-
-        renderer = HarmonyIndex(
-            size=size,
-            sigma=adaptive_sigma,
-            intensity=params.get('intensity', 1.2),
-            edge_blur=params.get('edge_blur', 0.5),
-            edge_factor=params.get('edge_factor', 0.5)
-        )
+        return encode_render(spec, options).data
+    except single_flight.FlightTimeout:
+        # Runs outside the script, so the message goes back with the failed download instead of st.warning
+        raise RuntimeError("This export is taking longer than usual to render. Try the download again shortly.") from None
 
-        renderer.set_calibration(calibrated_white_point)
+def shown_or_stop(produce: Callable[[], Any]) -> Any:
+    """Return a shared render or encode for display, or warn and end the run if it outlasts RENDER_WAIT"""
+    try:
+        return produce()
+    except single_flight.FlightTimeout:
+        st.warning(RENDER_TIMEOUT_MESSAGE)
+        st.stop()
+
+@st.cache_data(max_entries=8, show_spinner=False, hash_funcs=SPEC_HASH_FUNCS)
+def export_vector(spec: RenderSpec, tolerance: float = VECTOR_TOLERANCE) -> bytes:
+    """Produce a resolution-independent SVG from an adaptive mesh (called lazily on download)"""
+    metrics.CACHE_FILLS.inc(function='export_vector')
+    mesh = mesh_export.build_mesh(HarmonyIndex.from_spec(spec), spec.harmony_state, spec.falloff_type,
+                                  tolerance=tolerance, shading='flat')
+    return mesh.to_svg(smooth=VECTOR_SMOOTHING).encode('utf-8')
+
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=SPEC_HASH_FUNCS)
+def region_statistics(spec: RenderSpec) -> Dict[str, Any]:
+    """Dominance, centroid colour and white-point drift for a spec, computed from the model without rendering"""
+    metrics.CACHE_FILLS.inc(function='region_statistics')
+    return HarmonyIndex.from_spec(spec).region_statistics(spec.harmony_state, spec.falloff_type).summary()
+
+@st.cache_resource(show_spinner=False)
+def get_tile_server() -> tile_server.TileServer:
+    """Process-wide deep-zoom tile server, also served over HTTP when MARSHALL_TILE_PORT is set"""
+    tiles = tile_server.TileServer()
+    if os.environ.get('MARSHALL_TILE_PORT'):
+        tile_server.start_http_server(tiles, int(os.environ['MARSHALL_TILE_PORT']))
+    return tiles
+
+def deep_zoom_view(spec: RenderSpec):
+    """Zoomable view of the colour model, composed from cached tiles so its cost does not grow with zoom"""
+    col1, col2 = st.columns(2)
+    with col1:
+        zoom = st.slider("Zoom level", min_value=0, max_value=tile_server.MAX_ZOOM, value=4, key="deep_zoom_level")
+    with col2:
+        focus = st.selectbox("Centre on", DEEP_ZOOM_FOCI, key="deep_zoom_focus")
+
+    top, bottom_left, bottom_right = HarmonyIndex()._define_triangle()
+    centroid = ((top[0] + bottom_left[0] + bottom_right[0]) / 3, (top[1] + bottom_left[1] + bottom_right[1]) / 3)
+    centers = {"Centroid": centroid, "Top vertex": top, "Bottom-left vertex": bottom_left,
+               "Bottom-right vertex": bottom_right}
+    center = centers.get(focus) or region_statistics(spec)['white_point'] or centroid
+
+    tiles = get_tile_server()
+    view = tiles.viewport(tiles.register(spec), zoom, center, DEEP_ZOOM_VIEW_PX, DEEP_ZOOM_VIEW_PX)
+    st.image(view)
+    st.caption(f"Zoom {zoom}: {tile_server.TILE_SIZE << zoom:,}px effective resolution · "
+               f"centred on ({center[0]:.4f}, {center[1]:.4f})")
+
+@st.cache_data(max_entries=2, show_spinner=False, hash_funcs=SPEC_HASH_FUNCS)
+def render_animation(keyframes: List[Dict], spec: RenderSpec, base_sigma: float, frames_per_transition: int, fmt: str) -> tuple:
+    """Render an animated transition between saved states, returning (bytes, AnimationStats)"""
+    metrics.CACHE_FILLS.inc(function='render_animation')
+    frame_renderer = FrameRenderer(HarmonyIndex.from_spec(spec), falloff_type=spec.falloff_type)
+
+    def adaptive_sigma(state: Dict[str, float]) -> float:
+        return calculate_adaptive_sigma(base_sigma, state['r'], state['g'], state['b'])[0]
+
+    transition = animation.keyframes_from_saved_states(keyframes)
+    frames = animation.render_transition(
+        frame_renderer,
+        transition,
+        frames_per_transition,
+        hold_frames=frames_per_transition // 4,
+        sigma_for_state=adaptive_sigma
+    )
+    # Every frame blends the keyframes' colours, so a GIF palette from the keyframes covers them
+    palette = animation.render_keyframes(frame_renderer, transition, adaptive_sigma) if fmt == 'gif' else None
+    buf = io.BytesIO()
+    stats = animation.write_animation(frames, buf, fmt=fmt, fps=24, palette=palette)
+    return buf.getvalue(), stats
+
+def display_size(export_size: int, layout: str, column_fraction: float = 1.0) -> int:
+    """Pick the on-screen render resolution for a layout column, capped at the export size"""
+    css_width = LAYOUT_CONTENT_WIDTH.get(layout, LAYOUT_CONTENT_WIDTH['centered']) * column_fraction
+    # Round to a coarse step so small layout differences share cached renders
+    target = int(round(css_width * DISPLAY_PIXEL_RATIO / 50.0)) * 50
+    return max(thumbnails.THUMBNAIL_SIZE, min(export_size, target))
+
+def generate_thumbnail(harmony_state: Dict, params: Dict, calibrated_white_point: Dict, size: int = thumbnails.THUMBNAIL_SIZE, source_size: Optional[int] = None) -> Optional[bytes]:
+    """Generate a thumbnail as PNG bytes by downsampling the cached rendering (the on-screen one when source_size is given)"""
+    try:
+        spec = resolve_render_spec(params, harmony_state, calibrated_white_point)
+        if source_size is not None:
+            spec = spec.replace(size=min(spec.size, source_size))
+        img = render_marshall_triangle(spec)
+        thumbnail = thumbnails.encode_thumbnail(thumbnails.downsample(img, size))
+        metrics.THUMBNAILS.inc(outcome='ok')
+        return thumbnail
+    except Exception:
+        metrics.THUMBNAILS.inc(outcome='error')
+        return None
 
-        img_bytes = renderer.get_image_bytes(
-            harmonyState=harmony_state,
-            falloff_type=params.get('falloff_type', 'gaussian')
-        )
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_gallery_sheet(table: str, owner: str, entries: tuple) -> Optional[thumbnails.SpriteSheet]:
+    """Fetch one gallery page's thumbnails and pack them into a content-hashed sprite sheet
 
-        return base64.b64encode(img_bytes).decode('utf-8')
-    except Exception as e:
+    entries holds (name, updated_at) pairs, so the blobs are only read from the store when the page changes.
+    """
+    metrics.CACHE_FILLS.inc(function='build_gallery_sprite')
+    blobs = get_state_store().thumbnails(table, owner, [name for name, _ in entries])
+    return thumbnails.build_sprite_sheet([blobs.get(name) for name, _ in entries])
+
+def build_gallery_sprite(table: str, owner: str, entries: tuple) -> Optional[tuple]:
+    """One gallery page's sprite sheet and its URL, published on every rerun so pruning never removes a sheet in use"""
+    sheet = build_gallery_sheet(table, owner, entries)
+    if sheet is None:
         return None
+    return sheet, thumbnails.publish_sprite_sheet(sheet)
+
+def gallery_tile_html(sprite: Optional[tuple], index: int, name: str, has_thumbnail: bool) -> str:
+    """Caption a gallery tile, showing its slice of the sprite sheet when it has a thumbnail"""
+    if sprite is None or not has_thumbnail:
+        return f"<div style='text-align: center;'><b>{name}</b></div>"
+    sheet, url = sprite
+    return f"<div style='text-align: center;'>{thumbnails.sprite_tile_html(sheet, index, url)}<br/><b>{name}</b></div>"
+
+def warm_render_spec(spec: RenderSpec, layout: str) -> RenderSpec:
+    """The spec main() renders on screen for an export spec in a layout (unlabelled view)"""
+    resolved = resolve_render_spec(spec.to_params(), spec.harmony_state, spec.calibrated_white_point)
+    return resolved.replace(size=display_size(resolved.size, layout, IMAGE_COLUMN_FRACTION))
+
+@st.cache_resource(show_spinner=False)
+def start_warmup() -> warmup.WarmupHandle:
+    """Prime caches from the warm-up manifest once per process, after the first page has rendered"""
+    from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+    manifest = warmup.load_manifest()
+
+    def encode(spec: RenderSpec, encoding: str):
+        return encode_render(spec, ENCODE_PRESETS[encoding])
+
+    if not manifest.background:
+        handle = warmup.WarmupHandle(threading.current_thread())
+        handle.report = warmup.run_warmup(manifest, render_marshall_triangle, encode=encode, resolve=warm_render_spec)
+        return handle
+    return warmup.start_background_warmup(manifest, render_marshall_triangle, encode=encode,
+                                          resolve=warm_render_spec, prepare_thread=add_script_run_ctx)
+
+@st.cache_resource(show_spinner=False)
+def start_metrics() -> Dict[str, object]:
+    """Register collection-time gauges and start the configured metrics exporters once per process"""
+    from harmony_index import triangle_geometry
+
+    def streamlit_cache_stats() -> Dict[tuple, float]:
+        from streamlit.runtime import Runtime
+        totals: Dict[tuple, float] = {}
+        for stat in Runtime.instance().stats_mgr.get_stats():
+            for key, value in (((stat.category_name, 'entries'), 1), ((stat.category_name, 'bytes'), stat.byte_length)):
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    metrics.REGISTRY.gauge('marshall_streamlit_cache', "Streamlit cache entries and bytes, by cache",
+                           ('cache', 'unit'), callback=streamlit_cache_stats)
+    metrics.REGISTRY.gauge('marshall_triangle_geometry_cached', "Triangle geometries held by triangle_geometry",
+                           callback=lambda: {(): triangle_geometry.cache_info().currsize})
+    return metrics.start_exporters_from_env()
+
+def session_state_bytes() -> int:
+    """Approximate size of this session's state: the pickled size of every picklable value"""
+    total = 0
+    for key in list(st.session_state.keys()):
+        try:
+            total += len(pickle.dumps(st.session_state[key], protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            continue
+    return total
+
+def admin_requested() -> bool:
+    """Whether ?admin= carries the MARSHALL_ADMIN_TOKEN secret (the admin page is off without one)"""
+    token = os.environ.get('MARSHALL_ADMIN_TOKEN')
+    value = st.query_params.get('admin')
+    return bool(token and value) and hmac.compare_digest(str(value), token)
+
+def admin_page():
+    """Hidden operational page: metrics summary and the Prometheus exposition"""
+    st.set_page_config(page_title="Marshall Triangle Metrics", page_icon=".streamlit/favicon.png", layout="wide")
+    st.title("Operational Metrics")
+
+    def total(metric) -> float:
+        return sum(value for suffix, _, _, value in metric.samples() if suffix in ('_total', '_count'))
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Renders", int(total(metrics.RENDERS)))
+    col2.metric("Cache fills", int(total(metrics.CACHE_FILLS)))
+    col3.metric("Shared renders", int(sum(value for _, (group, role), _, value in metrics.SINGLE_FLIGHT.samples()
+                                          if role == 'shared')))
+    col4.metric("Encoded MB", f"{total(metrics.ENCODED_BYTES) / 1e6:.1f}")
+    col5.metric("Reruns", int(total(metrics.RERUN_SECONDS)))
+
+    exposition = metrics.REGISTRY.render()
+    st.download_button("Download metrics", data=exposition, file_name="marshall_metrics.prom", mime="text/plain")
+    st.code(exposition, language=None)
 
 def main():
     if 'layout_preference' not in st.session_state:
@@ -328,6 +668,8 @@ def main():
         st.session_state.edge_blur = 0.5
     if 'edge_factor' not in st.session_state:
         st.session_state.edge_factor = 0.5
+    if 'output_encoding' not in st.session_state or st.session_state.output_encoding not in ENCODE_PRESETS:
+        st.session_state.output_encoding = DEFAULT_ENCODE_PRESET
 
     # Initialize session state for Marshall state vector if not present
     if 'privacy_strength' not in st.session_state:
@@ -402,16 +744,6 @@ def main():
     if is_compensating:
         st.warning(f"Adaptive sigma active: {base_sigma:.2f} → {sigma:.2f} (imbalance: {imbalance_score*100:.1f}%)")
 
-    harmony = HarmonyIndex(
-        size=size,
-        sigma=sigma,
-        intensity=intensity,
-        edge_blur=edge_blur,
-        edge_factor=edge_factor
-    )
-
-    harmony.set_calibration(calibrated_white_point)
-
     # Check for show_labeled transition (False -> True) to reset expansion state
     show_labeled = st.checkbox("Show Labels", value=st.session_state.show_labeled, key="show_labeled")
     
@@ -419,7 +751,29 @@ def main():
     if show_labeled and not st.session_state.prev_show_labeled:
         st.session_state.label_expanded = True
     st.session_state.prev_show_labeled = show_labeled
-    
+
+    # The on-screen image is rendered at the resolution its column can show;
+    # the full export size is only rendered when a download is requested
+    export_spec = resolve_render_spec({
+        'size': size,
+        'sigma': base_sigma,
+        'intensity': intensity,
+        'edge_blur': edge_blur,
+        'edge_factor': edge_factor,
+        'falloff_type': falloff_type,
+    }, marshall_state, calibrated_white_point)
+    column_fraction = 1.0 if show_labeled and st.session_state.label_expanded else IMAGE_COLUMN_FRACTION
+    display_px = display_size(size, st.session_state.layout_preference, column_fraction)
+    display_spec = export_spec.replace(size=display_px)
+    # Rendered up front, so a render that outlasts RENDER_WAIT stops the run before any of the layout is drawn
+    shown_or_stop(lambda: render_marshall_triangle(display_spec))
+    encode_options = ENCODE_PRESETS[st.session_state.output_encoding]
+    profiler.annotate(spec=export_spec.to_params(), state=export_spec.harmony_state,
+                     calibration=export_spec.calibrated_white_point, spec_key=export_spec.key,
+                     display_px=display_px, show_labeled=show_labeled, encoding=st.session_state.output_encoding)
+    export_data = functools.partial(export_image, export_spec, encode_options)
+    export_file_name = f"marshall_triangle_{int(time.time())}.{encode_options.extension}"
+
     # Helper function to render the Render Settings Summary card
     def render_settings_summary():
         """Display a unified summary of all current render settings"""
@@ -448,12 +802,36 @@ def main():
             if is_compensating:
                 st.caption(f"Adaptive sigma: {base_sigma:.2f} → {sigma:.2f}")
 
+            stats = region_statistics(export_spec)
+            dominance = stats['dominance']
+            error = f" (±{stats['dominance_error'] * 100:.1f}%)" if stats['dominance_error'] else ""
+            white_point = (f"`{stats['white_point_drift'] * 100:.1f}%` of an edge from the centre"
+                           if stats['white_point_inside'] else "outside the triangle")
+            st.markdown(f"""
+**Region Statistics:**
+- Dominance{error}: Privacy `{dominance['r'] * 100:.1f}%` · Performance `{dominance['g'] * 100:.1f}%` · Personalization `{dominance['b'] * 100:.1f}%`
+- Centroid colour: `{stats['centroid_color']}`
+- White point: {white_point}
+            """)
+
+    def render_downloads():
+        st.download_button(
+            label="Download Marshall Triangle",
+            data=export_data,
+            file_name=export_file_name,
+            mime=encode_options.mime
+        )
+        st.download_button(
+            label="Download as Vector (SVG)",
+            data=functools.partial(export_vector, export_spec),
+            file_name="marshall_triangle.svg",
+            mime="image/svg+xml"
+        )
+
     # Determine layout based on show_labeled and label_expanded states
     if show_labeled and st.session_state.label_expanded:
         # Full-width expanded mode for labeled diagram
-        fig = harmony.plot_with_labels(harmonyState=marshall_state, falloff_type=falloff_type)
-        st.pyplot(fig)
-        plt.close(fig)
+        st.image(shown_or_stop(lambda: labeled_diagram(display_spec, encode_options)).data, width="stretch")
         
         # Toggle button to collapse
         if st.button("Collapse Diagram", key="collapse_labeled"):
@@ -463,45 +841,30 @@ def main():
         # Unified Render Settings Summary below diagram
         render_settings_summary()
         
-        buf = io.BytesIO()
-        img_export = harmony.render(harmonyState=marshall_state, falloff_type=falloff_type)
-        img_export.save(buf, format='PNG')
-        st.download_button(
-            label="Download Marshall Triangle",
-            data=buf.getvalue(),
-            file_name=f"marshall_triangle_{int(time.time())}.png",
-            mime="image/png"
-        )
+        render_downloads()
     else:
         # Side-by-side column layout (collapsed labeled or unlabeled)
         col1, col2 = st.columns([3, 2])
 
         with col1:
             if show_labeled:
-                fig = harmony.plot_with_labels(harmonyState=marshall_state, falloff_type=falloff_type)
-                st.pyplot(fig)
-                plt.close(fig)
+                st.image(shown_or_stop(lambda: labeled_diagram(display_spec, encode_options)).data, width="stretch")
                 
                 # Toggle button to expand
                 if st.button("Expand Diagram", key="expand_labeled"):
                     st.session_state.label_expanded = True
                     st.rerun()
             else:
-                img = harmony.render(harmonyState=marshall_state, falloff_type=falloff_type)
-                st.image(img, width="stretch")
+                displayed = shown_or_stop(lambda: encode_render(display_spec, encode_options))
+                st.image(displayed.data, width="stretch")
+                st.caption(f"On-screen image: {display_px}px · {displayed.summary()}")
 
         with col2:
             render_settings_summary()
+            render_downloads()
 
-            buf = io.BytesIO()
-            img_export = harmony.render(harmonyState=marshall_state, falloff_type=falloff_type)
-            img_export.save(buf, format='PNG')
-            st.download_button(
-                label="Download Marshall Triangle",
-                data=buf.getvalue(),
-                file_name=f"marshall_triangle_{int(time.time())}.png",
-                mime="image/png"
-            )
+    if st.checkbox("Deep Zoom", key="deep_zoom"):
+        deep_zoom_view(export_spec)
 
     # Tab selection with persistence using radio buttons styled as tabs
     tab_names = ["About the Marshall Triangle", "State & Calibration", "Visualization Settings"]
@@ -639,42 +1002,42 @@ def main():
                     'g': st.session_state.performance_strength,
                     'b': st.session_state.personalization_strength
                 }
-                thumbnail = generate_thumbnail(state_to_save, current_params, calibrated_white_point, size=100)
+                thumbnail = generate_thumbnail(state_to_save, current_params, calibrated_white_point, source_size=display_px)
                 save_marshall_state(
                     state_name, 
                     current_params, 
                     state_to_save['r'], 
                     state_to_save['g'], 
                     state_to_save['b'],
-                    thumbnail
+                    thumbnail,
+                    calibrated_white_point
                 )
-                st.success(f"Marshall State '{state_name}' saved to this session!")
+                st.success(f"Marshall State '{state_name}' saved!")
                 st.rerun()
             else:
                 st.warning("Please enter a name for the state.")
 
         st.subheader("Saved Marshall States")
-        st.info("States are saved to your current session only. They will be cleared when you reload the page.")
+        st.info("States are saved to this page's link. Bookmark the URL to return to them later.")
         
-        marshall_states = get_marshall_states()
+        total_states = count_marshall_states()
+        offset = gallery_page("Saved states", total_states, "marshall_states_page")
+        marshall_states = get_marshall_states(limit=GALLERY_PAGE_SIZE, offset=offset)
 
         if marshall_states:
             num_cols = 3
             rows = [marshall_states[i:i+num_cols] for i in range(0, len(marshall_states), num_cols)]
+            sprite = build_gallery_sprite('marshall_states', get_owner(), tuple((state['name'], state['updated_at']) for state in marshall_states))
 
-            for row in rows:
+            for row_index, row in enumerate(rows):
                 cols = st.columns(num_cols)
 
                 for i, state in enumerate(row):
                     with cols[i]:
-                        thumbnail = state.get('thumbnail')
-                        if thumbnail:
-                            st.markdown(
-                                f"<div style='text-align: center;'><img src='data:image/png;base64,{thumbnail}' width='100px'/><br/><b>{state['name']}</b></div>", 
-                                unsafe_allow_html=True
-                            )
-                        else:
-                            st.markdown(f"<div style='text-align: center;'><b>{state['name']}</b></div>", unsafe_allow_html=True)
+                        st.markdown(
+                            gallery_tile_html(sprite, row_index * num_cols + i, state['name'], state['has_thumbnail']),
+                            unsafe_allow_html=True
+                        )
 
                         icon_params = state.get('icon_params', {})
                         st.markdown(f"""
@@ -694,6 +1057,56 @@ def main():
         else:
             st.info("No Marshall states saved yet. Create one by setting your preferred state and clicking 'Save Current State'.")
 
+        if total_states >= 1:
+            st.subheader("Find Similar States")
+            similar_states_view(export_spec)
+
+        if total_states >= 2:
+            st.subheader("Animate Transitions")
+            st.markdown("Render an animation of the system moving through saved states, interpolating state and calibration.")
+
+            all_states = get_marshall_states()
+            state_names = [state['name'] for state in all_states]
+            sequence = st.multiselect("States (in order)", state_names, default=state_names[:2], key="animation_sequence")
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                frames_per_transition = st.slider("Frames per transition", min_value=6, max_value=60, value=24, step=6, key="animation_frames")
+            with col2:
+                animation_size = st.select_slider("Animation size", options=[200, 300, 400, 500, 600], value=400, key="animation_size")
+            with col3:
+                formats = [fmt for fmt in animation.FORMATS if fmt != 'mp4' or animation.ffmpeg_available()]
+                animation_format = st.radio("Format", formats, key="animation_format", horizontal=True)
+
+            if st.button("Render Animation", key="render_animation_btn"):
+                if len(sequence) >= 2:
+                    by_name = {state['name']: state for state in all_states}
+                    st.session_state.animation_request = {
+                        'keyframes': [{'target': by_name[name]['target'], 'calibration': by_name[name].get('calibration')} for name in sequence],
+                        'spec': export_spec.replace(size=animation_size),
+                        'base_sigma': base_sigma,
+                        'frames_per_transition': frames_per_transition,
+                        'fmt': animation_format,
+                    }
+                else:
+                    st.warning("Select at least two states to animate between.")
+
+            request = st.session_state.get('animation_request')
+            if request:
+                with st.spinner("Rendering animation..."):
+                    data, stats = render_animation(**request)
+                st.caption(f"{stats.frames} frames · {stats.fps:.1f} frames/s · {stats.nbytes / 1024:.0f} KB")
+                if request['fmt'] == 'mp4':
+                    st.video(data)
+                else:
+                    st.image(data)
+                st.download_button(
+                    label="Download Animation",
+                    data=data,
+                    file_name=f"marshall_transition_{int(time.time())}.{animation.EXTENSIONS[request['fmt']]}",
+                    mime=animation.MIME_TYPES[request['fmt']]
+                )
+
     # Tab 3: Visualization Settings
     elif selected_tab == "Visualization Settings":
         st.header("Visualization Settings")
@@ -743,9 +1156,16 @@ def main():
                                     key="edge_factor",
                                     step=0.1)
 
+            st.subheader("Output Encoding")
+
+            st.selectbox("Codec and Compression",
+                         list(ENCODE_PRESETS),
+                         key="output_encoding",
+                         help="Faster settings use less CPU per image; smaller settings use less bandwidth.")
+
         with col2:
             st.subheader("Save Rendering Presets")
-            st.info("Presets are saved to your current session only.")
+            st.info("Presets are saved to this page's link.")
 
             preset_name = st.text_input("Preset Name", value="", key="preset_name_input")
 
@@ -766,9 +1186,9 @@ def main():
                         'g': st.session_state.performance_strength,
                         'b': st.session_state.personalization_strength
                     }
-                    thumbnail = generate_thumbnail(state_for_thumbnail, params, calibrated_white_point, size=100)
+                    thumbnail = generate_thumbnail(state_for_thumbnail, params, calibrated_white_point, source_size=display_px)
                     save_rendering_preset(preset_name, params, thumbnail)
-                    st.success(f"Rendering preset '{preset_name}' saved to this session!")
+                    st.success(f"Rendering preset '{preset_name}' saved!")
                     st.rerun()
                 else:
                     st.warning("Please enter a name for the preset.")
@@ -779,28 +1199,34 @@ def main():
 
         st.subheader("Saved Rendering Presets")
 
-        presets = get_rendering_presets()
+        total_presets = count_rendering_presets()
+        if total_presets >= 2:
+            current = similarity_spec({name: st.session_state[name] for name in
+                                       ('size', 'falloff_type', 'sigma', 'intensity', 'edge_blur', 'edge_factor')})
+            closest = get_similarity_index('rendering_presets', get_owner()).similar(current, k=3)
+            st.caption("Closest to the current settings: " +
+                       ", ".join(f"{name} ({distance:.2f})" for name, distance in closest))
+        offset = gallery_page("Presets", total_presets, "rendering_presets_page")
+        presets = get_rendering_presets(limit=GALLERY_PAGE_SIZE, offset=offset)
 
         if presets:
             num_cols = 3
             rows = [presets[i:i+num_cols] for i in range(0, len(presets), num_cols)]
+            sprite = build_gallery_sprite('rendering_presets', get_owner(), tuple((preset['name'], preset['updated_at']) for preset in presets))
 
-            for row in rows:
+            for row_index, row in enumerate(rows):
                 cols = st.columns(num_cols)
 
                 for i, preset in enumerate(row):
                     if i < len(row):
                         with cols[i]:
-                            thumbnail = preset['data'].get('thumbnail')
+                            has_thumbnail = preset['data'].get('has_thumbnail', False)
                             params = preset['data'].get('params', {})
                             
-                            if thumbnail:
-                                st.markdown(
-                                    f"<div style='text-align: center;'><img src='data:image/png;base64,{thumbnail}' width='100px'/><br/><b>{preset['name']}</b></div>", 
-                                    unsafe_allow_html=True
-                                )
-                            else:
-                                st.markdown(f"<div style='text-align: center;'><b>{preset['name']}</b></div>", unsafe_allow_html=True)
+                            st.markdown(
+                                gallery_tile_html(sprite, row_index * num_cols + i, preset['name'], has_thumbnail),
+                                unsafe_allow_html=True
+                            )
 
                             st.markdown(f"""
 **Size:** `{params.get('size', 500)}px`  
@@ -832,5 +1258,24 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+    start_warmup()
+
 if __name__ == "__main__":
-    main()
+    start_metrics()
+    if admin_requested():
+        # Hidden page: ?admin=<MARSHALL_ADMIN_TOKEN>
+        admin_page()
+    else:
+        rerun_start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            # Hidden switch: ?profile=<MARSHALL_PROFILE_TOKEN> captures this session's reruns
+            with profiler.maybe_capture('app.main', requested=profiler.token_matches(st.query_params.get('profile'))):
+                main()
+        except BaseException as e:
+            # Streamlit's st.rerun and st.stop arrive as BaseExceptions (RerunException, StopException)
+            outcome = type(e).__name__
+            raise
+        finally:
+            metrics.RERUN_SECONDS.observe(time.perf_counter() - rerun_start, outcome=outcome)
+            metrics.SESSION_STATE_BYTES.observe(session_state_bytes())
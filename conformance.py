@@ -0,0 +1,470 @@
+"""
+Marshall Triangle Render Conformance and Golden-Image Suite
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+
+Every engine is compared with HarmonyIndex.render(engine='reference'), the
+per-pixel loop that defines the model, over a randomized matrix of specs.
+The engines HarmonyIndex.render selects are also compared on raw settings,
+unrounded by RenderSpec, as callers without a spec pass them.
+
+Usage:
+    python conformance.py run                        # 16 random cases, every engine, plus 8 raw cases
+    python conformance.py run --cases 40 --sizes 64 257 500 --engines matrix adaptive --json report.json
+    python conformance.py golden                     # reference and engines against golden/
+    python conformance.py golden --update            # re-record golden/ from the reference
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+from scipy import ndimage
+
+from harmony_index import HarmonyIndex, FrameRenderer
+from render_spec import RenderSpec
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+GOLDEN_MANIFEST = 'manifest.json'
+# Golden cases are drawn from this seed at these sizes (small, so the PNGs stay a few KB)
+GOLDEN_SEED = 2026
+GOLDEN_SIZES = (64, 96, 127, 160)
+GOLDEN_CASES = 8
+
+DEFAULT_SIZES = (64, 128, 257, 400)
+# Share of random cases whose state or calibration channels sit exactly on a slider end
+EXTREME_PROBABILITY = 0.2
+
+
+@dataclass(frozen=True)
+class Tolerance:
+    """
+    What an engine may differ from the reference by.
+
+    Attributes:
+    -----------
+    levels : int
+        Largest per-pixel, per-channel difference in 8-bit levels
+    delta_e : float
+        Largest CIE76 colour difference (about 2.3 is just noticeable)
+    ssim : float
+        Smallest mean structural similarity of the luminance
+    """
+    levels: int = 0
+    delta_e: float = 0.0
+    ssim: float = 1.0
+
+
+def _render_with(engine: str) -> Callable[[RenderSpec], Image.Image]:
+    def render(spec: RenderSpec) -> Image.Image:
+        return HarmonyIndex.from_spec(spec).render(spec=spec, engine=engine)
+    return render
+
+
+def _render_pipeline_cold(spec: RenderSpec) -> Image.Image:
+    # A fresh pipeline, so timings are not flattered by the shared memo
+    import render_pipeline
+    return render_pipeline.RenderPipeline().render(spec)
+
+
+def _render_frame(spec: RenderSpec) -> Image.Image:
+    harmony = HarmonyIndex.from_spec(spec)
+    return FrameRenderer(harmony, spec.falloff_type).render_frame(spec.harmony_state, spec.calibrated_white_point)
+
+
+def _render_banded(spec: RenderSpec) -> Image.Image:
+    import render_governor
+    return render_governor.render_banded(spec)
+
+
+# Engines under test and what each must hold to; the exact engines promise identical pixels.
+# the adaptive engine bounds its unblurred error to 2 levels, and blurring adds at most one for rounding
+ENGINES: Dict[str, Callable[[RenderSpec], Image.Image]] = {
+    'matrix': _render_with('matrix'),
+    'pipeline': _render_pipeline_cold,
+    'frame': _render_frame,
+    'banded': _render_banded,
+    'adaptive': _render_with('adaptive'),
+}
+TOLERANCES: Dict[str, Tolerance] = {
+    'matrix': Tolerance(),
+    'pipeline': Tolerance(),
+    'frame': Tolerance(),
+    'banded': Tolerance(),
+    'adaptive': Tolerance(levels=3, delta_e=2.0, ssim=0.995),
+}
+
+
+# Engines compared on raw settings, through HarmonyIndex.render without a spec
+RAW_ENGINES = ('matrix', 'pipeline')
+DEFAULT_RAW_CASES = 8
+
+
+def render_reference(spec: RenderSpec) -> Image.Image:
+    """The ground truth: the per-pixel loop."""
+    return HarmonyIndex.from_spec(spec).render(spec=spec, engine='reference')
+
+
+def render_raw(params: Dict, engine: str) -> Image.Image:
+    """Render settings as given (random_raw_case's shape) through HarmonyIndex.render, without a RenderSpec."""
+    harmony = HarmonyIndex(size=params['size'], sigma=params['sigma'], intensity=params['intensity'],
+                           edge_blur=params['edge_blur'], edge_factor=params['edge_factor'])
+    harmony.set_calibration(dict(zip('rgb', params['calibration'])))
+    return harmony.render(dict(zip('rgb', params['state'])), params['falloff_type'], engine=engine)
+
+
+def _srgb_to_lab(pixels: np.ndarray) -> np.ndarray:
+    # 8-bit sRGB to CIELAB (D65)
+    rgb = pixels.astype(np.float64) / 255
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055)**2.4)
+    xyz = linear @ np.array([[0.4124564, 0.3575761, 0.1804375],
+                             [0.2126729, 0.7151522, 0.0721750],
+                             [0.0193339, 0.1191920, 0.9503041]]).T
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > (6 / 29)**3, np.cbrt(xyz), xyz / (3 * (6 / 29)**2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def _ssim(a: np.ndarray, b: np.ndarray) -> float:
+    # Mean SSIM of Rec. 601 luminance with the usual 11-tap, sigma 1.5 Gaussian window
+    luma = np.array([0.299, 0.587, 0.114])
+    x, y = a.astype(np.float64) @ luma, b.astype(np.float64) @ luma
+    c1, c2 = (0.01 * 255)**2, (0.03 * 255)**2
+
+    def blur(values):
+        return ndimage.gaussian_filter(values, 1.5, truncate=3.5)
+
+    mu_x, mu_y = blur(x), blur(y)
+    var_x, var_y = blur(x * x) - mu_x**2, blur(y * y) - mu_y**2
+    covariance = blur(x * y) - mu_x * mu_y
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * covariance + c2)) / ((mu_x**2 + mu_y**2 + c1) * (var_x + var_y + c2))
+    return float(ssim_map.mean())
+
+
+@dataclass(frozen=True)
+class Difference:
+    """Per-pixel and perceptual difference between two renderings of the same size."""
+    max_error: int
+    mean_error: float
+    pixels_over: int
+    psnr: float
+    max_delta_e: float
+    mean_delta_e: float
+    ssim: float
+
+    def within(self, tolerance: Tolerance) -> bool:
+        return (self.max_error <= tolerance.levels and self.max_delta_e <= tolerance.delta_e + 1e-9
+                and self.ssim >= tolerance.ssim - 1e-9)
+
+
+def compare(image: Image.Image, reference: Image.Image, levels: int = 0) -> Difference:
+    """
+    Measure how far an image is from the reference.
+
+    Parameters:
+    -----------
+    image, reference : PIL.Image.Image
+        RGB images of the same size
+    levels : int
+        Per-pixel tolerance used to count pixels_over
+
+    Returns:
+    --------
+    Difference
+        Max and mean channel error, pixels over levels, PSNR, CIE76 colour
+        difference and mean SSIM
+    """
+    a, b = np.asarray(image.convert('RGB')), np.asarray(reference.convert('RGB'))
+    if a.shape != b.shape:
+        raise ValueError(f"Cannot compare a {a.shape} image with a {b.shape} reference")
+    error = np.abs(a.astype(np.int16) - b.astype(np.int16))
+    mse = float((error.astype(np.float64)**2).mean())
+    delta_e = np.linalg.norm(_srgb_to_lab(a) - _srgb_to_lab(b), axis=-1)
+    return Difference(max_error=int(error.max()), mean_error=float(error.mean()),
+                      pixels_over=int((error.max(axis=-1) > levels).sum()),
+                      psnr=float('inf') if mse == 0 else 10 * np.log10(255**2 / mse),
+                      max_delta_e=float(delta_e.max()), mean_delta_e=float(delta_e.mean()), ssim=_ssim(a, b))
+
+
+def random_raw_case(rng: np.random.Generator, sizes: Sequence[int] = DEFAULT_SIZES) -> Dict:
+    """
+    Settings across the app's slider ranges at full float precision, with
+    channels pinned to a slider end in some cases: RenderSpec's fields as a
+    dict ('state' and 'calibration' as (r, g, b) tuples), not yet rounded.
+    """
+    def channels(low: float) -> tuple:
+        values = rng.uniform(low, 1.0, 3)
+        if rng.random() < EXTREME_PROBABILITY:
+            pinned = rng.random(3) < 0.5
+            values[pinned] = rng.choice([low, 1.0], pinned.sum())
+        return tuple(float(value) for value in values)
+
+    return dict(size=int(rng.choice(sizes)), sigma=float(rng.uniform(0.05, 0.5)),
+                intensity=float(rng.uniform(0.1, 5.0)), edge_blur=float(rng.uniform(0.0, 2.0)),
+                edge_factor=float(rng.uniform(0.0, 1.0)),
+                falloff_type=str(rng.choice(['gaussian', 'inverse_square'])),
+                state=channels(0.0), calibration=channels(0.01))
+
+
+def random_case(rng: np.random.Generator, sizes: Sequence[int] = DEFAULT_SIZES) -> RenderSpec:
+    """A spec across the app's slider ranges, with channels pinned to a slider end in some cases."""
+    return RenderSpec(**random_raw_case(rng, sizes))
+
+
+def _timed(render: Callable[[RenderSpec], Image.Image], spec: RenderSpec, repeat: int):
+    best, image = float('inf'), None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        image = render(spec)
+        best = min(best, time.perf_counter() - start)
+    return image, best
+
+
+@dataclass(frozen=True)
+class CaseResult:
+    """One engine on one spec."""
+    case: int
+    engine: str
+    spec: Dict
+    difference: Difference
+    passed: bool
+    reference_seconds: float
+    engine_seconds: float
+
+    @property
+    def speedup(self) -> float:
+        return self.reference_seconds / max(self.engine_seconds, 1e-9)
+
+
+def run_suite(specs: Sequence[RenderSpec], engines: Sequence[str], repeat: int = 1,
+              report: Optional[Callable[[CaseResult], None]] = None) -> List[CaseResult]:
+    """
+    Render every spec with the reference and with each engine, and compare.
+
+    Parameters:
+    -----------
+    specs : Sequence[RenderSpec]
+        The cases
+    engines : Sequence[str]
+        Names in ENGINES
+    repeat : int
+        Renders per timing; the fastest counts
+    report : Callable[[CaseResult], None], optional
+        Called with each result as it completes
+
+    Returns:
+    --------
+    List[CaseResult]
+        One result per spec and engine
+    """
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown:
+        raise ValueError(f"Unknown engines {unknown}, expected some of {tuple(ENGINES)}")
+    results = []
+    for case, spec in enumerate(specs):
+        reference, reference_seconds = _timed(render_reference, spec, repeat)
+        for engine in engines:
+            image, seconds = _timed(ENGINES[engine], spec, repeat)
+            results.append(_case_result(case, engine, dict(spec.to_params(), state=spec.state,
+                                                           calibration=spec.calibration),
+                                        image, reference, TOLERANCES[engine], reference_seconds, seconds))
+            if report is not None:
+                report(results[-1])
+    return results
+
+
+def run_raw_suite(cases: Sequence[Dict], engines: Sequence[str] = RAW_ENGINES, repeat: int = 1,
+                  report: Optional[Callable[[CaseResult], None]] = None) -> List[CaseResult]:
+    """
+    Render raw settings with HarmonyIndex.render's reference and each engine, and compare.
+
+    RenderSpec rounds what it holds, so run_suite cannot catch an engine that
+    renders a rounded copy of unrounded settings; these cases can. Results
+    are labelled 'raw-<engine>' and must match exactly.
+
+    Parameters:
+    -----------
+    cases : Sequence[Dict]
+        Settings as random_raw_case returns them
+    engines : Sequence[str]
+        Names in RAW_ENGINES
+    repeat : int
+        Renders per timing; the fastest counts
+    report : Callable[[CaseResult], None], optional
+        Called with each result as it completes
+
+    Returns:
+    --------
+    List[CaseResult]
+        One result per case and engine
+    """
+    unknown = [engine for engine in engines if engine not in RAW_ENGINES]
+    if unknown:
+        raise ValueError(f"Unknown raw engines {unknown}, expected some of {RAW_ENGINES}")
+    results = []
+    for case, params in enumerate(cases):
+        reference, reference_seconds = _timed(lambda p: render_raw(p, 'reference'), params, repeat)
+        for engine in engines:
+            image, seconds = _timed(lambda p: render_raw(p, engine), params, repeat)
+            results.append(_case_result(case, f"raw-{engine}", params, image, reference, Tolerance(),
+                                        reference_seconds, seconds))
+            if report is not None:
+                report(results[-1])
+    return results
+
+
+def _case_result(case: int, engine: str, spec: Dict, image: Image.Image, reference: Image.Image,
+                 tolerance: Tolerance, reference_seconds: float, seconds: float) -> CaseResult:
+    difference = compare(image, reference, tolerance.levels)
+    return CaseResult(case=case, engine=engine, spec=spec, difference=difference,
+                      passed=difference.within(tolerance), reference_seconds=reference_seconds,
+                      engine_seconds=seconds)
+
+
+def summarize(results: Sequence[CaseResult]) -> List[Dict]:
+    """Per engine: cases passed, worst errors and the geometric-mean speedup over the reference."""
+    summary = []
+    for engine in dict.fromkeys(result.engine for result in results):
+        rows = [result for result in results if result.engine == engine]
+        summary.append({
+            'engine': engine,
+            'passed': sum(result.passed for result in rows),
+            'cases': len(rows),
+            'max_error': max(result.difference.max_error for result in rows),
+            'max_delta_e': max(result.difference.max_delta_e for result in rows),
+            'min_ssim': min(result.difference.ssim for result in rows),
+            'speedup': float(np.exp(np.mean([np.log(result.speedup) for result in rows]))),
+        })
+    return summary
+
+
+def _print_result(result: CaseResult):
+    d, spec = result.difference, result.spec
+    print(f"{result.case:4d} {spec['size']:5d} {spec['falloff_type']:14} {result.engine:12} "
+          f"{d.max_error:4d} {d.mean_error:7.4f} {d.pixels_over:7d} {d.max_delta_e:6.2f} {d.ssim:7.5f} "
+          f"{result.reference_seconds * 1000:8.0f} {result.engine_seconds * 1000:7.1f} {result.speedup:7.1f}x "
+          f"{'ok' if result.passed else 'FAIL'}")
+
+
+def _print_summary(summary: Sequence[Dict]):
+    print()
+    print(f"{'engine':12} {'passed':>9} {'max':>5} {'dE':>6} {'SSIM':>8} {'speedup':>8}")
+    for row in summary:
+        print(f"{row['engine']:12} {row['passed']:4d}/{row['cases']:<4d} {row['max_error']:5d} "
+              f"{row['max_delta_e']:6.2f} {row['min_ssim']:8.5f} {row['speedup']:7.1f}x")
+
+
+def golden_specs() -> List[RenderSpec]:
+    """The specs golden images are recorded for."""
+    rng = np.random.default_rng(GOLDEN_SEED)
+    return [random_case(rng, GOLDEN_SIZES) for _ in range(GOLDEN_CASES)]
+
+
+def update_golden(directory: str = GOLDEN_DIR) -> List[str]:
+    """Record reference renders of golden_specs() as PNGs plus a manifest; returns the file names."""
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+    for spec in golden_specs():
+        file_name = f"{spec.key}.png"
+        render_reference(spec).save(os.path.join(directory, file_name), optimize=True)
+        entries.append({'file': file_name, 'params': spec.to_params(), 'state': spec.state,
+                        'calibration': spec.calibration})
+    for stale in set(os.listdir(directory)) - {entry['file'] for entry in entries} - {GOLDEN_MANIFEST}:
+        if stale.endswith('.png'):
+            os.remove(os.path.join(directory, stale))
+    with open(os.path.join(directory, GOLDEN_MANIFEST), 'w') as f:
+        json.dump({'seed': GOLDEN_SEED, 'cases': entries}, f, indent=2)
+        f.write('\n')
+    return [entry['file'] for entry in entries]
+
+
+def check_golden(engines: Sequence[str], directory: str = GOLDEN_DIR) -> List[Dict]:
+    """
+    Compare the reference, and each engine, with the recorded golden images.
+
+    The reference must reproduce its golden images exactly, so a change to the
+    model itself shows up here even when every engine still agrees with it.
+    """
+    with open(os.path.join(directory, GOLDEN_MANIFEST)) as f:
+        manifest = json.load(f)
+    rows = []
+    for entry in manifest['cases']:
+        spec = RenderSpec.from_params(entry['params'], dict(zip('rgb', entry['state'])),
+                                      dict(zip('rgb', entry['calibration'])))
+        golden = Image.open(os.path.join(directory, entry['file']))
+        for engine in ['reference', *engines]:
+            image = render_reference(spec) if engine == 'reference' else ENGINES[engine](spec)
+            tolerance = TOLERANCES.get(engine, Tolerance())
+            difference = compare(image, golden, tolerance.levels)
+            rows.append({'file': entry['file'], 'engine': engine, 'passed': difference.within(tolerance),
+                         **asdict(difference)})
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare render engines with the per-pixel reference.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="randomized conformance matrix")
+    run.add_argument('--cases', type=int, default=16)
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    run.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    run.add_argument('--raw-cases', type=int, default=DEFAULT_RAW_CASES,
+                     help="cases with unrounded settings, for the selected engines in RAW_ENGINES")
+    run.add_argument('--repeat', type=int, default=1, help="renders per timing (the fastest counts)")
+    run.add_argument('--json', help="also write the results to this file")
+    golden = commands.add_parser('golden', help="check (or --update) the golden images")
+    golden.add_argument('--update', action='store_true')
+    golden.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    golden.add_argument('--dir', default=GOLDEN_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == 'golden':
+        if args.update:
+            files = update_golden(args.dir)
+            print(f"Recorded {len(files)} golden images in {args.dir}")
+            return 0
+        rows = check_golden(args.engines, args.dir)
+        for row in rows:
+            print(f"{row['file']:24} {row['engine']:9} max {row['max_error']:3d} dE {row['max_delta_e']:5.2f} "
+                  f"SSIM {row['ssim']:.5f} {'ok' if row['passed'] else 'FAIL'}")
+        failed = sum(not row['passed'] for row in rows)
+        print(f"{len(rows) - failed}/{len(rows)} golden comparisons passed")
+        return 1 if failed else 0
+
+    rng = np.random.default_rng(args.seed)
+    specs = [random_case(rng, args.sizes) for _ in range(args.cases)]
+    raw_cases = [random_raw_case(rng, args.sizes) for _ in range(args.raw_cases)]
+    print(f"{'case':>4} {'size':>5} {'falloff':14} {'engine':12} {'max':>4} {'mean':>7} {'over':>7} {'dE':>6} "
+          f"{'SSIM':>7} {'ref ms':>8} {'ms':>7} {'speedup':>8}")
+    results = run_suite(specs, args.engines, repeat=args.repeat, report=_print_result)
+    results += run_raw_suite(raw_cases, [engine for engine in RAW_ENGINES if engine in args.engines],
+                             repeat=args.repeat, report=_print_result)
+    summary = summarize(results)
+    _print_summary(summary)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'summary': summary,
+                       'results': [dict(asdict(result), speedup=result.speedup) for result in results]}, f, indent=2)
+    return 0 if all(result.passed for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,11 +16,36 @@ Repository: https://github.com/Paul-W-Marshall/marshall-triangle
 """
 
 import numpy as np
-from PIL import Image
-import matplotlib.pyplot as plt
+from PIL import Image, ImageFilter
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import io
+import functools
+import threading
+import weakref
+from dataclasses import dataclass
 from scipy import ndimage
 from typing import Dict, Optional
+from image_output import EncodeOptions, encode_image
+from render_spec import RenderSpec
+from source_engine import GAUSSIAN_SPREAD, INVERSE_SQUARE_SOFTENING, SourceEngine, source_falloff
+import profiler
+import metrics
+import time
+
+# Number of points evaluated per vectorized pass in the query API; bounds the
+# temporary (chunk x 3) float arrays to a few tens of MB
+DEFAULT_QUERY_CHUNK = 262144
+
+# Default bound on the area-fraction error of region_statistics' dominance estimate
+DEFAULT_REGION_TOLERANCE = 0.005
+
+# 'reference' is the per-pixel loop that defines the model; 'matrix' evaluates
+# the same sources as one matrix product (see source_engine) and 'pipeline' as
+# memoized stages (see render_pipeline), both with identical output; 'adaptive'
+# interpolates the smooth interior from a coarse grid (see adaptive_render) and is
+# within its DEFAULT_TOLERANCE of the others before blur
+RENDER_ENGINES = ('reference', 'matrix', 'pipeline', 'adaptive')
 
 # The HarmonyIndex class implements the Marshall Triangle visualization model
 # This class renders the Marshall Triangle, a novel geometric configuration for visualizing
@@ -64,6 +89,48 @@ class HarmonyIndex:
             else:
                 self.calibrated_white_point[key] = 1.0
 
+    @classmethod
+    def from_spec(cls, spec: RenderSpec) -> 'HarmonyIndex':
+        """
+        Create a renderer configured (including calibration) from a RenderSpec.
+
+        Parameters:
+        -----------
+        spec : RenderSpec
+            The rendering specification
+
+        Returns:
+        --------
+        HarmonyIndex
+            A renderer whose to_spec(spec.harmony_state, spec.falloff_type) equals spec
+        """
+        harmony = cls(size=spec.size, sigma=spec.sigma, intensity=spec.intensity,
+                      edge_blur=spec.edge_blur, edge_factor=spec.edge_factor)
+        harmony.set_calibration(spec.calibrated_white_point)
+        return harmony
+
+    def to_spec(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian') -> RenderSpec:
+        """
+        Describe a rendering of this renderer as an immutable, hashable RenderSpec.
+
+        Parameters:
+        -----------
+        harmonyState : Dict[str, float], optional
+            State vector; missing channels default to 1.0
+        falloff_type : str
+            The type of falloff function to use ('gaussian' or 'inverse_square')
+
+        Returns:
+        --------
+        RenderSpec
+            The canonical specification
+        """
+        return RenderSpec.from_params(
+            {'size': self.size, 'sigma': self.sigma, 'intensity': self.intensity,
+             'edge_blur': self.edge_blur, 'edge_factor': self.edge_factor, 'falloff_type': falloff_type},
+            harmonyState, self.calibrated_white_point
+        )
+
     def _create_coordinate_grid(self):
         x = np.linspace(-1, 1, self.size)
         y = np.linspace(-1, 1, self.size)
@@ -97,16 +164,52 @@ class HarmonyIndex:
         return not ((d1 < -buffer or d2 < -buffer or d3 < -buffer) and
                     (d1 > buffer or d2 > buffer or d3 > buffer))
 
+    def _inside_triangle_mask(self, x, y, vertices):
+        # Vectorized form of _is_inside_triangle for coordinate arrays
+        def sign(p2, p3):
+            return (x - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (y - p3[1])
+
+        buffer = 0.005
+        v1, v2, v3 = vertices
+        d1 = sign(v1, v2)
+        d2 = sign(v2, v3)
+        d3 = sign(v3, v1)
+        has_neg = (d1 < -buffer) | (d2 < -buffer) | (d3 < -buffer)
+        has_pos = (d1 > buffer) | (d2 > buffer) | (d3 > buffer)
+        return ~(has_neg & has_pos)
+
+    def _calibration_scale(self, white_point: Optional[Dict[str, float]] = None):
+        # Per-channel factors that make the calibrated white point render as balanced
+        if white_point is None:
+            white_point = self.calibrated_white_point
+        max_calibration = max(white_point.values())
+        scale = []
+        for key in ['r', 'g', 'b']:
+            # Prevent division by zero
+            if white_point[key] < 0.01:
+                scale.append(max_calibration)
+            else:
+                scale.append(max_calibration / white_point[key])
+        return np.array(scale)
+
     def _gaussian_falloff(self, x, y, cx, cy):
         dist_sq = (x - cx)**2 + (y - cy)**2
-        sigma = self.sigma * 1.8
-        return np.exp(-dist_sq / (2 * sigma**2)) * self.intensity
+        return source_falloff(dist_sq, 'gaussian', self.sigma, self.intensity)
 
     def _inverse_square_falloff(self, x, y, cx, cy):
         dist_sq = (x - cx)**2 + (y - cy)**2
-        return self.intensity * 0.8 / (dist_sq + 0.05)
+        return source_falloff(dist_sq, 'inverse_square', self.sigma, self.intensity)
+
+    def _describe_render(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian',
+                         spec: Optional[RenderSpec] = None, engine: str = 'reference') -> Dict:
+        # Render parameters recorded with a profiler capture
+        spec = spec or self.to_spec(harmonyState, falloff_type)
+        return {'spec': spec.to_params(), 'state': spec.harmony_state, 'calibration': spec.calibrated_white_point,
+                'spec_key': spec.key, 'engine': engine}
 
-    def render(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian'):
+    @profiler.profiled('HarmonyIndex.render', describe=_describe_render)
+    def render(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian', spec: Optional[RenderSpec] = None,
+               engine: str = 'reference'):
         """
         Render the Marshall Triangle using a dynamic state vector to weight color intensities,
         adjusted based on the calibrated white point.
@@ -119,15 +222,60 @@ class HarmonyIndex:
             If None, equal weights (1.0) are used for all channels
         falloff_type : str
             The type of falloff function to use ('gaussian' or 'inverse_square')
+        spec : RenderSpec, optional
+            Complete rendering specification; when given it overrides harmonyState,
+            falloff_type and this renderer's own settings
+        engine : str
+            'reference' (per-pixel loop), 'matrix' (SourceEngine K=3 preset) or
+            'pipeline' (shared RenderPipeline, recomputing only stages whose inputs changed),
+            which all produce the same pixels, or 'adaptive' (coarse grid, interpolated
+            where smooth; within adaptive_render.DEFAULT_TOLERANCE). The pipeline and
+            adaptive engines take canonical RenderSpecs, so settings a spec would round
+            are rendered by the matrix engine instead
             
         Returns:
         --------
         PIL.Image.Image
             The rendered Marshall Triangle image
         """
-        # Set default harmony state if not provided
-        if harmonyState is None:
-            harmonyState = {'r': 1.0, 'g': 1.0, 'b': 1.0}
+        if engine not in RENDER_ENGINES:
+            raise ValueError(f"Unknown render engine '{engine}', expected one of {RENDER_ENGINES}")
+        if spec is not None:
+            if not self._specifies_exactly(spec, spec.harmony_state):
+                return HarmonyIndex.from_spec(spec).render(spec=spec, engine=engine)
+            harmonyState, falloff_type = spec.harmony_state, spec.falloff_type
+        elif engine in ('pipeline', 'adaptive') and not self._specifies_exactly(self.to_spec(harmonyState, falloff_type), harmonyState):
+            engine = 'matrix'
+
+        start = time.perf_counter()
+        if engine == 'matrix':
+            img = SourceEngine.marshall_triangle(self, falloff_type).render(harmonyState, self.calibrated_white_point)
+        elif engine == 'pipeline':
+            # Imported here: render_pipeline builds on this module
+            import render_pipeline
+            img = render_pipeline.shared_pipeline().render(self.to_spec(harmonyState, falloff_type))
+        elif engine == 'adaptive':
+            # Imported here for the same reason
+            import adaptive_render
+            pixels, _ = adaptive_render.render_adaptive_array(self.to_spec(harmonyState, falloff_type))
+            img = Image.fromarray(pixels).filter(ImageFilter.GaussianBlur(radius=self.edge_blur))
+        else:
+            img = self._render_reference(harmonyState, falloff_type)
+        metrics.observe_render(time.perf_counter() - start, self.size, falloff_type, engine)
+        return img
+
+    def _specifies_exactly(self, spec: RenderSpec, harmonyState: Optional[Dict[str, float]]) -> bool:
+        # Whether spec holds this renderer's settings and the (clamped) state without rounding them
+        state = harmonyState or {}
+        return (spec.size == self.size and spec.sigma == self.sigma and spec.intensity == self.intensity
+                and spec.edge_blur == self.edge_blur and spec.edge_factor == self.edge_factor
+                and spec.calibrated_white_point == self.calibrated_white_point
+                and spec.state == tuple(max(0.0, min(1.0, state.get(key, 1.0))) for key in ['r', 'g', 'b']))
+
+    def _render_reference(self, harmonyState: Optional[Dict[str, float]], falloff_type: str) -> Image.Image:
+        # The per-pixel loop that defines the model
+        # Set default harmony state if not provided; work on a copy so the caller's dict is not modified
+        harmonyState = dict(harmonyState) if harmonyState is not None else {'r': 1.0, 'g': 1.0, 'b': 1.0}
         
         # Ensure all values are within valid range
         for key in ['r', 'g', 'b']:
@@ -136,21 +284,11 @@ class HarmonyIndex:
             harmonyState[key] = max(0.0, min(1.0, harmonyState[key]))  # Clamp to [0, 1]
         
         # Apply calibration by normalizing the harmonyState relative to the calibrated white point
-        # This will make the calibrated white point appear balanced (white) at the center
-        normalized_state = {}
-        
-        # Calculate the max calibration value to maintain proper scaling
-        max_calibration = max(self.calibrated_white_point.values())
-        
-        for key in ['r', 'g', 'b']:
-            # Prevent division by zero
-            if self.calibrated_white_point[key] < 0.01:
-                normalized_state[key] = harmonyState[key] * max_calibration
-            else:
-                # Scale the input state by the reciprocal of the calibrated white point
-                # and multiply by the max to maintain proper brightness
-                # This makes it so that when harmonyState == calibrated_white_point, the result is balanced (1.0, 1.0, 1.0)
-                normalized_state[key] = harmonyState[key] * (max_calibration / self.calibrated_white_point[key])
+        # This will make the calibrated white point appear balanced (white) at the center:
+        # each channel is scaled by max_calibration / calibrated value, so when
+        # harmonyState == calibrated_white_point the result is balanced (1.0, 1.0, 1.0)
+        calibration_scale = self._calibration_scale()
+        normalized_state = {key: harmonyState[key] * calibration_scale[i] for i, key in enumerate(['r', 'g', 'b'])}
         
         xg, yg = self._create_coordinate_grid()
         vertices = self._define_triangle()
@@ -209,6 +347,311 @@ class HarmonyIndex:
             pass
 
         return img
+
+    def _state_weights(self, harmonyState: Optional[Dict[str, float]] = None) -> np.ndarray:
+        # Clamped r, g, b state (missing channels are 1) scaled by the calibration
+        state = dict(harmonyState) if harmonyState is not None else {}
+        weights = np.array([max(0.0, min(1.0, state.get(key, 1.0))) for key in ['r', 'g', 'b']])
+        return weights * self._calibration_scale()
+
+    def _unclipped_colors(self, x, y, weights: np.ndarray, falloff_type='gaussian'):
+        # The colour model at points before the triangle mask and clipping, so smooth across the
+        # edges; weights are (3,) or one row per point. Also returns each point's peak channel
+        midpoints = self._calculate_midpoints(self._define_triangle())
+        falloff = self._gaussian_falloff if falloff_type == 'gaussian' else self._inverse_square_falloff
+
+        # Sources map one-to-one onto the red, green and blue channels
+        rgb = np.stack([falloff(x, y, mx, my) for mx, my in midpoints], axis=-1) * weights
+        peak = rgb.max(axis=-1)
+        norm = np.minimum(np.maximum(peak, 1e-10), 1.0)
+        mask_norm = norm > 0.1
+        rgb[mask_norm] /= norm[mask_norm, None]
+        return rgb, peak
+
+    def query_colors(self, x, y, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian',
+                     states=None, chunk_size: int = DEFAULT_QUERY_CHUNK, as_uint8: bool = False) -> np.ndarray:
+        """
+        Evaluate the final normalized Marshall Triangle colour at arbitrary points.
+
+        This is the per-pixel colour model of render (falloff, calibration and
+        max-value normalization) evaluated directly at the given coordinates,
+        vectorized over all points and processed in chunks to bound memory.
+        Raster post-processing (edge attenuation and blur) is not applied.
+
+        Parameters:
+        -----------
+        x, y : array-like
+            Coordinates in the renderer's [-1, 1] space (y up), any matching shape
+        harmonyState : Dict[str, float], optional
+            State vector shared by all points; ignored when states is given
+        falloff_type : str
+            The type of falloff function to use ('gaussian' or 'inverse_square')
+        states : array-like, optional
+            Per-point state vectors of shape (..., 3) in r, g, b order
+        chunk_size : int
+            Maximum number of points evaluated per vectorized pass (at least 1)
+        as_uint8 : bool
+            Return 8-bit colours quantized exactly as render does
+
+        Returns:
+        --------
+        numpy.ndarray
+            Colours of shape x.shape + (3,), floats in [0, 1] (or uint8);
+            points outside the triangle are black
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        shape = x.shape
+        x, y = x.ravel(), y.ravel()
+
+        if states is None:
+            weights = self._state_weights(harmonyState)
+        else:
+            states = np.asarray(states, dtype=np.float64)
+            if states.shape != shape + (3,):
+                raise ValueError(f"states must have shape {shape + (3,)}, got {states.shape}")
+            weights = np.clip(states.reshape(-1, 3), 0.0, 1.0) * self._calibration_scale()
+
+        vertices = self._define_triangle()
+
+        colors = np.zeros((x.size, 3))
+        for start in range(0, x.size, chunk_size):
+            stop = min(start + chunk_size, x.size)
+            xc, yc = x[start:stop], y[start:stop]
+            chunk_weights = weights if weights.ndim == 1 else weights[start:stop]
+
+            # Points outside are zero before normalization too, which leaves them unscaled
+            rgb, _ = self._unclipped_colors(xc, yc, chunk_weights, falloff_type)
+            rgb[~self._inside_triangle_mask(xc, yc, vertices)] = 0.0
+            colors[start:stop] = np.clip(rgb, 0, 1)
+
+        colors = colors.reshape(shape + (3,))
+        if as_uint8:
+            return (colors * 255).astype(np.uint8)
+        return colors
+
+    def query_barycentric(self, weights, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian',
+                          states=None, chunk_size: int = DEFAULT_QUERY_CHUNK, as_uint8: bool = False) -> np.ndarray:
+        """
+        Evaluate the final normalized colour at barycentric coordinates.
+
+        Parameters:
+        -----------
+        weights : array-like
+            Barycentric coordinates of shape (..., 3) relative to the top,
+            bottom-left and bottom-right vertices; rows are normalized to sum to 1
+        harmonyState, falloff_type, states, chunk_size, as_uint8
+            As for query_colors
+
+        Returns:
+        --------
+        numpy.ndarray
+            Colours of shape weights.shape
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape[-1] != 3:
+            raise ValueError(f"barycentric weights must have a trailing dimension of 3, got {weights.shape}")
+        weights = weights / np.maximum(weights.sum(axis=-1, keepdims=True), 1e-12)
+        xy = weights @ np.array(self._define_triangle())
+        return self.query_colors(xy[..., 0], xy[..., 1], harmonyState=harmonyState, falloff_type=falloff_type,
+                                 states=states, chunk_size=chunk_size, as_uint8=as_uint8)
+
+    def region_statistics(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian',
+                          states=None, tolerance: float = DEFAULT_REGION_TOLERANCE, max_depth: int = 12,
+                          batch_size: int = 256) -> 'RegionStatistics':
+        """
+        Dominance fractions, centroid colour and white point without rendering an image.
+
+        Dominance is measured on the calibrated source fields: a point is
+        dominated by the source whose weighted falloff is strongest there,
+        which max-value normalization does not change. With gaussian falloff
+        the log-ratio of two fields is linear in position, so each source's
+        region is the triangle clipped by two half-planes and its area is
+        exact; the white point (where the three fields are equal) is a 2x2
+        linear solve. Inverse-square regions are bounded by circular arcs and
+        are estimated by adaptive subdivision, in one vectorized batch per
+        level across all states, refining only cells whose corners disagree
+        until a state's undecided area is within tolerance. The centroid
+        colour is query_colors at the centroid.
+
+        Parameters:
+        -----------
+        harmonyState : Dict[str, float], optional
+            State vector; ignored when states is given
+        falloff_type : str
+            The type of falloff function to use ('gaussian' or 'inverse_square')
+        states : array-like, optional
+            (n, 3) state vectors in r, g, b order, evaluated together
+        tolerance : float
+            Inverse square: largest undecided area, as a fraction of the triangle, per state
+        max_depth : int
+            Inverse square: refinement levels never exceeded (the bound reports any shortfall)
+        batch_size : int
+            Inverse square: states refined together; bounds memory for large batches
+
+        Returns:
+        --------
+        RegionStatistics
+            Arrays with one row per state
+        """
+        if states is None:
+            state = dict(harmonyState) if harmonyState is not None else {}
+            states = [[state.get(key, 1.0) for key in ['r', 'g', 'b']]]
+        states = np.clip(np.asarray(states, dtype=np.float64).reshape(-1, 3), 0.0, 1.0)
+        weights = states * self._calibration_scale()
+
+        vertices = np.array(self._define_triangle())
+        midpoints = np.array(self._calculate_midpoints(self._define_triangle()))
+        centroid = vertices.mean(axis=0)
+
+        dominance = np.zeros((len(states), 3))
+        dominance_error = np.zeros(len(states))
+        if falloff_type == 'gaussian':
+            dominance = self._gaussian_dominance(weights, vertices, midpoints)
+        else:
+            for start in range(0, len(states), max(1, batch_size)):
+                stop = start + max(1, batch_size)
+                dominance[start:stop], dominance_error[start:stop] = self._dominance_fractions(
+                    weights[start:stop], vertices, midpoints, falloff_type, tolerance, max_depth)
+
+        centroid_color = self.query_colors(np.full(len(states), centroid[0]), np.full(len(states), centroid[1]),
+                                           falloff_type=falloff_type, states=states)
+        white_point = self._white_point(weights, midpoints, falloff_type)
+        side = np.hypot(*(vertices[1] - vertices[2]))
+        drift = np.hypot(*(white_point - centroid).T) / side
+        inside = np.isfinite(drift) & self._inside_triangle_mask(white_point[:, 0], white_point[:, 1],
+                                                                  self._define_triangle())
+        return RegionStatistics(states=states, dominance=dominance, dominance_error=dominance_error,
+                                centroid_color=centroid_color, white_point=white_point,
+                                white_point_drift=drift, white_point_inside=inside)
+
+    def _source_scores(self, points, weights, midpoints, falloff_type):
+        # (n, 3) values ordered like each weighted source field at n points (per-point weights);
+        # intensity scales every source alike and is left out
+        if falloff_type == 'gaussian':
+            # log w_k - |p - m_k|^2 / (2 s^2), less the |p|^2 term all sources share: linear in p
+            spread_sq = (self.sigma * GAUSSIAN_SPREAD)**2
+            with np.errstate(divide='ignore'):
+                offset = np.log(weights) - (midpoints**2).sum(axis=1) / (2 * spread_sq)
+            return points @ (midpoints.T / spread_sq) + offset
+        dist_sq = ((points[:, None, :] - midpoints)**2).sum(axis=-1)
+        return weights / (dist_sq + INVERSE_SQUARE_SOFTENING)
+
+    def _gaussian_dominance(self, weights, vertices, midpoints):
+        # (n, 3) exact area fractions: source k's region is the triangle clipped to s_k >= s_j for
+        # both other sources j, each a half-plane a . p + c >= 0 since the scores are linear in p
+        n = len(weights)
+        spread_sq = (self.sigma * GAUSSIAN_SPREAD)**2
+        with np.errstate(divide='ignore'):
+            offset = np.log(weights) - (midpoints**2).sum(axis=1) / (2 * spread_sq)
+        triangle = np.broadcast_to(vertices, (n, 3, 2))
+        total = _polygon_area(vertices[None])[0]
+
+        dominance = np.zeros((n, 3))
+        for k in range(3):
+            polygons = triangle
+            for j in {0, 1, 2} - {k}:
+                a = np.broadcast_to((midpoints[k] - midpoints[j]) / spread_sq, (n, 2)).copy()
+                with np.errstate(invalid='ignore'):
+                    c = offset[:, k] - offset[:, j]
+                # A source with zero weight never stops another from winning; its own area is zeroed below
+                unconstrained = (weights[:, j] == 0) | (weights[:, k] == 0)
+                a[unconstrained], c[unconstrained] = 0.0, 1.0
+                polygons = _clip_half_plane(polygons, a, c)
+            dominance[:, k] = np.where(weights[:, k] > 0, _polygon_area(polygons) / total, 0.0)
+        return dominance
+
+    def _dominance_fractions(self, weights, vertices, midpoints, falloff_type, tolerance, max_depth, min_depth=3):
+        # Adaptive subdivision behind region_statistics; returns ((n, 3) fractions, (n,) error bounds).
+        # Inverse-square regions are bounded by circular arcs rather than lines, so a cell whose
+        # corners agree is assumed to lie in one region; min_depth keeps cells small enough for
+        # that to hold in practice, and the bound covers the cells whose corners disagree.
+        n = len(weights)
+        dominance = np.zeros(n * 3)
+        error = np.zeros(n)
+
+        def labels_at(points, point_owner):
+            return self._source_scores(points, weights[point_owner], midpoints, falloff_type).argmax(axis=1)
+
+        # States with every weight zero render black and are dominated by no source
+        owner = np.flatnonzero((weights > 0).any(axis=1))
+        cells = np.broadcast_to(vertices, (len(owner), 3, 2)).copy()
+        # Corner labels are carried down to the children, so each split evaluates only its three edge midpoints
+        labels = labels_at(cells.reshape(-1, 2), np.repeat(owner, 3)).reshape(-1, 3)
+
+        for depth in range(max_depth + 1):
+            area = 0.25 ** depth
+            if depth >= min_depth:
+                uniform = (labels == labels[:, :1]).all(axis=1)
+                dominance += np.bincount(owner[uniform] * 3 + labels[uniform, 0], minlength=n * 3) * area
+                cells, owner, labels = cells[~uniform], owner[~uniform], labels[~uniform]
+
+                undecided = np.bincount(owner, minlength=n) * area
+                settle = (undecided[owner] <= tolerance) | (depth == max_depth)
+                if settle.any():
+                    votes = np.concatenate([labels[settle],
+                                            labels_at(cells[settle].mean(axis=1), owner[settle])[:, None]], axis=1)
+                    for k in range(3):
+                        dominance[k::3] += np.bincount(owner[settle], weights=(votes == k).mean(axis=1),
+                                                       minlength=n) * area
+                    error += np.bincount(owner[settle], minlength=n) * area
+                    cells, owner, labels = cells[~settle], owner[~settle], labels[~settle]
+            if len(cells) == 0 or depth == max_depth:
+                break
+
+            a, b, c = cells[:, 0], cells[:, 1], cells[:, 2]
+            mids = np.stack([(a + b) / 2, (b + c) / 2, (c + a) / 2], axis=1)
+            mid_labels = labels_at(mids.reshape(-1, 2), np.repeat(owner, 3)).reshape(-1, 3)
+            ab, bc, ca = mids[:, 0], mids[:, 1], mids[:, 2]
+            la, lb, lc = labels.T
+            lab, lbc, lca = mid_labels.T
+            cells = np.concatenate([np.stack(corners, axis=1)
+                                    for corners in ((a, ab, ca), (ab, b, bc), (ca, bc, c), (ab, bc, ca))])
+            labels = np.concatenate([np.stack(corners, axis=1)
+                                     for corners in ((la, lab, lca), (lab, lb, lbc), (lca, lbc, lc), (lab, lbc, lca))])
+            owner = np.tile(owner, 4)
+        return dominance.reshape(n, 3), error
+
+    def _white_point(self, weights, midpoints, falloff_type, iterations=50):
+        # (n, 2) point where the three weighted source fields are equal; nan where a weight is
+        # zero or (inverse square) Newton's method does not converge
+        n = len(weights)
+        points = np.full((n, 2), np.nan)
+        valid = (weights > 0).all(axis=1)
+        if not valid.any():
+            return points
+        w = weights[valid]
+        sq = (midpoints**2).sum(axis=1)
+
+        if falloff_type == 'gaussian':
+            # log w_i - |p - m_i|^2 / (2 s^2) equal for i and j is linear in p:
+            # p . (m_i - m_j) = (|m_i|^2 - |m_j|^2) / 2 - s^2 log(w_i / w_j)
+            spread_sq = (self.sigma * GAUSSIAN_SPREAD)**2
+            A = np.array([midpoints[0] - midpoints[1], midpoints[0] - midpoints[2]])
+            rhs = np.stack([(sq[0] - sq[1]) / 2 - spread_sq * np.log(w[:, 0] / w[:, 1]),
+                            (sq[0] - sq[2]) / 2 - spread_sq * np.log(w[:, 0] / w[:, 2])], axis=-1)
+            points[valid] = np.linalg.solve(A, rhs.T).T
+            return points
+
+        # w_r (d_j + c) = w_j (d_r + c) for j = g, b: two quadrics, solved by Newton from the centroid
+        c = INVERSE_SQUARE_SOFTENING
+        p = np.broadcast_to(midpoints.mean(axis=0), (len(w), 2)).copy()
+        for _ in range(iterations):
+            d = ((p[:, None, :] - midpoints)**2).sum(axis=-1)
+            grad = 2 * (p[:, None, :] - midpoints)                  # (n, 3 sources, 2)
+            F = np.stack([w[:, 0] * (d[:, j] + c) - w[:, j] * (d[:, 0] + c) for j in (1, 2)], axis=-1)
+            J = np.stack([w[:, 0, None] * grad[:, j] - w[:, j, None] * grad[:, 0] for j in (1, 2)], axis=1)
+            det = J[:, 0, 0] * J[:, 1, 1] - J[:, 0, 1] * J[:, 1, 0]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                step = np.stack([(J[:, 1, 1] * F[:, 0] - J[:, 0, 1] * F[:, 1]) / det,
+                                 (J[:, 0, 0] * F[:, 1] - J[:, 1, 0] * F[:, 0]) / det], axis=-1)
+            p = p - step
+        d = ((p[:, None, :] - midpoints)**2).sum(axis=-1)
+        residual = np.abs([w[:, 0] * (d[:, j] + c) - w[:, j] * (d[:, 0] + c) for j in (1, 2)]).max(axis=0)
+        p[~(residual <= 1e-9 * w.max(axis=1))] = np.nan
+        points[valid] = p
+        return points
         
     def save_image(self, filename="marshall_triangle.png", harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian'):
         """
@@ -228,7 +671,7 @@ class HarmonyIndex:
         img.save(filename)
         return img
     
-    def get_image_bytes(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian', format='PNG'):
+    def get_image_bytes(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian', format='PNG', options: Optional[EncodeOptions] = None):
         """
         Render the Marshall Triangle and return as bytes.
         
@@ -241,6 +684,8 @@ class HarmonyIndex:
             The type of falloff function to use ('gaussian' or 'inverse_square')
         format : str
             The image format (e.g., 'PNG', 'JPEG')
+        options : EncodeOptions, optional
+            Codec and compression settings; when given, these take precedence over format
             
         Returns:
         --------
@@ -248,11 +693,13 @@ class HarmonyIndex:
             The image as bytes
         """
         img = self.render(harmonyState=harmonyState, falloff_type=falloff_type)
+        if options is not None:
+            return encode_image(img, options).data
         buf = io.BytesIO()
         img.save(buf, format=format)
         return buf.getvalue()
         
-    def plot_with_labels(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian'):
+    def plot_with_labels(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian', img: Optional[Image.Image] = None):
         """
         Plot the Marshall Triangle with labels for vertices and midpoints.
         
@@ -263,77 +710,19 @@ class HarmonyIndex:
             {'r': float, 'g': float, 'b': float} with values between 0.0 and 1.0
         falloff_type : str
             The type of falloff function to use ('gaussian' or 'inverse_square')
+        img : PIL.Image.Image, optional
+            An existing rendering of this configuration to reuse instead of rendering again
             
         Returns:
         --------
         fig : matplotlib.figure.Figure
-            The matplotlib figure
+            A new figure owned by the caller (see labeled_image for the reused one)
         """
-        img = self.render(harmonyState=harmonyState, falloff_type=falloff_type)
-        
-        # Create figure with black background
-        fig, ax = plt.subplots(figsize=(8, 8), facecolor='black')
-        ax.set_facecolor('black')
-        ax.imshow(img)
-        
-        # Define triangle
-        vertices = self._define_triangle()
-        midpoints = self._calculate_midpoints(vertices)
-        
-        # Scale coordinates to image space
-        def scale_coord(coord):
-            x, y = coord
-            # Map from [-1, 1] to [0, self.size-1]
-            x_scaled = int((x + 1) * (self.size - 1) / 2)
-            # In image coords, y increases downward, so we invert the y coordinate
-            y_scaled = int((1 - y) * (self.size - 1) / 2)
-            return x_scaled, y_scaled
-        
-        # Get scaled coordinates
-        top_vertex_scaled = scale_coord(vertices[0])
-        bottom_left_scaled = scale_coord(vertices[1])
-        bottom_right_scaled = scale_coord(vertices[2])
-        
-        red_midpoint_scaled = scale_coord(midpoints[0])   # Left side midpoint (Privacy)
-        green_midpoint_scaled = scale_coord(midpoints[1])  # Right side midpoint (Performance)
-        blue_midpoint_scaled = scale_coord(midpoints[2])   # Bottom side midpoint (Personalization)
-        
-        # Add vertex labels with adjusted positions and line breaks
-        ax.annotate("Yellow\n(Privacy+Performance)", (top_vertex_scaled[0], top_vertex_scaled[1]), 
-                   fontsize=10, ha='center', va='center', xytext=(0, -25), textcoords='offset points',
-                   color='white', bbox=dict(boxstyle="round,pad=0.3", fc='black', alpha=0.7))
-        
-        ax.annotate("Magenta\n(Privacy+Personalization)", (bottom_left_scaled[0], bottom_left_scaled[1]), 
-                   fontsize=10, ha='center', va='center', xytext=(-25, 20), textcoords='offset points',
-                   color='white', bbox=dict(boxstyle="round,pad=0.3", fc='black', alpha=0.7))
-        
-        ax.annotate("Cyan\n(Performance+Personalization)", (bottom_right_scaled[0], bottom_right_scaled[1]), 
-                   fontsize=10, ha='center', va='center', xytext=(25, 20), textcoords='offset points',
-                   color='white', bbox=dict(boxstyle="round,pad=0.3", fc='black', alpha=0.7))
-        
-        # Add midpoint labels with adjusted positions
-        ax.annotate("Red\n(Privacy)", (red_midpoint_scaled[0], red_midpoint_scaled[1]), 
-                   fontsize=10, ha='center', va='center', xytext=(30, -5), textcoords='offset points',
-                   color='white', bbox=dict(boxstyle="round,pad=0.3", fc='black', alpha=0.7))
-        
-        ax.annotate("Green\n(Performance)", (green_midpoint_scaled[0], green_midpoint_scaled[1]), 
-                   fontsize=10, ha='center', va='center', xytext=(-30, -5), textcoords='offset points',
-                   color='white', bbox=dict(boxstyle="round,pad=0.3", fc='black', alpha=0.7))
-        
-        ax.annotate("Blue\n(Personalization)", (blue_midpoint_scaled[0], blue_midpoint_scaled[1]), 
-                   fontsize=10, ha='center', va='center', xytext=(0, 30), textcoords='offset points',
-                   color='white', bbox=dict(boxstyle="round,pad=0.3", fc='black', alpha=0.7))
-        
-        # Add center label
-        center_scaled = scale_coord((0, 0))
-        ax.annotate("White\n(Balance)", (center_scaled[0], center_scaled[1]), 
-                   fontsize=10, ha='center', va='center',
-                   color='black', bbox=dict(boxstyle="round,pad=0.3", fc='white', alpha=0.7))
-        
-        ax.axis('off')
-        plt.tight_layout()
-        
-        return fig
+        if img is None:
+            img = self.render(harmonyState=harmonyState, falloff_type=falloff_type)
+        figure = TriangleFigure(self.size, 'labeled')
+        figure.image.set_data(np.asarray(img))
+        return figure.figure
         
     def render_to_matplotlib(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian'):
         """
@@ -350,19 +739,335 @@ class HarmonyIndex:
         Returns:
         --------
         fig : matplotlib.figure.Figure
-            The matplotlib figure
+            A new figure owned by the caller (see labeled_image for the reused one)
         """
         img = self.render(harmonyState=harmonyState, falloff_type=falloff_type)
-        
-        # Create figure with clean margins (no padding)
-        fig, ax = plt.subplots(figsize=(8, 8))
-        
-        # Remove axis and any padding/margins
-        ax.imshow(img)
+        figure = TriangleFigure(self.size, 'plain')
+        figure.image.set_data(np.asarray(img))
+        return figure.figure
+
+    def labeled_image(self, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian',
+                      img: Optional[Image.Image] = None, layout: str = 'labeled', dpi: int = 100) -> Image.Image:
+        """
+        Rasterize the plot_with_labels (or render_to_matplotlib, layout='plain') diagram to an image.
+
+        The figure is built once per size, layout and dpi and reused: later
+        calls only replace its image data and redraw (see shared_figure).
+        Safe to call from any thread.
+
+        Parameters:
+        -----------
+        harmonyState : Dict[str, float], optional
+            State vector, used when img is not given
+        falloff_type : str
+            The type of falloff function to use, used when img is not given
+        img : PIL.Image.Image, optional
+            An existing rendering of this configuration to reuse instead of rendering again
+        layout : str
+            'labeled' or 'plain'
+        dpi : int
+            Resolution of the 8 x 8 inch figure
+
+        Returns:
+        --------
+        PIL.Image.Image
+            The RGBA diagram, 8 * dpi pixels square
+        """
+        if img is None:
+            img = self.render(harmonyState=harmonyState, falloff_type=falloff_type)
+        return Image.fromarray(shared_figure(self.size, layout, dpi).rasterize(img), 'RGBA')
+
+def _clip_half_plane(polygons, a, c):
+    # Clip (n, V, 2) convex polygons to a . p + c >= 0, returning (n, 2V, 2). Each edge emits its
+    # start vertex and, if it crosses the line, the crossing; vertices outside are projected onto
+    # the line instead of dropped, and collinear points leave the shoelace area unchanged, so
+    # every polygon keeps the same vertex count and the batch stays one array.
+    g = (polygons * a[:, None, :]).sum(axis=-1) + c[:, None]
+    inside = g >= 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        projected = polygons - (g / (a**2).sum(axis=-1)[:, None])[..., None] * a[:, None, :]
+        kept = np.where(inside[..., None], polygons, projected)
+        following, g_following = np.roll(polygons, -1, axis=1), np.roll(g, -1, axis=1)
+        t = g / (g - g_following)
+        crossing = polygons + t[..., None] * (following - polygons)
+    second = np.where((inside != (g_following >= 0))[..., None], crossing, kept)
+    return np.stack([kept, second], axis=2).reshape(len(polygons), -1, 2)
+
+
+def _polygon_area(polygons):
+    # Shoelace area of (n, V, 2) polygons
+    x, y = polygons[..., 0], polygons[..., 1]
+    return np.abs((x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y).sum(axis=1)) / 2
+
+
+@dataclass(frozen=True)
+class RegionStatistics:
+    """
+    Statistics of the Marshall Triangle for a batch of states (see HarmonyIndex.region_statistics).
+
+    Attributes:
+    -----------
+    states : np.ndarray
+        (n, 3) clamped state vectors, r, g, b
+    dominance : np.ndarray
+        (n, 3) fraction of the triangle's area where each source is the strongest
+    dominance_error : np.ndarray
+        (n,) bound on the absolute error of each dominance fraction (0 for gaussian falloff)
+    centroid_color : np.ndarray
+        (n, 3) final colour at the triangle's centroid, in [0, 1]
+    white_point : np.ndarray
+        (n, 2) point where the three calibrated fields are equal, nan if there is none
+    white_point_drift : np.ndarray
+        (n,) distance from the white point to the centroid, as a fraction of the edge length
+    white_point_inside : np.ndarray
+        (n,) whether the white point lies inside the triangle
+    """
+    states: np.ndarray
+    dominance: np.ndarray
+    dominance_error: np.ndarray
+    centroid_color: np.ndarray
+    white_point: np.ndarray
+    white_point_drift: np.ndarray
+    white_point_inside: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def summary(self, index: int = 0) -> Dict[str, object]:
+        """One state's statistics as plain Python values."""
+        white_point = self.white_point[index]
+        return {
+            'dominance': dict(zip(['r', 'g', 'b'], self.dominance[index].tolist())),
+            'dominance_error': float(self.dominance_error[index]),
+            'centroid_color': '#{:02x}{:02x}{:02x}'.format(*(self.centroid_color[index] * 255).astype(int)),
+            'white_point': tuple(white_point.tolist()) if np.isfinite(white_point).all() else None,
+            'white_point_drift': float(self.white_point_drift[index]),
+            'white_point_inside': bool(self.white_point_inside[index]),
+        }
+
+
+@dataclass(frozen=True)
+class TriangleGeometry:
+    """
+    Size-dependent geometry shared by every rendering at one size.
+
+    Attributes:
+    -----------
+    mask : np.ndarray
+        (size, size) bool, pixels inside the triangle (image orientation)
+    edges : np.ndarray
+        (size, size) bool, the one-pixel ring just outside the mask
+    dist_sq : np.ndarray
+        (n_inside, 3) squared distances from every inside pixel to the three midpoint sources
+    """
+    mask: np.ndarray
+    edges: np.ndarray
+    dist_sq: np.ndarray
+
+
+# Every TriangleGeometry still alive, whether cached or held by a renderer (see geometry_bytes)
+_LIVE_GEOMETRIES = weakref.WeakValueDictionary()
+
+
+@functools.lru_cache(maxsize=8)
+def triangle_geometry(size: int) -> TriangleGeometry:
+    """
+    Compute (once per process and size) the geometry a FrameRenderer needs.
+
+    The arrays are shared between renderers and marked read-only.
+    """
+    harmony = HarmonyIndex(size=size)
+    xg, yg = harmony._create_coordinate_grid()
+    # flip y to match image orientation, as render does
+    yg = yg[::-1]
+    vertices = harmony._define_triangle()
+    mask = harmony._inside_triangle_mask(xg, yg, vertices)
+    edges = ndimage.binary_dilation(mask) & ~mask
+
+    x, y = xg[mask], yg[mask]
+    dist_sq = np.stack([(x - mx)**2 + (y - my)**2 for mx, my in harmony._calculate_midpoints(vertices)], axis=-1)
+    for array in (mask, edges, dist_sq):
+        array.flags.writeable = False
+    geometry = TriangleGeometry(mask=mask, edges=edges, dist_sq=dist_sq)
+    _LIVE_GEOMETRIES[id(geometry)] = geometry
+    return geometry
+
+
+def geometry_bytes() -> int:
+    """Memory held by triangle geometries still alive, cached by triangle_geometry or held elsewhere."""
+    return sum(geometry.mask.nbytes + geometry.edges.nbytes + geometry.dist_sq.nbytes
+               for geometry in list(_LIVE_GEOMETRIES.values()))
+
+
+class FrameRenderer:
+    """
+    Render a sequence of Marshall Triangle frames that share one geometry.
+
+    The coordinate grid, triangle mask, edge ring and squared distances from
+    every inside pixel to the three midpoint sources are computed once per
+    size and process (see triangle_geometry); each
+    frame then only evaluates the falloff (cached per sigma), mixes the state
+    vector and normalizes. Frames match HarmonyIndex.render for the same
+    parameters.
+
+    Parameters:
+    -----------
+    harmony : HarmonyIndex
+        Renderer whose size, sigma, intensity, edge and calibration settings are the defaults
+    falloff_type : str
+        The type of falloff function to use ('gaussian' or 'inverse_square')
+    """
+
+    _MAX_CACHED_FIELDS = 8
+
+    def __init__(self, harmony: HarmonyIndex, falloff_type='gaussian'):
+        self.harmony = harmony
+        self.falloff_type = falloff_type
+        size = harmony.size
+
+        geometry = triangle_geometry(size)
+        self.mask = geometry.mask
+        self.edges = geometry.edges
+        self._dist_sq = geometry.dist_sq
+        self._fields = {}
+        self._image = np.zeros((size, size, 3), dtype=np.uint8)
+
+    def _source_fields(self, sigma: float):
+        fields = self._fields.get(sigma)
+        if fields is None:
+            fields = source_falloff(self._dist_sq, self.falloff_type, sigma, self.harmony.intensity)
+            if len(self._fields) >= self._MAX_CACHED_FIELDS:
+                self._fields.pop(next(iter(self._fields)))
+            self._fields[sigma] = fields
+        return fields
+
+    def render_frame(self, harmonyState: Optional[Dict[str, float]] = None,
+                     calibration: Optional[Dict[str, float]] = None, sigma: Optional[float] = None) -> Image.Image:
+        """
+        Render one frame.
+
+        Parameters:
+        -----------
+        harmonyState : Dict[str, float], optional
+            State vector {'r', 'g', 'b'}; missing channels default to 1.0
+        calibration : Dict[str, float], optional
+            White point for this frame; defaults to the renderer's calibration
+        sigma : float, optional
+            Gaussian sigma for this frame; defaults to the renderer's sigma
+
+        Returns:
+        --------
+        PIL.Image.Image
+            The rendered frame
+        """
+        start = time.perf_counter()
+        state = harmonyState or {}
+        weights = np.array([max(0.0, min(1.0, state.get(key, 1.0))) for key in ['r', 'g', 'b']])
+        if calibration is not None:
+            calibration = {key: max(0.01, min(1.0, calibration.get(key, 1.0))) for key in ['r', 'g', 'b']}
+        weights = weights * self.harmony._calibration_scale(calibration)
+
+        rgb = self._source_fields(self.harmony.sigma if sigma is None else sigma) * weights
+        # The edge ring lies just outside the mask, where every channel is zero,
+        # so render's edge attenuation leaves these values unchanged
+        norm = np.minimum(np.maximum(rgb.max(axis=-1), 1e-10), 1.0)
+        mask_norm = norm > 0.1
+        rgb[mask_norm] /= norm[mask_norm, None]
+
+        self._image[self.mask] = (np.clip(rgb, 0, 1) * 255).astype(np.uint8)
+        img = Image.fromarray(self._image).filter(ImageFilter.GaussianBlur(radius=self.harmony.edge_blur))
+        metrics.observe_render(time.perf_counter() - start, self.harmony.size, self.falloff_type, 'frame')
+        return img
+
+
+# Figure layouts: 'labeled' (plot_with_labels) and 'plain' (render_to_matplotlib)
+FIGURE_LAYOUTS = ('labeled', 'plain')
+
+# Vertex, midpoint and centre annotations of the labelled layout: text, point in the
+# renderer's [-1, 1] space (a vertex index, a midpoint index or the centre), text offset in
+# points and text colour on its background
+_ANNOTATIONS = (
+    ("Yellow\n(Privacy+Performance)", ('vertex', 0), (0, -25), 'white', 'black'),
+    ("Magenta\n(Privacy+Personalization)", ('vertex', 1), (-25, 20), 'white', 'black'),
+    ("Cyan\n(Performance+Personalization)", ('vertex', 2), (25, 20), 'white', 'black'),
+    ("Red\n(Privacy)", ('midpoint', 0), (30, -5), 'white', 'black'),
+    ("Green\n(Performance)", ('midpoint', 1), (-30, -5), 'white', 'black'),
+    ("Blue\n(Personalization)", ('midpoint', 2), (0, 30), 'white', 'black'),
+    ("White\n(Balance)", ('centre', 0), (0, 0), 'black', 'white'),
+)
+
+
+class TriangleFigure:
+    """
+    A Marshall Triangle figure that is built once and redrawn with new images.
+
+    Built with matplotlib's object-oriented API on its own Agg canvas, so it
+    touches no pyplot state and is never registered with pyplot. The axes,
+    annotations and layout are created in the constructor; rasterize only
+    replaces the AxesImage data (set_data) and redraws into the canvas'
+    RGBA buffer, under a lock, so one figure can serve several threads.
+
+    Parameters:
+    -----------
+    size : int
+        Edge length of the images it shows (label positions depend on it)
+    layout : str
+        'labeled' (annotated, black background) or 'plain' (no labels or margins)
+    dpi : int
+        Resolution of the 8 x 8 inch figure
+    """
+
+    def __init__(self, size: int, layout: str = 'labeled', dpi: int = 100):
+        if layout not in FIGURE_LAYOUTS:
+            raise ValueError(f"Unknown figure layout '{layout}', expected one of {FIGURE_LAYOUTS}")
+        self.size = size
+        self.layout = layout
+        self._lock = threading.Lock()
+
+        if layout == 'labeled':
+            self.figure = Figure(figsize=(8, 8), dpi=dpi, facecolor='black')
+        else:
+            self.figure = Figure(figsize=(8, 8), dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        self.image = ax.imshow(np.zeros((size, size, 3), dtype=np.uint8))
         ax.axis('off')
-        plt.subplots_adjust(left=0, right=1, top=1, bottom=0, wspace=0, hspace=0)
-        
-        # Remove all figure padding
-        fig.patch.set_visible(False)
-        
-        return fig
+
+        if layout == 'labeled':
+            ax.set_facecolor('black')
+            self._annotate(ax)
+            self.figure.tight_layout()
+        else:
+            self.figure.subplots_adjust(left=0, right=1, top=1, bottom=0, wspace=0, hspace=0)
+            self.figure.patch.set_visible(False)
+
+    def _annotate(self, ax):
+        harmony = HarmonyIndex(size=self.size)
+        vertices = harmony._define_triangle()
+        points = {'vertex': vertices, 'midpoint': harmony._calculate_midpoints(vertices), 'centre': [(0, 0)]}
+
+        def scale_coord(coord):
+            # Map from [-1, 1] to [0, size-1]; in image coords y increases downward
+            x, y = coord
+            return int((x + 1) * (self.size - 1) / 2), int((1 - y) * (self.size - 1) / 2)
+
+        for text, (kind, index), offset, color, background in _ANNOTATIONS:
+            ax.annotate(text, scale_coord(points[kind][index]), fontsize=10, ha='center', va='center',
+                        xytext=offset, textcoords='offset points', color=color,
+                        bbox=dict(boxstyle="round,pad=0.3", fc=background, alpha=0.7))
+
+    def rasterize(self, img: Image.Image) -> np.ndarray:
+        """Show img and draw the figure; returns a copy of the (h, w, 4) uint8 RGBA buffer."""
+        pixels = np.asarray(img)
+        if pixels.shape[:2] != (self.size, self.size):
+            raise ValueError(f"Figure shows {self.size}px images, got {pixels.shape[1]}x{pixels.shape[0]}")
+        with self._lock:
+            self.image.set_data(pixels)
+            self.figure.canvas.draw()
+            return np.array(self.figure.canvas.buffer_rgba())
+
+
+@functools.lru_cache(maxsize=8)
+def shared_figure(size: int, layout: str = 'labeled', dpi: int = 100) -> TriangleFigure:
+    """The process-wide TriangleFigure for a size, layout and dpi."""
+    return TriangleFigure(size, layout, dpi)
@@ -0,0 +1,193 @@
+"""
+Marshall Triangle Output Encoding
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import io
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+import metrics
+
+CODECS = ('png', 'webp', 'jpeg')
+# 'adaptive' lets PIL choose a filter per row; the others force one PNG filter type for every row
+PNG_FILTERS = ('adaptive', 'none', 'sub', 'up', 'average', 'paeth')
+
+_MIME_TYPES = {'png': 'image/png', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+_EXTENSIONS = {'png': 'png', 'webp': 'webp', 'jpeg': 'jpg'}
+_PNG_FILTER_TYPES = {'none': 0, 'sub': 1, 'up': 2, 'average': 3, 'paeth': 4}
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    """
+    Codec and speed/size settings for encoding a rendered image.
+
+    Attributes:
+    -----------
+    codec : str
+        One of 'png', 'webp' or 'jpeg'
+    level : int
+        zlib compression level for PNG (0-9) or compression effort for WebP (0-6);
+        lower is faster, higher is smaller
+    png_filter : str
+        PNG row filter, one of PNG_FILTERS
+    lossless : bool
+        Encode WebP losslessly
+    quality : int
+        Quality for lossy WebP and JPEG (1-100)
+    """
+    codec: str = 'png'
+    level: int = 6
+    png_filter: str = 'adaptive'
+    lossless: bool = True
+    quality: int = 90
+
+    def __post_init__(self):
+        if self.codec not in CODECS:
+            raise ValueError(f"Unknown codec '{self.codec}', expected one of {CODECS}")
+        if self.png_filter not in PNG_FILTERS:
+            raise ValueError(f"Unknown PNG filter '{self.png_filter}', expected one of {PNG_FILTERS}")
+
+    @property
+    def mime(self) -> str:
+        return _MIME_TYPES[self.codec]
+
+    @property
+    def extension(self) -> str:
+        return _EXTENSIONS[self.codec]
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """Encoded image bytes together with what producing them cost."""
+    data: bytes
+    options: EncodeOptions
+    encode_seconds: float
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+    @property
+    def mime(self) -> str:
+        return self.options.mime
+
+    @property
+    def extension(self) -> str:
+        return self.options.extension
+
+    def summary(self) -> str:
+        """Short human-readable description of payload size and encode time."""
+        return f"{self.options.codec.upper()} · {self.nbytes / 1024:.1f} KB · encoded in {self.encode_seconds * 1000:.0f} ms"
+
+
+# Named speed/size trade-offs offered in the app
+PRESETS = {
+    'PNG (fast)': EncodeOptions(codec='png', level=1, png_filter='sub'),
+    'PNG (balanced)': EncodeOptions(codec='png', level=6),
+    'PNG (smallest)': EncodeOptions(codec='png', level=9, png_filter='paeth'),
+    'WebP (lossless)': EncodeOptions(codec='webp', level=4, lossless=True),
+    'WebP (lossy)': EncodeOptions(codec='webp', level=4, lossless=False, quality=85),
+    'JPEG': EncodeOptions(codec='jpeg', quality=90),
+}
+DEFAULT_PRESET = 'PNG (fast)'
+
+
+def _filter_rows(pixels: np.ndarray, filter_name: str) -> np.ndarray:
+    """Apply a single PNG filter type to every row, returning the filtered scanlines."""
+    height, width, channels = pixels.shape
+    rows = pixels.reshape(height, width * channels).astype(np.int16)
+
+    left = np.zeros_like(rows)
+    left[:, channels:] = rows[:, :-channels]
+    up = np.zeros_like(rows)
+    up[1:] = rows[:-1]
+
+    if filter_name == 'none':
+        filtered = rows
+    elif filter_name == 'sub':
+        filtered = rows - left
+    elif filter_name == 'up':
+        filtered = rows - up
+    elif filter_name == 'average':
+        filtered = rows - (left + up) // 2
+    else:
+        up_left = np.zeros_like(rows)
+        up_left[1:, channels:] = rows[:-1, :-channels]
+        p = left + up - up_left
+        pa, pb, pc = np.abs(p - left), np.abs(p - up), np.abs(p - up_left)
+        predictor = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, up_left))
+        filtered = rows - predictor
+
+    scanlines = np.empty((height, width * channels + 1), dtype=np.uint8)
+    scanlines[:, 0] = _PNG_FILTER_TYPES[filter_name]
+    scanlines[:, 1:] = (filtered & 0xFF).astype(np.uint8)
+    return scanlines
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def _encode_png_filtered(img: Image.Image, level: int, filter_name: str) -> bytes:
+    """Write a PNG with a fixed row filter, which PIL does not expose."""
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGB')
+    pixels = np.asarray(img)
+    height, width = pixels.shape[:2]
+    color_type = 6 if img.mode == 'RGBA' else 2
+
+    header = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+    idat = zlib.compress(_filter_rows(pixels, filter_name).tobytes(), level)
+    return b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header) + _png_chunk(b'IDAT', idat) + _png_chunk(b'IEND', b'')
+
+
+def encode_image(img: Image.Image, options: EncodeOptions = EncodeOptions()) -> EncodedImage:
+    """
+    Encode a rendered image with the given codec settings.
+
+    Parameters:
+    -----------
+    img : PIL.Image.Image
+        The rendered Marshall Triangle
+    options : EncodeOptions
+        Codec and speed/size settings
+
+    Returns:
+    --------
+    EncodedImage
+        The encoded bytes, the options used and the encode time
+    """
+    start = time.perf_counter()
+    if options.codec == 'png' and options.png_filter != 'adaptive':
+        data = _encode_png_filtered(img, options.level, options.png_filter)
+    else:
+        buf = io.BytesIO()
+        if options.codec == 'png':
+            img.save(buf, format='PNG', compress_level=options.level)
+        elif options.codec == 'webp':
+            img.save(buf, format='WEBP', lossless=options.lossless, quality=options.quality, method=options.level)
+        else:
+            img.convert('RGB').save(buf, format='JPEG', quality=options.quality)
+        data = buf.getvalue()
+    seconds = time.perf_counter() - start
+    metrics.observe_encode(seconds, len(data), options.codec)
+    return EncodedImage(data=data, options=options, encode_seconds=seconds)
@@ -0,0 +1,349 @@
+"""
+Marshall Triangle Load-Testing Harness
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+
+Drives app.py headlessly through Streamlit's AppTest with N simulated
+sessions replaying realistic interaction traces, and reports per-rerun
+latency percentiles, CPU time and memory per session.
+
+Usage:
+    python load_harness.py --sessions 8 --steps 40
+    python load_harness.py --mode interleaved --sessions 4 --json report.json --max-p95 2.0
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import resource
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+TAB_STATE = "State & Calibration"
+TAB_SETTINGS = "Visualization Settings"
+STATE_SLIDERS = ('privacy_strength', 'performance_strength', 'personalization_strength')
+
+
+@dataclass(frozen=True)
+class Step:
+    """One user interaction; action applies it to an AppTest before the rerun."""
+    kind: str
+    tab: Optional[str]
+    action: Callable
+
+
+@dataclass
+class RerunSample:
+    """Cost of a single rerun."""
+    kind: str
+    latency: float
+    cpu: float
+    error: bool
+
+
+@dataclass
+class SessionReport:
+    """Everything measured for one simulated session."""
+    session: int
+    reruns: List[RerunSample] = field(default_factory=list)
+    cpu_seconds: float = 0.0
+    session_state_bytes: int = 0
+    peak_traced_bytes: int = 0
+    max_rss_bytes: int = 0
+    failure: Optional[str] = None
+
+
+def _set_slider(key: str, value) -> Callable:
+    return lambda at: at.slider(key=key).set_value(value)
+
+
+def slider_drag(key: str, start: float, end: float, steps: int, tab: str = TAB_STATE) -> List[Step]:
+    """A slider drag: the browser reruns the app for intermediate values along the way."""
+    values = np.linspace(start, end, steps + 1)[1:]
+    return [Step(kind=f"drag:{key}", tab=tab, action=_set_slider(key, round(float(value), 2))) for value in values]
+
+
+def size_change(size: int) -> List[Step]:
+    return [Step(kind="size", tab=TAB_SETTINGS, action=_set_slider('size', size))]
+
+
+def label_toggle(show: bool) -> List[Step]:
+    def action(at):
+        checkbox = at.checkbox(key='show_labeled')
+        return checkbox.check() if show else checkbox.uncheck()
+    return [Step(kind="labels", tab=None, action=action)]
+
+
+def preset_save(name: str) -> List[Step]:
+    return [
+        Step(kind="preset_name", tab=TAB_SETTINGS, action=lambda at: at.text_input(key='preset_name_input').set_value(name)),
+        Step(kind="preset_save", tab=TAB_SETTINGS, action=lambda at: at.button(key='save_rendering_preset_btn').click()),
+    ]
+
+
+def realistic_trace(rng: random.Random, length: int) -> List[Step]:
+    """
+    A random but plausible interaction trace of about `length` reruns.
+
+    Mostly state slider drags, with occasional size changes up to 2000px,
+    label toggles and preset saves.
+    """
+    steps: List[Step] = []
+    state = {key: 1.0 for key in STATE_SLIDERS}
+    labels = False
+    while len(steps) < length:
+        roll = rng.random()
+        if roll < 0.6:
+            key = rng.choice(STATE_SLIDERS)
+            target = round(rng.uniform(0.0, 1.0), 2)
+            steps += slider_drag(key, state[key], target, rng.randint(2, 6))
+            state[key] = target
+        elif roll < 0.75:
+            steps += size_change(rng.randrange(500, 2001, 100))
+        elif roll < 0.9:
+            labels = not labels
+            steps += label_toggle(labels)
+        else:
+            steps += preset_save(f"load-{rng.randrange(10**6)}")
+    return steps[:length]
+
+
+def _session_state_bytes(at) -> int:
+    total = 0
+    for key in at.session_state._state._keys():
+        try:
+            total += len(pickle.dumps(at.session_state[key]))
+        except Exception:
+            pass
+    return total
+
+
+class SessionDriver:
+    """
+    One simulated browser session replaying a trace against its own AppTest.
+
+    Call advance() until it returns False; every rerun it triggers is timed
+    into report.
+    """
+
+    def __init__(self, session: int, steps: int, seed: int, timeout: float, app_path: str = APP_PATH):
+        from streamlit.testing.v1 import AppTest
+
+        self.report = SessionReport(session=session)
+        self._at = AppTest.from_file(app_path, default_timeout=timeout)
+        # A fresh owner per session, as separate browsers would have
+        self._at.query_params['owner'] = f"load-{uuid.uuid4().hex}"
+        self._trace = iter(realistic_trace(random.Random(seed), steps))
+        self._started = False
+        self.done = False
+
+    def _timed(self, kind: str, run):
+        report = self.report
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        try:
+            result = run()
+            error = bool(result.exception)
+        except RuntimeError:
+            # AppTest raises when a rerun exceeds the timeout; the session cannot continue
+            result, error = None, True
+        latency = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        report.reruns.append(RerunSample(kind=kind, latency=latency, cpu=cpu, error=error))
+        report.cpu_seconds += cpu
+        if result is None:
+            raise TimeoutError(f"{kind} rerun timed out after {latency:.1f} s")
+        self._at = result
+
+    def advance(self) -> bool:
+        """Perform the next interaction; returns False once the session has finished."""
+        if self.done:
+            return False
+        try:
+            if not self._started:
+                self._started = True
+                self._timed("initial", self._at.run)
+                return True
+            step = next(self._trace, None)
+            if step is None:
+                self.report.session_state_bytes = _session_state_bytes(self._at)
+                self.done = True
+                return False
+            if step.tab is not None and self._at.radio(key='tab_selector').value != step.tab:
+                self._timed("tab", self._at.radio(key='tab_selector').set_value(step.tab).run)
+            self._timed(step.kind, step.action(self._at).run)
+            return True
+        except TimeoutError as e:
+            self.report.failure = str(e)
+            self.done = True
+            return False
+
+
+def _run_session_in_process(args) -> SessionReport:
+    session, steps, seed, timeout, app_path, trace_memory = args
+    if trace_memory:
+        tracemalloc.start()
+    driver = SessionDriver(session, steps, seed, timeout, app_path)
+    while driver.advance():
+        pass
+    if trace_memory:
+        driver.report.peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    driver.report.max_rss_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return driver.report
+
+
+def run_load(sessions: int, steps: int, mode: str = 'processes', seed: int = 0, timeout: float = 120.0,
+             trace_memory: bool = False, app_path: str = APP_PATH) -> List[SessionReport]:
+    """
+    Run N simulated sessions.
+
+    AppTest keeps a process-wide mock runtime, so sessions cannot share a
+    process concurrently. In 'processes' mode every session runs at the same
+    time in its own process, which gives real CPU contention and exact
+    per-session CPU and peak RSS, but cold, unshared caches. In 'interleaved'
+    mode all sessions run in this process, one interaction at a time in
+    round-robin, so they share Streamlit's caches the way sessions on one
+    server do, without contention. trace_memory adds tracemalloc peaks, at a
+    large slowdown of the render loop.
+    """
+    args = [(session, steps, seed + session, timeout, app_path, trace_memory) for session in range(sessions)]
+    if mode == 'processes':
+        with multiprocessing.get_context('spawn').Pool(sessions) as pool:
+            return pool.map(_run_session_in_process, args)
+
+    if trace_memory:
+        tracemalloc.start()
+    drivers = [SessionDriver(*a[:5]) for a in args]
+    active = list(drivers)
+    while active:
+        active = [driver for driver in active if driver.advance()]
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        for driver in drivers:
+            driver.report.peak_traced_bytes = peak // max(1, sessions)
+    return [driver.report for driver in drivers]
+
+
+def summarize(reports: List[SessionReport]) -> Dict:
+    """Aggregate latency percentiles by interaction kind plus per-session CPU and memory."""
+    by_kind = defaultdict(list)
+    for report in reports:
+        for sample in report.reruns:
+            by_kind[sample.kind].append(sample)
+    all_samples = [sample for samples in by_kind.values() for sample in samples]
+
+    def stats(samples: List[RerunSample]) -> Dict:
+        latencies = np.array([sample.latency for sample in samples])
+        return {
+            'reruns': len(samples),
+            'errors': sum(sample.error for sample in samples),
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95)),
+            'p99': float(np.percentile(latencies, 99)),
+            'max': float(latencies.max()),
+            'cpu_mean': float(np.mean([sample.cpu for sample in samples])),
+        }
+
+    return {
+        'overall': stats(all_samples),
+        'by_kind': {kind: stats(samples) for kind, samples in sorted(by_kind.items())},
+        'sessions': [
+            {
+                'session': report.session,
+                'reruns': len(report.reruns),
+                'cpu_seconds': report.cpu_seconds,
+                'session_state_bytes': report.session_state_bytes,
+                'peak_traced_bytes': report.peak_traced_bytes,
+                'max_rss_bytes': report.max_rss_bytes,
+                'failure': report.failure,
+            }
+            for report in reports
+        ],
+        'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def _print_summary(summary: Dict):
+    print(f"{'interaction':<32}{'reruns':>8}{'errors':>8}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'max s':>9}{'cpu s':>9}")
+    rows = list(summary['by_kind'].items()) + [('ALL', summary['overall'])]
+    for kind, row in rows:
+        print(f"{kind:<32}{row['reruns']:>8}{row['errors']:>8}{row['p50']:>9.3f}{row['p95']:>9.3f}"
+              f"{row['p99']:>9.3f}{row['max']:>9.3f}{row['cpu_mean']:>9.3f}")
+    print()
+    for session in summary['sessions']:
+        line = (f"session {session['session']}: {session['reruns']} reruns, cpu {session['cpu_seconds']:.2f} s, "
+                f"session state {session['session_state_bytes'] / 1024:.1f} KB")
+        if session['peak_traced_bytes']:
+            line += f", peak traced {session['peak_traced_bytes'] / 2**20:.1f} MB"
+        if session['max_rss_bytes']:
+            line += f", max RSS {session['max_rss_bytes'] / 2**20:.0f} MB"
+        if session['failure']:
+            line += f" (stopped: {session['failure']})"
+        print(line)
+    print(f"harness process max RSS {summary['max_rss_bytes'] / 2**20:.0f} MB")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay concurrent simulated sessions against app.py.")
+    parser.add_argument("--sessions", type=int, default=4, help="Number of concurrent simulated sessions")
+    parser.add_argument("--steps", type=int, default=30, help="Interactions per session")
+    parser.add_argument("--mode", choices=['processes', 'interleaved'], default='processes',
+                        help="Concurrent processes, or round-robin in one process with shared caches")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-rerun timeout in seconds")
+    parser.add_argument("--trace-memory", action="store_true", help="Record tracemalloc peaks (slow)")
+    parser.add_argument("--json", help="Write the summary as JSON to this path")
+    parser.add_argument("--max-p95", type=float, help="Exit non-zero if overall p95 latency exceeds this (seconds)")
+    args = parser.parse_args(argv)
+
+    # Keep load-test saves out of the real database unless one is configured explicitly
+    os.environ.setdefault('MARSHALL_DB_PATH', os.path.join(os.path.dirname(APP_PATH), 'load_harness.db'))
+
+    start = time.perf_counter()
+    reports = run_load(args.sessions, args.steps, mode=args.mode, seed=args.seed, timeout=args.timeout,
+                       trace_memory=args.trace_memory)
+    summary = summarize(reports)
+    summary['wall_seconds'] = time.perf_counter() - start
+    summary['config'] = vars(args)
+
+    _print_summary(summary)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    failures = [session for session in summary['sessions'] if session['failure']]
+    if failures:
+        print(f"{len(failures)} session(s) stopped early", file=sys.stderr)
+        return 1
+    if args.max_p95 is not None and summary['overall']['p95'] > args.max_p95:
+        print(f"p95 latency {summary['overall']['p95']:.3f} s exceeds {args.max_p95:.3f} s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Marshall Triangle Adaptive Mesh Export
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import json
+import struct
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from harmony_index import HarmonyIndex
+
+SHADINGS = ('gouraud', 'flat')
+
+# Default maximum colour error, in 8-bit levels
+DEFAULT_TOLERANCE = 6.0
+
+# Binary vertex buffer: magic, version, vertex count, triangle count
+BUFFER_MAGIC = b'MTMB'
+BUFFER_VERSION = 1
+_BUFFER_HEADER = struct.Struct('<4sHII')
+
+
+@dataclass(frozen=True)
+class Mesh:
+    """
+    A triangulated colour field.
+
+    Attributes:
+    -----------
+    vertices : np.ndarray
+        (n, 2) float64 positions in the renderer's [-1, 1] space (y up)
+    colors : np.ndarray
+        (n, 3) uint8 colours of the vertices
+    triangles : np.ndarray
+        (m, 3) int32 vertex indices, counter-clockwise
+    shading : str
+        'gouraud' (colours interpolated across each triangle) or 'flat'
+    max_error : float
+        Largest colour error measured while refining, in 8-bit levels
+    outline : Tuple[Tuple[float, float], ...]
+        The meshed region's boundary polygon
+    """
+    vertices: np.ndarray
+    colors: np.ndarray
+    triangles: np.ndarray
+    shading: str
+    max_error: float
+    outline: Tuple[Tuple[float, float], ...] = ()
+
+    def face_colors(self) -> np.ndarray:
+        """(m, 3) uint8 mean colour of every triangle, used for flat shading."""
+        return np.round(self.colors[self.triangles].astype(np.float64).mean(axis=1)).astype(np.uint8)
+
+    def to_svg(self, size: int = 1000, smooth: float = 0.0) -> str:
+        """
+        Flat-shaded SVG with a size x size viewBox; it scales to any resolution.
+
+        SVG has no Gouraud shading, so every triangle is filled with its mean
+        colour; build the mesh with shading='flat' so the tolerance holds for
+        that. Triangles of the same colour share one path element.
+
+        Parameters:
+        -----------
+        size : int
+            Nominal width and height (the viewBox); coordinates are written as integers
+        smooth : float
+            Standard deviation of a blur applied inside the outline to hide facets,
+            in viewBox units (0 for none)
+        """
+        scale = size / 2.0
+
+        def point(x, y):
+            return f"{int(round((x + 1) * scale))} {int(round((1 - y) * scale))}"
+
+        paths: Dict[str, List[str]] = {}
+        for triangle, color in zip(self.triangles, self.face_colors()):
+            a, b, c = (self.vertices[i] for i in triangle)
+            fill = '#{:02x}{:02x}{:02x}'.format(*color)
+            paths.setdefault(fill, []).append(f"M{point(*a)}L{point(*b)}L{point(*c)}Z")
+
+        # crispEdges turns off anti-aliasing, which would otherwise show seams between triangles
+        parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+                 f'width="{size}" height="{size}" shape-rendering="crispEdges">',
+                 f'<rect width="{size}" height="{size}" fill="#000"/>']
+        group = '<g>'
+        if smooth > 0 and self.outline:
+            parts.append(f'<defs><clipPath id="o"><path d="M{"L".join(point(*p) for p in self.outline)}Z"/></clipPath>'
+                         f'<filter id="s"><feGaussianBlur stdDeviation="{smooth:g}"/></filter></defs>')
+            parts.append('<g clip-path="url(#o)">')
+            group = '<g filter="url(#s)">'
+        parts.append(group)
+        parts += [f'<path d="{"".join(d)}" fill="{fill}"/>' for fill, d in paths.items()]
+        parts.append('</g></g>' if group != '<g>' else '</g>')
+        parts.append('</svg>')
+        return ''.join(parts)
+
+    def to_buffer(self) -> bytes:
+        """
+        Compact little-endian vertex/colour buffer for client-side Gouraud shading.
+
+        Layout: header (4s magic 'MTMB', uint16 version, uint32 vertex count n,
+        uint32 triangle count m), then n x 2 float32 positions in [-1, 1] (y up),
+        n x 3 uint8 RGB colours, padding to a multiple of 4 bytes, and m x 3
+        uint16 indices (uint32 when n > 65535).
+        """
+        n, m = len(self.vertices), len(self.triangles)
+        colors = self.colors.astype(np.uint8).tobytes()
+        padding = b'\0' * (-(len(colors)) % 4)
+        return b''.join([
+            _BUFFER_HEADER.pack(BUFFER_MAGIC, BUFFER_VERSION, n, m),
+            self.vertices.astype('<f4').tobytes(),
+            colors,
+            padding,
+            self.triangles.astype('<u2' if n <= 0xFFFF else '<u4').tobytes(),
+        ])
+
+    @classmethod
+    def from_buffer(cls, data: bytes, shading: str = 'gouraud') -> 'Mesh':
+        """Decode a buffer written by to_buffer (max_error and outline are not stored)."""
+        magic, version, n, m = _BUFFER_HEADER.unpack_from(data)
+        if magic != BUFFER_MAGIC or version != BUFFER_VERSION:
+            raise ValueError("Not a Marshall Triangle mesh buffer")
+        offset = _BUFFER_HEADER.size
+        vertices = np.frombuffer(data, dtype='<f4', count=n * 2, offset=offset).reshape(n, 2).astype(np.float64)
+        offset += n * 8
+        colors = np.frombuffer(data, dtype=np.uint8, count=n * 3, offset=offset).reshape(n, 3).copy()
+        offset += n * 3 + (-(n * 3) % 4)
+        index_type = '<u2' if n <= 0xFFFF else '<u4'
+        triangles = np.frombuffer(data, dtype=index_type, count=m * 3, offset=offset).reshape(m, 3).astype(np.int32)
+        return cls(vertices=vertices, colors=colors, triangles=triangles, shading=shading, max_error=float('nan'))
+
+    def to_json(self, decimals: int = 4) -> str:
+        """The mesh as JSON arrays ('positions', 'colors', 'indices'), flattened for WebGL buffers."""
+        return json.dumps({
+            'positions': np.round(self.vertices, decimals).ravel().tolist(),
+            'colors': self.colors.ravel().tolist(),
+            'indices': self.triangles.ravel().tolist(),
+        }, separators=(',', ':'))
+
+
+def build_mesh(harmony: HarmonyIndex, harmonyState: Optional[Dict[str, float]] = None, falloff_type='gaussian',
+               tolerance: float = DEFAULT_TOLERANCE, shading: str = 'gouraud', min_depth: int = 2,
+               max_depth: int = 9) -> Mesh:
+    """
+    Adaptively triangulate the Marshall Triangle until the colour error is within tolerance.
+
+    Starting from the triangle of _define_triangle, every triangle is split
+    into four at its edge midpoints while the colour at its edge midpoints and
+    centroid differs from what the mesh would show there (the interpolated
+    colour for Gouraud shading, the triangle's mean colour for flat shading)
+    by more than the tolerance. The colour model (HarmonyIndex.query_colors,
+    without raster blur) is evaluated only at mesh vertices and these test
+    points, in one vectorized batch per refinement level.
+
+    Parameters:
+    -----------
+    harmony : HarmonyIndex
+        Renderer providing sigma, intensity and calibration (its size is not used)
+    harmonyState : Dict[str, float], optional
+        State vector; missing channels default to 1.0
+    falloff_type : str
+        The type of falloff function to use ('gaussian' or 'inverse_square')
+    tolerance : float
+        Maximum colour error per channel, in 8-bit levels
+    shading : str
+        'gouraud' for vertex-colour interpolation, 'flat' for SVG
+    min_depth, max_depth : int
+        Refinement levels always applied and never exceeded
+
+    Returns:
+    --------
+    Mesh
+        The refined mesh
+    """
+    if shading not in SHADINGS:
+        raise ValueError(f"Unknown shading '{shading}', expected one of {SHADINGS}")
+
+    def evaluate(points: np.ndarray) -> np.ndarray:
+        return harmony.query_colors(points[:, 0], points[:, 1], harmonyState, falloff_type) * 255.0
+
+    vertices: List[np.ndarray] = [np.array(harmony._define_triangle(), dtype=np.float64)]
+    colors: List[np.ndarray] = [evaluate(vertices[0])]
+    count = 3
+    # Edge midpoints are shared by neighbouring triangles; map each edge to its midpoint vertex
+    midpoint_of: Dict[Tuple[int, int], int] = {}
+
+    active = np.array([[0, 1, 2]], dtype=np.int64)
+    final: List[np.ndarray] = []
+    max_error = 0.0
+
+    for depth in range(max_depth + 1):
+        if len(active) == 0:
+            break
+        all_vertices = np.concatenate(vertices)
+        all_colors = np.concatenate(colors)
+
+        # New midpoint vertices for every edge of the active triangles
+        edges = np.concatenate([active[:, [0, 1]], active[:, [1, 2]], active[:, [2, 0]]])
+        edges = np.sort(edges, axis=1)
+        new_edges = [tuple(edge) for edge in np.unique(edges, axis=0) if tuple(edge) not in midpoint_of]
+        if new_edges:
+            ends = np.array(new_edges)
+            points = (all_vertices[ends[:, 0]] + all_vertices[ends[:, 1]]) / 2
+            vertices.append(points)
+            colors.append(evaluate(points))
+            for offset, edge in enumerate(new_edges):
+                midpoint_of[edge] = count + offset
+            count += len(new_edges)
+            all_vertices = np.concatenate(vertices)
+            all_colors = np.concatenate(colors)
+
+        mids = np.array([[midpoint_of[tuple(sorted((int(t[a]), int(t[b]))))] for a, b in ((0, 1), (1, 2), (2, 0))]
+                         for t in active])
+        centroids = all_vertices[active].mean(axis=1)
+        centroid_colors = evaluate(centroids)
+
+        corner = all_colors[active]                       # (t, 3 corners, 3 channels)
+        if shading == 'gouraud':
+            predicted_mids = (corner + np.roll(corner, -1, axis=1)) / 2
+            predicted_centroid = corner.mean(axis=1)
+            error = np.maximum(np.abs(all_colors[mids] - predicted_mids).max(axis=(1, 2)),
+                               np.abs(centroid_colors - predicted_centroid).max(axis=1))
+        else:
+            flat = corner.mean(axis=1, keepdims=True)
+            samples = np.concatenate([corner, all_colors[mids], centroid_colors[:, None]], axis=1)
+            error = np.abs(samples - flat).max(axis=(1, 2))
+
+        split = (error > tolerance) | (depth < min_depth)
+        if depth == max_depth:
+            split[:] = False
+        done = ~split
+        if done.any():
+            final.append(active[done])
+            max_error = max(max_error, float(error[done].max()))
+
+        a, b, c = active[split].T
+        ab, bc, ca = mids[split].T
+        active = np.concatenate([
+            np.stack([a, ab, ca], axis=1),
+            np.stack([ab, b, bc], axis=1),
+            np.stack([ca, bc, c], axis=1),
+            np.stack([ab, bc, ca], axis=1),
+        ]) if split.any() else np.empty((0, 3), dtype=np.int64)
+
+    all_vertices = np.concatenate(vertices)
+    all_colors = np.concatenate(colors)
+    triangles = np.concatenate(final) if final else np.empty((0, 3), dtype=np.int64)
+
+    # Drop midpoints of edges that were never split further
+    used, triangles = np.unique(triangles, return_inverse=True)
+    triangles = triangles.reshape(-1, 3).astype(np.int32)
+    return Mesh(
+        vertices=all_vertices[used],
+        colors=np.clip(np.round(all_colors[used]), 0, 255).astype(np.uint8),
+        triangles=triangles,
+        shading=shading,
+        max_error=max_error,
+        outline=tuple(harmony._define_triangle())
+    )
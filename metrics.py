@@ -0,0 +1,329 @@
+"""
+Marshall Triangle Operational Metrics
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+
+A small in-process metrics registry with Prometheus text exposition.
+
+Configuration (environment):
+    MARSHALL_METRICS_PORT      Serve /metrics on this local port
+    MARSHALL_METRICS_FILE      Rewrite this file (e.g. for node_exporter's textfile collector)
+    MARSHALL_METRICS_INTERVAL  Seconds between file rewrites (default 15)
+"""
+
+import bisect
+import contextlib
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, LabelValues, Optional[Tuple[str, str]], float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [('_total', key, None, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down.
+
+    With a callback, values are read at collection time: the callback returns
+    {label values tuple: value}.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception:
+                values = {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [('', tuple(str(v) for v in key), None, value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Observation counts in cumulative buckets, with their sum, per label set."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last is +Inf), sum]
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time of the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, (list(entry[0]), entry[1])) for key, entry in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append(('_bucket', key, ('le', _format_value(bound)), cumulative))
+            samples.append(('_sum', key, None, total))
+            samples.append(('_count', key, None, cumulative))
+        return samples
+
+
+class Registry:
+    """A named collection of metrics; creating an existing name returns the registered metric."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], Dict[LabelValues, float]]] = None) -> Gauge:
+        gauge = self._register(Gauge, name, documentation, labelnames)
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def metrics(self) -> List[_Metric]:
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return '\n'.join(metric.render() for metric in self.metrics()) + '\n'
+
+    def write_textfile(self, path: str):
+        """Atomically write render() to a file."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+RENDERS = REGISTRY.counter(
+    'marshall_renders', "Renders completed, by size, falloff type and engine", ('size', 'falloff_type', 'engine'))
+RENDER_SECONDS = REGISTRY.histogram(
+    'marshall_render_seconds', "Render wall time", ('size', 'falloff_type', 'engine'))
+ENCODES = REGISTRY.counter('marshall_encodes', "Images encoded, by codec", ('codec',))
+ENCODED_BYTES = REGISTRY.counter('marshall_encoded_bytes', "Bytes produced by image encoding", ('codec',))
+ENCODE_SECONDS = REGISTRY.histogram('marshall_encode_seconds', "Image encode wall time", ('codec',))
+THUMBNAILS = REGISTRY.counter('marshall_thumbnails', "Thumbnail generations, by outcome", ('outcome',))
+STORE_OPERATIONS = REGISTRY.counter(
+    'marshall_store_operations', "Saved state and preset store operations", ('operation', 'table'))
+CACHE_FILLS = REGISTRY.counter(
+    'marshall_cache_fills', "Cached function bodies executed (cache misses), by function", ('function',))
+PIPELINE_STAGES = REGISTRY.counter(
+    'marshall_pipeline_stages', "Render pipeline stage evaluations, computed or served from memo",
+    ('stage', 'outcome'))
+GOVERNOR_ADMISSIONS = REGISTRY.counter(
+    'marshall_render_admissions', "Renders admitted by the memory governor, by mode (full, banded, reduced)",
+    ('mode',))
+GOVERNOR_WAIT_SECONDS = REGISTRY.histogram(
+    'marshall_render_queue_seconds', "Time renders queued for memory, by the mode they were admitted with",
+    ('mode',))
+GOVERNOR_CACHE_RELEASES = REGISTRY.counter(
+    'marshall_render_cache_releases', "Render caches cleared by the memory governor to admit a render",
+    ('cache',))
+SINGLE_FLIGHT = REGISTRY.counter(
+    'marshall_single_flight_calls', "Calls through single-flight groups, by role; 'shared' calls were deduplicated",
+    ('group', 'role'))
+RERUN_SECONDS = REGISTRY.histogram('marshall_rerun_seconds', "App script rerun wall time", ('outcome',))
+SESSION_STATE_BYTES = REGISTRY.histogram(
+    'marshall_session_state_bytes', "Pickled session state size, observed at the end of each rerun",
+    buckets=BYTES_BUCKETS)
+
+
+def observe_render(seconds: float, size: int, falloff_type: str, engine: str):
+    """Record one completed render."""
+    RENDERS.inc(size=size, falloff_type=falloff_type, engine=engine)
+    RENDER_SECONDS.observe(seconds, size=size, falloff_type=falloff_type, engine=engine)
+
+
+def observe_encode(seconds: float, nbytes: int, codec: str):
+    """Record one completed image encode."""
+    ENCODES.inc(codec=codec)
+    ENCODED_BYTES.inc(nbytes, codec=codec)
+    ENCODE_SECONDS.observe(seconds, codec=codec)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, address: str = '127.0.0.1', registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve registry.render() at http://address:port/metrics on a daemon thread."""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((address, port), handler)
+    threading.Thread(target=server.serve_forever, name="marshall-metrics-http", daemon=True).start()
+    return server
+
+
+def start_textfile_writer(path: str, interval: float = 15.0, registry: Registry = REGISTRY) -> threading.Thread:
+    """Rewrite path with the registry's exposition every interval seconds on a daemon thread."""
+    def loop():
+        while True:
+            try:
+                registry.write_textfile(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="marshall-metrics-file", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_exporters_from_env(environ=os.environ) -> Dict[str, object]:
+    """Start the HTTP endpoint and/or file writer configured in the environment."""
+    started = {}
+    if environ.get('MARSHALL_METRICS_PORT'):
+        started['http'] = start_http_server(int(environ['MARSHALL_METRICS_PORT']))
+    if environ.get('MARSHALL_METRICS_FILE'):
+        started['file'] = start_textfile_writer(environ['MARSHALL_METRICS_FILE'],
+                                                float(environ.get('MARSHALL_METRICS_INTERVAL', 15)))
+    return started
@@ -0,0 +1,275 @@
+"""
+Marshall Triangle On-Demand Profiler
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+
+Captures cProfile and tracemalloc data for individual reruns or renders.
+
+Configuration (environment):
+    MARSHALL_PROFILE              '1' to sample every rerun and render at MARSHALL_PROFILE_SAMPLE_RATE
+    MARSHALL_PROFILE_SAMPLE_RATE  Fraction of reruns captured when sampling (default 0.01)
+    MARSHALL_PROFILE_TOKEN        Secret; '?profile=<token>' captures that session's reruns
+    MARSHALL_PROFILE_DIR          Output directory (default ./profiles)
+    MARSHALL_PROFILE_MAX_MB       Total size cap; oldest captures are deleted first (default 50)
+    MARSHALL_PROFILE_MIN_INTERVAL Minimum seconds between captures in a process (default 1)
+
+Inspect a capture with:
+    python -m pstats profiles/<capture>.prof
+"""
+
+import contextlib
+import cProfile
+import functools
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Allocation sites recorded per capture
+TOP_ALLOCATIONS = 25
+
+
+@dataclass(frozen=True)
+class ProfilerConfig:
+    """Profiling switches and safety limits, normally read from the environment."""
+    sampling: bool = False
+    sample_rate: float = 0.01
+    token: Optional[str] = None
+    directory: str = 'profiles'
+    max_bytes: int = 50 * 2**20
+    min_interval: float = 1.0
+
+    @classmethod
+    def from_env(cls, environ=os.environ) -> 'ProfilerConfig':
+        default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+        return cls(
+            sampling=environ.get('MARSHALL_PROFILE', '').lower() in ('1', 'true', 'yes'),
+            sample_rate=min(1.0, max(0.0, float(environ.get('MARSHALL_PROFILE_SAMPLE_RATE', 0.01)))),
+            token=environ.get('MARSHALL_PROFILE_TOKEN') or None,
+            directory=environ.get('MARSHALL_PROFILE_DIR', default_dir),
+            max_bytes=int(float(environ.get('MARSHALL_PROFILE_MAX_MB', 50)) * 2**20),
+            min_interval=float(environ.get('MARSHALL_PROFILE_MIN_INTERVAL', 1.0))
+        )
+
+    @property
+    def available(self) -> bool:
+        """Whether any capture can happen at all."""
+        return self.sampling or self.token is not None
+
+
+class Capture:
+    """An in-progress capture; annotate() adds metadata saved alongside the profile."""
+
+    def __init__(self, label: str, reason: str):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.reason = reason
+        self.metadata: Dict[str, Any] = {}
+
+
+_config: Optional[ProfilerConfig] = None
+# tracemalloc is process-wide, so only one capture runs at a time
+_capture_lock = threading.Lock()
+_local = threading.local()
+_last_capture = 0.0
+
+
+def get_config() -> ProfilerConfig:
+    global _config
+    if _config is None:
+        _config = ProfilerConfig.from_env()
+    return _config
+
+
+def set_config(config: Optional[ProfilerConfig]):
+    """Override the environment configuration (None re-reads the environment)."""
+    global _config
+    _config = config
+
+
+def token_matches(value: Optional[str], config: Optional[ProfilerConfig] = None) -> bool:
+    """Whether a query parameter value is the configured profiling token."""
+    config = config or get_config()
+    if not value or config.token is None:
+        return False
+    return hmac.compare_digest(str(value), config.token)
+
+
+def current() -> Optional[Capture]:
+    """The capture active on this thread, if any."""
+    return getattr(_local, 'capture', None)
+
+
+def annotate(**metadata):
+    """Attach metadata (e.g. render parameters) to the active capture; a no-op otherwise."""
+    capture = current()
+    if capture is not None:
+        capture.metadata.update(metadata)
+
+
+def _should_capture(requested: bool, config: ProfilerConfig) -> Optional[str]:
+    if current() is not None:
+        return None
+    if requested:
+        reason = 'requested'
+    elif config.sampling and random.random() < config.sample_rate:
+        reason = 'sampled'
+    else:
+        return None
+    if time.monotonic() - _last_capture < config.min_interval:
+        return None
+    return reason
+
+
+def _allocation_sites(snapshot: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ])
+    return [
+        {'site': str(stat.traceback[0]), 'size_bytes': stat.size, 'count': stat.count}
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+    ]
+
+
+def _enforce_size_cap(directory: str, max_bytes: int):
+    # Delete whole captures (profile and metadata together), oldest first, until under the cap
+    captures: Dict[str, List] = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            entry = captures.setdefault(os.path.splitext(name)[0], [float('inf'), 0, []])
+            entry[0] = min(entry[0], os.path.getmtime(path))
+            entry[1] += os.path.getsize(path)
+            entry[2].append(path)
+    total = sum(size for _, size, _ in captures.values())
+    for _, size, paths in sorted(captures.values(), key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        for path in paths:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+        total -= size
+
+
+@contextlib.contextmanager
+def maybe_capture(label: str, requested: bool = False, config: Optional[ProfilerConfig] = None) -> Iterator[Optional[Capture]]:
+    """
+    Profile the enclosed block if it is requested or sampled.
+
+    Writes <id>.prof (cProfile, for pstats or snakeviz) and <id>.json (label,
+    reason, timings, peak traced memory, top allocation sites and whatever
+    was annotated) to the configured directory. Captures never nest, never
+    overlap across threads and are skipped within min_interval of the last
+    one; the directory is kept under max_bytes.
+
+    Parameters:
+    -----------
+    label : str
+        What is being profiled, e.g. 'app.main'
+    requested : bool
+        Capture regardless of sampling (e.g. a valid profiling token was sent)
+    config : ProfilerConfig, optional
+        Defaults to the environment configuration
+
+    Yields:
+    -------
+    Capture or None
+        The active capture, or None when this block is not profiled
+    """
+    global _last_capture
+    config = config or get_config()
+    reason = _should_capture(requested, config) if config.available else None
+    if reason is None or not _capture_lock.acquire(blocking=False):
+        yield None
+        return
+
+    capture = Capture(label, reason)
+    _last_capture = time.monotonic()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    _local.capture = capture
+    outcome = 'ok'
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    profiler.enable()
+    try:
+        yield capture
+    except BaseException as e:
+        # Streamlit's st.rerun and st.stop end a run with control-flow exceptions
+        outcome = type(e).__name__
+        raise
+    finally:
+        profiler.disable()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        _local.capture = None
+        try:
+            peak = tracemalloc.get_traced_memory()[1]
+            sites = _allocation_sites(tracemalloc.take_snapshot())
+            if not was_tracing:
+                tracemalloc.stop()
+
+            # A capture is optional diagnostics: failing to write it must not fail the profiled run
+            try:
+                os.makedirs(config.directory, exist_ok=True)
+                base = os.path.join(config.directory, capture.id)
+                profiler.dump_stats(f"{base}.prof")
+                with open(f"{base}.json", 'w') as f:
+                    json.dump({
+                        'id': capture.id,
+                        'label': capture.label,
+                        'reason': capture.reason,
+                        'outcome': outcome,
+                        'wall_seconds': wall,
+                        'cpu_seconds': cpu,
+                        'peak_traced_bytes': peak,
+                        'top_allocations': sites,
+                        'metadata': capture.metadata,
+                    }, f, indent=2, default=str)
+                _enforce_size_cap(config.directory, config.max_bytes)
+            except OSError as e:
+                print(f"Marshall Triangle profiler could not write capture {capture.id}: {e}", file=sys.stderr)
+        finally:
+            _capture_lock.release()
+
+
+def profiled(label: str, describe: Optional[Callable[..., Dict[str, Any]]] = None):
+    """
+    Decorator that runs a function under maybe_capture when sampling is enabled.
+
+    describe receives the call's arguments and returns metadata to annotate.
+    Inside an active capture (e.g. a profiled rerun) the call is simply part
+    of that capture.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            config = get_config()
+            if not config.sampling or current() is not None:
+                return func(*args, **kwargs)
+            with maybe_capture(label, config=config) as capture:
+                if capture is not None and describe is not None:
+                    annotate(**describe(*args, **kwargs))
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
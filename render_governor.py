@@ -0,0 +1,288 @@
+"""
+Marshall Triangle Render Memory Governor
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+
+Configuration (environment):
+    MARSHALL_RENDER_BUDGET_MB  Memory concurrent renders may hold (default 1024)
+    MARSHALL_RENDER_MAX_WAIT   Seconds a render queues before it is degraded (default 2)
+"""
+
+import contextlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+import metrics
+import render_pipeline
+from harmony_index import HarmonyIndex, geometry_bytes, triangle_geometry
+from render_spec import RenderSpec
+
+# Peak transient bytes per output pixel, measured with tracemalloc (linear in size^2 from 400 to 1600px)
+ENGINE_BYTES_PER_PIXEL = {'reference': 112, 'matrix': 96, 'pipeline': 115, 'adaptive': 56}
+# Banded rendering holds the 8-bit image and its blurred copy, plus one band of float temporaries
+BANDED_BYTES_PER_PIXEL = 3.5
+BAND_BYTES_PER_POINT = 100
+DEFAULT_BAND_POINTS = 65536
+
+MODES = ('full', 'banded', 'reduced')
+
+
+def estimate_peak_bytes(size: int, engine: str) -> int:
+    """Estimated peak memory of one render at size x size with an engine, or with 'banded'."""
+    if engine == 'banded':
+        return int(BANDED_BYTES_PER_PIXEL * size * size + BAND_BYTES_PER_POINT * DEFAULT_BAND_POINTS)
+    if engine not in ENGINE_BYTES_PER_PIXEL:
+        raise ValueError(f"No memory model for engine '{engine}'")
+    return int(ENGINE_BYTES_PER_PIXEL[engine] * size * size)
+
+
+@dataclass(frozen=True)
+class RetainedCache:
+    """
+    A cache that renders fill and that keeps memory between renders.
+
+    Attributes:
+    -----------
+    name : str
+        Label in the marshall_render_cache_releases metric
+    measure : Callable[[], int]
+        Bytes the cache holds now
+    release : Callable[[], None]
+        Empties the cache
+    """
+    name: str
+    measure: Callable[[], int]
+    release: Callable[[], None]
+
+
+def render_caches() -> Tuple[RetainedCache, ...]:
+    """The process-wide caches renders leave behind: the shared pipeline's memos and triangle geometries."""
+    pipeline = render_pipeline.shared_pipeline()
+    return (RetainedCache('pipeline', pipeline.memo_bytes, pipeline.invalidate),
+            RetainedCache('triangle_geometry', geometry_bytes, triangle_geometry.cache_clear))
+
+
+def render_banded(spec: RenderSpec, band_points: int = DEFAULT_BAND_POINTS) -> Image.Image:
+    """
+    Render a spec a band of rows at a time, bounding float temporaries to one band.
+
+    Each band is evaluated with HarmonyIndex.query_colors on render's own
+    pixel grid, then the assembled 8-bit image is blurred, so the result is
+    pixel-identical to HarmonyIndex.render (whose edge attenuation only
+    touches pixels that are already black).
+    """
+    start = time.perf_counter()
+    harmony = HarmonyIndex.from_spec(spec)
+    coords = np.linspace(-1, 1, spec.size)
+    rows_y = coords[::-1]  # row i of the image is y = coords[size - 1 - i]
+    pixels = np.empty((spec.size, spec.size, 3), dtype=np.uint8)
+    rows = max(1, band_points // spec.size)
+    for row in range(0, spec.size, rows):
+        xg, yg = np.meshgrid(coords, rows_y[row:row + rows])
+        pixels[row:row + rows] = harmony.query_colors(xg, yg, spec.harmony_state, spec.falloff_type, as_uint8=True)
+    img = Image.fromarray(pixels).filter(ImageFilter.GaussianBlur(radius=spec.edge_blur))
+    metrics.observe_render(time.perf_counter() - start, spec.size, spec.falloff_type, 'banded')
+    return img
+
+
+@dataclass(frozen=True)
+class Admission:
+    """
+    How a governed render runs.
+
+    Attributes:
+    -----------
+    spec : RenderSpec
+        The requested rendering
+    engine : str
+        Engine for 'full' and 'reduced' renders
+    mode : str
+        'full' (as requested), 'banded' (same pixels, bounded memory) or
+        'reduced' (rendered at render_size and upscaled)
+    render_size : int
+        Edge length actually rendered
+    reserved_bytes : int
+        Memory reserved against the budget while the render runs
+    waited : float
+        Seconds spent queued
+    """
+    spec: RenderSpec
+    engine: str
+    mode: str
+    render_size: int
+    reserved_bytes: int
+    waited: float
+
+    @property
+    def degraded(self) -> bool:
+        return self.mode != 'full'
+
+    def render(self) -> Image.Image:
+        """Run the render this admission allows."""
+        if self.mode == 'banded':
+            return render_banded(self.spec)
+        spec = self.spec.replace(size=self.render_size)
+        img = HarmonyIndex.from_spec(spec).render(spec=spec, engine=self.engine)
+        if self.mode == 'reduced':
+            img = img.resize((self.spec.size, self.spec.size), Image.Resampling.LANCZOS)
+        return img
+
+
+class RenderGovernor:
+    """
+    Admission control for concurrent renders against a memory budget.
+
+    Each request reserves its estimated peak memory while it runs. Memory
+    the render caches keep between renders counts against the same budget;
+    a request that does not fit first clears them. One that still does not
+    fit next to the renders in flight queues for up to
+    max_wait seconds; after that (or at once, if it could never fit) it is
+    degraded to the first fallback that fits now: a banded render with the
+    same pixels, then, if allowed, renders at halved resolutions down to
+    min_size, upscaled. If nothing fits, it waits for the cheapest option.
+
+    Parameters:
+    -----------
+    budget_bytes : int
+        Memory concurrent renders may reserve together
+    max_wait : float
+        Seconds a request queues for a full render before degrading
+    min_size : int
+        Smallest edge length a reduced render may use
+    caches : Sequence[RetainedCache]
+        Caches counted against the budget and cleared under pressure
+    """
+
+    def __init__(self, budget_bytes: int, max_wait: float = 2.0, min_size: int = 200,
+                 caches: Sequence[RetainedCache] = ()):
+        self.budget_bytes = budget_bytes
+        self.max_wait = max_wait
+        self.min_size = min_size
+        self.caches = tuple(caches)
+        self.in_flight_bytes = 0
+        self.queued = 0
+        self._condition = threading.Condition()
+
+        metrics.REGISTRY.gauge('marshall_render_budget_bytes', "Memory budget of the render governor",
+                               callback=lambda: {(): self.budget_bytes})
+        metrics.REGISTRY.gauge('marshall_render_in_flight_bytes', "Memory reserved by renders in flight",
+                               callback=lambda: {(): self.in_flight_bytes})
+        metrics.REGISTRY.gauge('marshall_render_queued', "Renders waiting for memory",
+                               callback=lambda: {(): self.queued})
+        metrics.REGISTRY.gauge('marshall_render_retained_bytes', "Memory render caches hold between renders",
+                               ('cache',), callback=lambda: {(cache.name,): cache.measure() for cache in self.caches})
+
+    @classmethod
+    def from_env(cls, environ=os.environ) -> 'RenderGovernor':
+        return cls(budget_bytes=int(float(environ.get('MARSHALL_RENDER_BUDGET_MB', 1024)) * (1 << 20)),
+                   max_wait=float(environ.get('MARSHALL_RENDER_MAX_WAIT', 2.0)), caches=render_caches())
+
+    def retained_bytes(self) -> int:
+        """Memory the caches hold between renders."""
+        return sum(cache.measure() for cache in self.caches)
+
+    def _free_bytes(self) -> int:
+        # Budget left after the renders in flight and what the caches hold
+        return self.budget_bytes - self.in_flight_bytes - self.retained_bytes()
+
+    def _release_caches(self):
+        for cache in self.caches:
+            if cache.measure():
+                cache.release()
+                metrics.GOVERNOR_CACHE_RELEASES.inc(cache=cache.name)
+
+    def _fallbacks(self, spec: RenderSpec, engine: str, allow_reduced: bool) -> List[Tuple[str, int, int]]:
+        # (mode, render size, reserved bytes), in order of preference
+        options = [('banded', spec.size, estimate_peak_bytes(spec.size, 'banded'))]
+        size = spec.size // 2
+        while allow_reduced and size >= self.min_size:
+            # The upscale holds the reduced and the full-size 8-bit images
+            options.append(('reduced', size, estimate_peak_bytes(size, engine) + 3 * (spec.size**2 + size**2)))
+            size //= 2
+        return options
+
+    @contextlib.contextmanager
+    def admit(self, spec: RenderSpec, engine: str = 'matrix', allow_reduced: bool = False) -> Iterator[Admission]:
+        """
+        Reserve memory for a render, queueing or degrading as the budget requires.
+
+        Parameters:
+        -----------
+        spec : RenderSpec
+            The requested rendering
+        engine : str
+            Engine of the full render
+        allow_reduced : bool
+            Whether a lower-resolution render is an acceptable fallback (leave
+            off when the result is cached under the requested spec)
+
+        Yields:
+        -------
+        Admission
+            The chosen mode; memory is released when the block exits
+        """
+        full = estimate_peak_bytes(spec.size, engine)
+        fallbacks = self._fallbacks(spec, engine, allow_reduced)
+        start = time.perf_counter()
+        deadline = start + self.max_wait
+
+        with self._condition:
+            self.queued += 1
+            try:
+                while True:
+                    free = self._free_bytes()
+                    if full > free:
+                        # Shed what earlier renders left cached before queueing or degrading
+                        self._release_caches()
+                        free = self._free_bytes()
+                    now = time.perf_counter()
+                    if full <= free:
+                        choice = ('full', spec.size, full)
+                        break
+                    if now >= deadline or full > self.budget_bytes:
+                        choice = next((option for option in fallbacks if option[2] <= free), None)
+                        if choice is None and self.in_flight_bytes == 0:
+                            # Nothing can free memory: run the cheapest option over budget
+                            choice = min(fallbacks, key=lambda option: option[2])
+                        if choice is not None:
+                            break
+                    wait = deadline - now if now < deadline and full <= self.budget_bytes else None
+                    self._condition.wait(wait)
+            finally:
+                self.queued -= 1
+            self.in_flight_bytes += choice[2]
+
+        mode, render_size, reserved = choice
+        waited = time.perf_counter() - start
+        metrics.GOVERNOR_WAIT_SECONDS.observe(waited, mode=mode)
+        metrics.GOVERNOR_ADMISSIONS.inc(mode=mode)
+        try:
+            yield Admission(spec=spec, engine=engine, mode=mode, render_size=render_size,
+                            reserved_bytes=reserved, waited=waited)
+        finally:
+            with self._condition:
+                self.in_flight_bytes -= reserved
+                self._condition.notify_all()
+
+    def render(self, spec: RenderSpec, engine: str = 'matrix',
+               allow_reduced: bool = False) -> Tuple[Image.Image, Admission]:
+        """Render a spec under admission control; returns the image and how it was rendered."""
+        with self.admit(spec, engine, allow_reduced=allow_reduced) as admission:
+            return admission.render(), admission
@@ -0,0 +1,267 @@
+"""
+Marshall Triangle Stage-Graph Render Pipeline
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+import metrics
+from harmony_index import HarmonyIndex, TriangleGeometry, triangle_geometry
+from image_output import EncodeOptions, EncodedImage, encode_image
+from render_spec import RenderSpec
+from source_engine import source_falloff
+
+_CHANNELS = ('r', 'g', 'b')
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One step of the render pipeline.
+
+    Attributes:
+    -----------
+    name : str
+        Stage name, referenced by downstream stages
+    params : Tuple[str, ...]
+        Parameters the stage reads: RenderSpec fields, or 'encode' for the EncodeOptions
+    upstream : Tuple[str, ...]
+        Stages whose outputs the stage reads
+    compute : Callable
+        Called with the upstream outputs, then the params, in declared order
+    max_entries : int
+        Outputs memoized for this stage; full-frame float stages keep few
+    """
+    name: str
+    params: Tuple[str, ...]
+    upstream: Tuple[str, ...]
+    compute: Callable
+    max_entries: int = 4
+
+
+@dataclass(frozen=True)
+class PipelineRun:
+    """The output of one pipeline run and the stages it had to compute."""
+    output: object
+    computed: Tuple[str, ...]
+    seconds: float
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    # Memoized arrays are shared by every later run
+    array.flags.writeable = False
+    return array
+
+
+def _geometry(size: int) -> TriangleGeometry:
+    return triangle_geometry(size)
+
+
+def _source_fields(geometry: TriangleGeometry, sigma: float, intensity: float, falloff_type: str) -> np.ndarray:
+    # (n_inside, 3) falloff of the red, green and blue sources at every inside pixel
+    return _read_only(source_falloff(geometry.dist_sq, falloff_type, sigma, intensity))
+
+
+def _mix(fields: np.ndarray, state: Tuple[float, ...], calibration: Tuple[float, ...]) -> np.ndarray:
+    # Weight each source by its calibrated state channel
+    scale = HarmonyIndex()._calibration_scale(dict(zip(_CHANNELS, calibration)))
+    return _read_only(fields * (np.clip(np.array(state), 0.0, 1.0) * scale))
+
+
+def _attenuate_edges(geometry: TriangleGeometry, mixed: np.ndarray, edge_factor: float) -> np.ndarray:
+    # Scatter into the full frame and attenuate the one-pixel ring outside the mask, as render
+    # does (every channel is zero there, so this stage only ever changes pixels if that changes)
+    channels = np.zeros(geometry.mask.shape + (3,))
+    channels[geometry.mask] = mixed
+    channels[geometry.edges] *= edge_factor
+    return _read_only(channels)
+
+
+def _normalize(channels: np.ndarray) -> np.ndarray:
+    # Max-value normalization and 8-bit quantization
+    norm = np.minimum(np.maximum(channels.max(axis=-1), 1e-10), 1.0)
+    mask_norm = norm > 0.1
+    normalized = channels.copy()
+    normalized[mask_norm] /= norm[mask_norm, None]
+    return _read_only((np.clip(normalized, 0, 1) * 255).astype(np.uint8))
+
+
+def _blur(pixels: np.ndarray, edge_blur: float) -> np.ndarray:
+    # Kept as a read-only array: a memoized PIL image would be mutable by every caller it is handed to
+    return _read_only(np.array(Image.fromarray(pixels).filter(ImageFilter.GaussianBlur(radius=edge_blur))))
+
+
+def _encode(pixels: np.ndarray, options: EncodeOptions) -> EncodedImage:
+    return encode_image(Image.fromarray(pixels), options)
+
+
+# Declared in dependency order; HarmonyIndex.render's steps, one stage each
+STAGES = (
+    Stage('geometry', ('size',), (), _geometry),
+    Stage('fields', ('sigma', 'intensity', 'falloff_type'), ('geometry',), _source_fields),
+    Stage('mixing', ('state', 'calibration'), ('fields',), _mix, max_entries=2),
+    Stage('edges', ('edge_factor',), ('geometry', 'mixing'), _attenuate_edges, max_entries=1),
+    Stage('normalize', (), ('edges',), _normalize, max_entries=2),
+    Stage('blur', ('edge_blur',), ('normalize',), _blur),
+    Stage('encode', ('encode',), ('blur',), _encode),
+)
+
+
+class RenderPipeline:
+    """
+    HarmonyIndex.render as a graph of memoized stages.
+
+    Every stage declares the parameters and upstream stages it reads. Its
+    memo key is its own parameter values plus the keys of its upstream
+    stages, so a changed parameter misses in the stage that reads it and in
+    everything downstream, while upstream stages are served from their memo:
+    changing edge_blur recomputes only the blur (and encode), edge_factor
+    only attenuation onwards, and the state or calibration only mixing
+    onwards. Stages are evaluated lazily from the requested output back, so
+    a memoized downstream output never forces an upstream recomputation.
+    Output matches HarmonyIndex.render for the same spec.
+
+    Safe to share between threads: memo access is locked, while stages
+    compute outside the lock (two threads may occasionally compute the same
+    stage; both results are identical).
+
+    Parameters:
+    -----------
+    stages : Tuple[Stage, ...]
+        Stages in dependency order
+    """
+
+    def __init__(self, stages: Tuple[Stage, ...] = STAGES):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            unknown = [name for name in stage.upstream if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' reads undeclared stages {unknown}")
+            self.stages[stage.name] = stage
+        self._memo: Dict[str, OrderedDict] = {name: OrderedDict() for name in self.stages}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parameters(spec: RenderSpec, options: Optional[EncodeOptions] = None) -> Dict[str, object]:
+        """The parameter values stages read, from a spec and optional encode options."""
+        return {
+            'size': spec.size,
+            'sigma': spec.sigma,
+            'intensity': spec.intensity,
+            'edge_blur': spec.edge_blur,
+            'edge_factor': spec.edge_factor,
+            'falloff_type': spec.falloff_type,
+            'state': spec.state,
+            'calibration': spec.calibration,
+            'encode': options,
+        }
+
+    def run(self, spec: RenderSpec, target: str = 'blur', options: Optional[EncodeOptions] = None) -> PipelineRun:
+        """
+        Produce one stage's output for a spec, computing only stages whose memo misses.
+
+        Parameters:
+        -----------
+        spec : RenderSpec
+            The rendering specification
+        target : str
+            Stage whose output is returned ('blur' is the rendered pixels)
+        options : EncodeOptions, optional
+            Required when target is 'encode'
+
+        Returns:
+        --------
+        PipelineRun
+            The output and the names of the stages computed for it
+        """
+        if target not in self.stages:
+            raise ValueError(f"Unknown stage '{target}', expected one of {tuple(self.stages)}")
+        if target == 'encode' and options is None:
+            raise ValueError("Encode options are required for the 'encode' stage")
+        values = self.parameters(spec, options)
+        start = time.perf_counter()
+
+        keys: Dict[str, tuple] = {}
+        for stage in self.stages.values():
+            keys[stage.name] = (tuple(values[name] for name in stage.params),
+                                tuple(keys[name] for name in stage.upstream))
+
+        outputs: Dict[str, object] = {}
+        computed = []
+
+        def evaluate(name: str):
+            if name in outputs:
+                return outputs[name]
+            stage, memo = self.stages[name], self._memo[name]
+            with self._lock:
+                output = memo.get(keys[name], _MISSING)
+                if output is not _MISSING:
+                    memo.move_to_end(keys[name])
+            if output is _MISSING:
+                args = [evaluate(upstream) for upstream in stage.upstream] + [values[p] for p in stage.params]
+                output = stage.compute(*args)
+                with self._lock:
+                    memo[keys[name]] = output
+                    while len(memo) > stage.max_entries:
+                        memo.popitem(last=False)
+                computed.append(name)
+                metrics.PIPELINE_STAGES.inc(stage=name, outcome='computed')
+            else:
+                metrics.PIPELINE_STAGES.inc(stage=name, outcome='memoized')
+            outputs[name] = output
+            return output
+
+        output = evaluate(target)
+        return PipelineRun(output=output, computed=tuple(computed), seconds=time.perf_counter() - start)
+
+    def render(self, spec: RenderSpec) -> Image.Image:
+        """The rendered image for a spec, as HarmonyIndex.render would produce it (a new image per call)."""
+        return Image.fromarray(self.run(spec).output)
+
+    def encode(self, spec: RenderSpec, options: EncodeOptions) -> EncodedImage:
+        """The encoded rendering for a spec."""
+        return self.run(spec, target='encode', options=options).output
+
+    def memo_bytes(self) -> int:
+        """Memory held by memoized arrays and encodings (geometry is counted by harmony_index.geometry_bytes)."""
+        with self._lock:
+            outputs = [output for memo in self._memo.values() for output in memo.values()]
+        # ndarray and EncodedImage report nbytes; TriangleGeometry does not
+        return sum(getattr(output, 'nbytes', 0) for output in outputs)
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop the memo of one stage and every stage downstream of it, or of all stages."""
+        dropped = set(self.stages) if name is None else {name}
+        for stage in self.stages.values():
+            if dropped.intersection(stage.upstream):
+                dropped.add(stage.name)
+        with self._lock:
+            for stage_name in dropped:
+                self._memo[stage_name].clear()
+
+
+@functools.lru_cache(maxsize=1)
+def shared_pipeline() -> RenderPipeline:
+    """The process-wide pipeline HarmonyIndex.render(engine='pipeline') uses."""
+    return RenderPipeline()
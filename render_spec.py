@@ -0,0 +1,148 @@
+"""
+Marshall Triangle Render Specification
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import dataclasses
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+FALLOFF_TYPES = ('gaussian', 'inverse_square')
+
+# Floats are rounded to this many decimals; far below anything the sliders
+# can express, so distinct settings never collide
+QUANTIZE_DECIMALS = 4
+
+_CHANNELS = ('r', 'g', 'b')
+
+
+def _quantize(value: float) -> float:
+    # + 0.0 folds -0.0 into 0.0 so equal specs hash equally
+    return round(float(value), QUANTIZE_DECIMALS) + 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class RenderSpec:
+    """
+    Immutable description of one Marshall Triangle rendering.
+
+    Values are canonicalized on construction (rounded, clamped to the ranges
+    render and set_calibration enforce), so equal renderings always produce
+    equal specs and the same content hash.
+
+    Attributes:
+    -----------
+    size : int
+        Image edge length in pixels
+    sigma, intensity, edge_blur, edge_factor : float
+        Renderer parameters, as for HarmonyIndex
+    falloff_type : str
+        'gaussian' or 'inverse_square'
+    state : Tuple[float, float, float]
+        State vector (r, g, b), each in [0, 1]
+    calibration : Tuple[float, float, float]
+        White point (r, g, b), each in [0.01, 1]
+    """
+    size: int = 500
+    sigma: float = 0.30
+    intensity: float = 1.2
+    edge_blur: float = 0.5
+    edge_factor: float = 0.5
+    falloff_type: str = 'gaussian'
+    state: Tuple[float, float, float] = (1.0, 1.0, 1.0)
+    calibration: Tuple[float, float, float] = (1.0, 1.0, 1.0)
+    _digest: str = field(init=False, repr=False, compare=False, default='')
+
+    def __post_init__(self):
+        if self.falloff_type not in FALLOFF_TYPES:
+            raise ValueError(f"Unknown falloff type '{self.falloff_type}', expected one of {FALLOFF_TYPES}")
+        if len(self.state) != 3 or len(self.calibration) != 3:
+            raise ValueError("state and calibration must have three channels (r, g, b)")
+
+        canonical = {
+            'size': int(self.size),
+            'sigma': _quantize(self.sigma),
+            'intensity': _quantize(self.intensity),
+            'edge_blur': _quantize(self.edge_blur),
+            'edge_factor': _quantize(self.edge_factor),
+            'state': tuple(_quantize(max(0.0, min(1.0, value))) for value in self.state),
+            'calibration': tuple(_quantize(max(0.01, min(1.0, value))) for value in self.calibration),
+        }
+        for name, value in canonical.items():
+            object.__setattr__(self, name, value)
+
+        text = repr((self.size, self.sigma, self.intensity, self.edge_blur, self.edge_factor,
+                     self.falloff_type, self.state, self.calibration))
+        object.__setattr__(self, '_digest', hashlib.sha256(text.encode('utf-8')).hexdigest())
+
+    def __hash__(self) -> int:
+        return hash(self._digest)
+
+    @property
+    def key(self) -> str:
+        """Stable content hash, identical across processes and restarts."""
+        return self._digest[:16]
+
+    @property
+    def harmony_state(self) -> Dict[str, float]:
+        return dict(zip(_CHANNELS, self.state))
+
+    @property
+    def calibrated_white_point(self) -> Dict[str, float]:
+        return dict(zip(_CHANNELS, self.calibration))
+
+    def replace(self, **changes) -> 'RenderSpec':
+        """Return a copy with some fields changed (re-canonicalized)."""
+        return dataclasses.replace(self, **changes)
+
+    @classmethod
+    def from_params(cls, params: Dict, harmony_state: Optional[Dict[str, float]] = None,
+                    calibrated_white_point: Optional[Dict[str, float]] = None) -> 'RenderSpec':
+        """
+        Build a spec from the ad-hoc dicts used by presets, saved states and calibration.
+
+        Parameters:
+        -----------
+        params : Dict
+            Rendering params ('size', 'sigma', 'intensity', 'edge_blur', 'edge_factor', 'falloff_type')
+        harmony_state : Dict[str, float], optional
+            State vector; missing channels default to 1.0
+        calibrated_white_point : Dict[str, float], optional
+            White point; missing channels default to 1.0
+        """
+        harmony_state = harmony_state or {}
+        calibrated_white_point = calibrated_white_point or {}
+        return cls(
+            size=params.get('size', 500),
+            sigma=params.get('sigma', 0.30),
+            intensity=params.get('intensity', 1.2),
+            edge_blur=params.get('edge_blur', 0.5),
+            edge_factor=params.get('edge_factor', 0.5),
+            falloff_type=params.get('falloff_type', 'gaussian'),
+            state=tuple(harmony_state.get(key, 1.0) for key in _CHANNELS),
+            calibration=tuple(calibrated_white_point.get(key, 1.0) for key in _CHANNELS)
+        )
+
+    def to_params(self) -> Dict:
+        """The rendering params as a plain dict, in the shape presets store."""
+        return {
+            'size': self.size,
+            'sigma': self.sigma,
+            'intensity': self.intensity,
+            'edge_blur': self.edge_blur,
+            'edge_factor': self.edge_factor,
+            'falloff_type': self.falloff_type,
+        }
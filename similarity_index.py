@@ -0,0 +1,296 @@
+"""
+Marshall Triangle Similarity Index for Saved States and Presets
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import threading
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from harmony_index import HarmonyIndex
+from render_spec import RenderSpec
+
+# The colour signature averages the final colour over a barycentric lattice of
+# this many subdivisions, strictly inside the triangle (21 points)
+SIGNATURE_LEVELS = 8
+# Weight of each feature group in the distance between states; every axis spans about [0, 1]
+STATE_WEIGHTS = {'state': 1.0, 'calibration': 0.5, 'signature': 1.0}
+# Presets are rendering parameters: each is scaled by its slider range in the app
+PRESET_RANGES = {'sigma': (0.05, 0.5), 'intensity': (0.1, 5.0), 'edge_blur': (0.0, 2.0), 'edge_factor': (0.0, 1.0)}
+PRESET_WEIGHTS = {'params': 1.0, 'falloff': 1.0, 'signature': 1.0}
+KINDS = ('states', 'presets')
+
+
+def signature_points(levels: int = SIGNATURE_LEVELS) -> np.ndarray:
+    """(n, 2) interior barycentric lattice points of the triangle, in renderer coordinates."""
+    vertices = HarmonyIndex()._define_triangle()
+    weights = [(i, j, levels - i - j) for i in range(1, levels) for j in range(1, levels - i)]
+    return np.array(weights, dtype=np.float64) / levels @ vertices
+
+
+def color_signatures(specs: Sequence[RenderSpec]) -> np.ndarray:
+    """
+    Mean final colour of each spec over the signature lattice.
+
+    Each spec's colours come from query_colors at signature_points; the
+    lattice is inside the triangle, so none of it is masked.
+
+    Returns:
+    --------
+    numpy.ndarray
+        (n, 3) colours in [0, 1]
+    """
+    points = signature_points()
+    signatures = [HarmonyIndex.from_spec(spec).query_colors(points[:, 0], points[:, 1], spec.harmony_state,
+                                                            spec.falloff_type).mean(axis=0)
+                  for spec in specs]
+    return np.array(signatures).reshape(-1, 3)
+
+
+def state_features(specs: Sequence[RenderSpec], signatures: Optional[np.ndarray] = None) -> np.ndarray:
+    """(n, 9) weighted state, calibration and colour signature of saved states."""
+    signatures = color_signatures(specs) if signatures is None else signatures
+    return np.hstack([
+        np.array([spec.state for spec in specs]).reshape(-1, 3) * STATE_WEIGHTS['state'],
+        np.array([spec.calibration for spec in specs]).reshape(-1, 3) * STATE_WEIGHTS['calibration'],
+        signatures * STATE_WEIGHTS['signature'],
+    ])
+
+
+def preset_features(specs: Sequence[RenderSpec], signatures: Optional[np.ndarray] = None) -> np.ndarray:
+    """(n, 8) weighted parameters, falloff type and colour signature of rendering presets."""
+    signatures = color_signatures(specs) if signatures is None else signatures
+    params = np.array([[(getattr(spec, name) - low) / (high - low) for name, (low, high) in PRESET_RANGES.items()]
+                       for spec in specs]).reshape(-1, len(PRESET_RANGES))
+    falloff = np.array([[spec.falloff_type == 'gaussian'] for spec in specs], dtype=np.float64).reshape(-1, 1)
+    return np.hstack([params * PRESET_WEIGHTS['params'], falloff * PRESET_WEIGHTS['falloff'],
+                      signatures * PRESET_WEIGHTS['signature']])
+
+
+class VectorIndex:
+    """
+    Nearest-neighbour index over keyed vectors with incremental insert and delete.
+
+    Vectors live in a static KD-tree plus a small buffer of recent inserts
+    that queries scan by brute force; deleted or replaced tree entries are
+    tombstoned and filtered from results. When the buffer or the tombstones
+    outgrow rebuild_fraction of the index (and at least min_rebuild), the
+    tree is rebuilt from the live vectors, so updates cost amortized
+    O(log n) and queries stay one tree lookup plus a bounded scan. Every
+    method is safe to call from any thread.
+
+    Parameters:
+    -----------
+    dim : int
+        Vector dimension
+    rebuild_fraction : float
+        Share of the index the insert buffer or tombstones may reach before a rebuild
+    min_rebuild : int
+        Buffer or tombstone count below which the tree is never rebuilt
+    """
+
+    def __init__(self, dim: int, rebuild_fraction: float = 0.125, min_rebuild: int = 256):
+        self.dim = dim
+        self.rebuild_fraction = rebuild_fraction
+        self.min_rebuild = min_rebuild
+        self._lock = threading.RLock()
+        self._tree: Optional[cKDTree] = None
+        self._tree_keys: List[Hashable] = []
+        self._tree_live = np.zeros(0, dtype=bool)
+        self._tree_position: Dict[Hashable, int] = {}
+        self._dead = 0
+        self._buffer_keys: List[Hashable] = []
+        self._buffer = np.zeros((0, dim))
+        self._buffer_position: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tree_position) + len(self._buffer_position)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._tree_position or key in self._buffer_position
+
+    def build(self, keys: Sequence[Hashable], vectors: np.ndarray):
+        """Replace the whole index with these entries (later duplicates of a key win)."""
+        vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, self.dim)
+        latest = {key: i for i, key in enumerate(keys)}
+        with self._lock:
+            self._set_tree(list(latest), vectors[list(latest.values())])
+            self._buffer_keys, self._buffer, self._buffer_position = [], np.zeros((0, self.dim)), {}
+
+    def insert(self, key: Hashable, vector):
+        """Add an entry, replacing any entry with the same key."""
+        vector = np.asarray(vector, dtype=np.float64).reshape(self.dim)
+        with self._lock:
+            if key in self._buffer_position:
+                self._buffer[self._buffer_position[key]] = vector
+                return
+            self._discard_from_tree(key)
+            self._buffer_position[key] = len(self._buffer_keys)
+            self._buffer_keys.append(key)
+            self._buffer = np.vstack([self._buffer, vector])
+            self._maybe_rebuild()
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove an entry; returns whether it existed."""
+        with self._lock:
+            if key in self._buffer_position:
+                # Swap the last buffered entry into the freed row
+                position = self._buffer_position.pop(key)
+                last = len(self._buffer_keys) - 1
+                if position != last:
+                    moved = self._buffer_keys[last]
+                    self._buffer_keys[position] = moved
+                    self._buffer[position] = self._buffer[last]
+                    self._buffer_position[moved] = position
+                self._buffer_keys.pop()
+                self._buffer = self._buffer[:last]
+                return True
+            found = self._discard_from_tree(key)
+            self._maybe_rebuild()
+            return found
+
+    def nearest(self, vector, k: int = 5) -> List[Tuple[Hashable, float]]:
+        """The k entries closest to vector, as (key, Euclidean distance), nearest first."""
+        vector = np.asarray(vector, dtype=np.float64).reshape(self.dim)
+        with self._lock:
+            candidates = []
+            if self._tree is not None and k > 0:
+                # Ask for enough extra neighbours that k live ones survive the tombstones
+                want = min(k + self._dead, self._tree.n)
+                distances, indices = self._tree.query(vector, k=want)
+                distances, indices = np.atleast_1d(distances), np.atleast_1d(indices)
+                live = self._tree_live[indices]
+                candidates = [(self._tree_keys[i], float(d)) for d, i in zip(distances[live], indices[live])][:k]
+            candidates += self._scan_buffer(vector)
+        return sorted(candidates, key=lambda item: item[1])[:k]
+
+    def within(self, vector, radius: float) -> List[Tuple[Hashable, float]]:
+        """Every entry within radius of vector, as (key, Euclidean distance), nearest first."""
+        vector = np.asarray(vector, dtype=np.float64).reshape(self.dim)
+        with self._lock:
+            candidates = []
+            if self._tree is not None:
+                indices = np.array(self._tree.query_ball_point(vector, radius), dtype=np.int64)
+                indices = indices[self._tree_live[indices]]
+                distances = np.linalg.norm(self._tree.data[indices] - vector, axis=1)
+                candidates = [(self._tree_keys[i], float(d)) for d, i in zip(distances, indices)]
+            candidates += [(key, d) for key, d in self._scan_buffer(vector) if d <= radius]
+        return sorted(candidates, key=lambda item: item[1])
+
+    def rebuild(self):
+        """Fold the insert buffer into a fresh tree and drop tombstones."""
+        with self._lock:
+            live = np.nonzero(self._tree_live)[0]
+            keys = [self._tree_keys[i] for i in live] + self._buffer_keys
+            vectors = np.vstack([self._tree.data[live] if self._tree is not None else np.zeros((0, self.dim)),
+                                 self._buffer])
+            self._set_tree(keys, vectors)
+            self._buffer_keys, self._buffer, self._buffer_position = [], np.zeros((0, self.dim)), {}
+
+    def _set_tree(self, keys: List[Hashable], vectors: np.ndarray):
+        self._tree = cKDTree(vectors) if len(keys) else None
+        self._tree_keys = keys
+        self._tree_live = np.ones(len(keys), dtype=bool)
+        self._tree_position = {key: i for i, key in enumerate(keys)}
+        self._dead = 0
+
+    def _discard_from_tree(self, key: Hashable) -> bool:
+        position = self._tree_position.pop(key, None)
+        if position is None:
+            return False
+        self._tree_live[position] = False
+        self._dead += 1
+        return True
+
+    def _maybe_rebuild(self):
+        limit = max(self.min_rebuild, self.rebuild_fraction * len(self._tree_keys))
+        if len(self._buffer_keys) > limit or self._dead > limit:
+            self.rebuild()
+
+    def _scan_buffer(self, vector: np.ndarray) -> List[Tuple[Hashable, float]]:
+        if not self._buffer_keys:
+            return []
+        distances = np.linalg.norm(self._buffer - vector, axis=1)
+        return [(key, float(d)) for key, d in zip(self._buffer_keys, distances)]
+
+
+class SimilarityIndex:
+    """
+    Saved states (or rendering presets) indexed for "most similar" and "closest colour" queries.
+
+    Each entry is a resolved RenderSpec. It is indexed twice: by its feature
+    vector (state_features or preset_features: the state or parameters, the
+    calibration and the colour signature) and by its colour signature alone,
+    the mean colour it displays, so a colour picked by the user can be
+    matched without rendering anything.
+
+    Parameters:
+    -----------
+    kind : str
+        'states' or 'presets', selecting the feature vector
+    """
+
+    def __init__(self, kind: str = 'states'):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind '{kind}', expected one of {KINDS}")
+        self.kind = kind
+        self._features = state_features if kind == 'states' else preset_features
+        dim = 9 if kind == 'states' else len(PRESET_RANGES) + 4
+        self.by_features = VectorIndex(dim)
+        self.by_color = VectorIndex(3)
+        self.specs: Dict[str, RenderSpec] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def build(self, names: Sequence[str], specs: Sequence[RenderSpec]):
+        """Index a whole library at once (signatures are computed in one vectorized pass)."""
+        signatures = color_signatures(specs)
+        with self._lock:
+            self.by_features.build(names, self._features(specs, signatures))
+            self.by_color.build(names, signatures)
+            self.specs = dict(zip(names, specs))
+
+    def insert(self, name: str, spec: RenderSpec):
+        """Index a saved entry, replacing one with the same name."""
+        signature = color_signatures([spec])
+        with self._lock:
+            self.by_features.insert(name, self._features([spec], signature)[0])
+            self.by_color.insert(name, signature[0])
+            self.specs[name] = spec
+
+    def delete(self, name: str) -> bool:
+        """Stop indexing a deleted entry; returns whether it was indexed."""
+        with self._lock:
+            self.by_color.delete(name)
+            self.specs.pop(name, None)
+            return self.by_features.delete(name)
+
+    def similar(self, spec: RenderSpec, k: int = 5) -> List[Tuple[str, float]]:
+        """The k saved entries closest to spec in feature space, as (name, distance)."""
+        return self.by_features.nearest(self._features([spec])[0], k)
+
+    def similar_within(self, spec: RenderSpec, radius: float) -> List[Tuple[str, float]]:
+        """Saved entries within radius of spec in feature space, as (name, distance)."""
+        return self.by_features.within(self._features([spec])[0], radius)
+
+    def closest_to_color(self, color: Sequence[float], k: int = 5) -> List[Tuple[str, float]]:
+        """The k saved entries whose mean colour is closest to an RGB colour in [0, 1]."""
+        return self.by_color.nearest(color, k)
@@ -0,0 +1,133 @@
+"""
+Marshall Triangle Single-Flight Call Deduplication
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Optional
+
+import metrics
+
+
+class FlightTimeout(TimeoutError):
+    """A caller gave up waiting for another caller's identical computation."""
+
+
+@dataclass
+class _Call:
+    # One in-flight computation and its outcome, shared by everyone who asked for it
+    done: threading.Event = field(default_factory=threading.Event)
+    value: object = None
+    error: Optional[Exception] = None
+    abandoned: bool = False
+
+
+class SingleFlight:
+    """
+    Run one computation per key at a time; identical concurrent calls share its outcome.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it runs wait for it and receive the same value, or the
+    same exception, instead of computing again. Nothing is kept once the
+    call finishes, so a later call computes afresh (put a cache behind the
+    function for that). A waiter that runs out of timeout raises
+    FlightTimeout while the computation carries on for the others. If the
+    leader is interrupted by something other than an Exception (a Streamlit
+    rerun or stop, KeyboardInterrupt), its waiters are not handed that
+    control-flow exception: one of them becomes the new leader.
+
+    Shared values are the same object for every caller and must be treated
+    as read-only.
+
+    Parameters:
+    -----------
+    name : str
+        Group label in the marshall_single_flight_calls metric
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self) -> int:
+        """Keys currently being computed."""
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: Hashable, fn: Callable[[], object], timeout: Optional[float] = None) -> object:
+        """
+        Return fn(), sharing one evaluation among concurrent calls with the same key.
+
+        Parameters:
+        -----------
+        key : Hashable
+            Identifies the computation; calls with equal keys must be interchangeable
+        fn : Callable[[], object]
+            The computation, run by the leader only
+        timeout : float, optional
+            Seconds a waiter waits for the leader before raising FlightTimeout
+            (None waits as long as the leader runs)
+
+        Returns:
+        --------
+        object
+            fn's value, whether computed by this caller or shared
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+
+            if leader:
+                return self._lead(key, call, fn)
+
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not call.done.wait(remaining):
+                metrics.SINGLE_FLIGHT.inc(group=self.name, role='timeout')
+                raise FlightTimeout(f"Gave up after {timeout:g}s waiting for an identical {self.name} in flight")
+            if call.abandoned:
+                # The leader was interrupted; compete to lead a fresh call
+                continue
+            if call.error is not None:
+                metrics.SINGLE_FLIGHT.inc(group=self.name, role='shared_error')
+                raise call.error
+            metrics.SINGLE_FLIGHT.inc(group=self.name, role='shared')
+            return call.value
+
+    def _lead(self, key: Hashable, call: _Call, fn: Callable[[], object]) -> object:
+        try:
+            call.value = fn()
+        except Exception as error:
+            call.error = error
+            metrics.SINGLE_FLIGHT.inc(group=self.name, role='error')
+            raise
+        except BaseException:
+            call.abandoned = True
+            metrics.SINGLE_FLIGHT.inc(group=self.name, role='abandoned')
+            raise
+        else:
+            metrics.SINGLE_FLIGHT.inc(group=self.name, role='leader')
+            return call.value
+        finally:
+            # Unregister before waking waiters, so a retrying waiter starts a new call
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
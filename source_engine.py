@@ -0,0 +1,283 @@
+"""
+Marshall Triangle K-Source Matrix Engine
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import functools
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+FALLOFF_TYPES = ('gaussian', 'inverse_square')
+
+# Tolerance of the inside-polygon test, as HarmonyIndex uses for the triangle
+POLYGON_BUFFER = 0.005
+
+# State or calibration for K sources: a dict keyed by source name, or K values in source order
+Weights = Union[Dict[str, float], Sequence[float]]
+
+# Falloff shape: the gaussian's spread is this multiple of sigma; the inverse-square falloff
+# is scaled by INVERSE_SQUARE_GAIN and softened by INVERSE_SQUARE_SOFTENING at the source
+GAUSSIAN_SPREAD = 1.8
+INVERSE_SQUARE_GAIN = 0.8
+INVERSE_SQUARE_SOFTENING = 0.05
+
+
+def source_falloff(dist_sq, falloff_type: str, sigma: float, intensity: float):
+    """
+    The light one source contributes at a squared distance from it.
+
+    This is the colour model's falloff, and every renderer evaluates sources
+    through it (HarmonyIndex's falloff methods, SourceEngine.basis and the
+    render pipeline).
+
+    Parameters:
+    -----------
+    dist_sq : float or numpy.ndarray
+        Squared distance from the source
+    falloff_type : str
+        'gaussian' or 'inverse_square'
+    sigma, intensity : float
+        As for HarmonyIndex (sigma only affects the gaussian)
+    """
+    if falloff_type == 'gaussian':
+        spread = sigma * GAUSSIAN_SPREAD
+        return np.exp(-dist_sq / (2 * spread**2)) * intensity
+    return intensity * INVERSE_SQUARE_GAIN / (dist_sq + INVERSE_SQUARE_SOFTENING)
+
+
+@dataclass(frozen=True)
+class Source:
+    """A light source: its name (the state key that weights it), position and RGB colour."""
+    name: str
+    position: Tuple[float, float]
+    color: Tuple[float, float, float]
+
+
+def _polygon_sign(x, y, p2, p3):
+    # Same expression as HarmonyIndex._inside_triangle_mask, so the K=3 preset matches it bit for bit
+    return (x - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (y - p3[1])
+
+
+@functools.lru_cache(maxsize=8)
+def _polygon_geometry(size: int, polygon: Tuple[Tuple[float, float], ...]):
+    # (mask, x, y of inside pixels) for a convex polygon, in image orientation
+    coords = np.linspace(-1, 1, size)
+    xg, yg = np.meshgrid(coords, coords)
+    yg = yg[::-1]
+
+    has_neg = np.zeros((size, size), dtype=bool)
+    has_pos = np.zeros((size, size), dtype=bool)
+    for p2, p3 in zip(polygon, polygon[1:] + polygon[:1]):
+        d = _polygon_sign(xg, yg, p2, p3)
+        has_neg |= d < -POLYGON_BUFFER
+        has_pos |= d > POLYGON_BUFFER
+    mask = ~(has_neg & has_pos)
+
+    x, y = xg[mask], yg[mask]
+    for array in (mask, x, y):
+        array.flags.writeable = False
+    return mask, x, y
+
+
+def regular_polygon(k: int, scale: float = 0.95) -> Tuple[Tuple[float, float], ...]:
+    """
+    Vertices of a regular k-gon with a vertex at the top, fitted to the [-1, 1] square.
+
+    Parameters:
+    -----------
+    k : int
+        Number of vertices, at least 3
+    scale : float
+        Fraction of the square the polygon spans, to avoid clipping at corners
+    """
+    if k < 3:
+        raise ValueError("A polygon needs at least 3 vertices")
+    angles = [math.pi / 2 + 2 * math.pi * i / k for i in range(k)]
+    points = [(math.cos(a), math.sin(a)) for a in angles]
+    xs, ys = [p[0] for p in points], [p[1] for p in points]
+    # Centre the bounding box and fit its larger side to 2 * scale
+    cx, cy = (max(xs) + min(xs)) / 2, (max(ys) + min(ys)) / 2
+    extent = max(max(xs) - min(xs), max(ys) - min(ys)) / 2
+    return tuple(((px - cx) / extent * scale, (py - cy) / extent * scale) for px, py in points)
+
+
+def edge_midpoints(polygon: Sequence[Tuple[float, float]]) -> Tuple[Tuple[float, float], ...]:
+    """Midpoint of every polygon edge, edge i joining vertex i and vertex i + 1."""
+    return tuple(((a[0] + b[0]) / 2, (a[1] + b[1]) / 2) for a, b in zip(polygon, tuple(polygon[1:]) + (polygon[0],)))
+
+
+class SourceEngine:
+    """
+    Render K coloured light sources inside a convex polygon as one matrix product.
+
+    The falloff of every source at every inside pixel is evaluated once per
+    sigma into an (n_pixels x K) basis. A frame is then the basis times a
+    (K x 3) matrix whose rows are the source colours scaled by their
+    calibrated state weights, a single BLAS call whose cost grows with the
+    pixel count, not with Python-level loops over sources. Normalization and
+    blur follow HarmonyIndex.render; marshall_triangle() is the K=3 preset and
+    reproduces it exactly.
+
+    Parameters:
+    -----------
+    sources : Sequence[Source]
+        The K sources, in state order
+    polygon : Sequence[Tuple[float, float]]
+        Vertices of the convex region that is lit, in order
+    size : int
+        Image edge length in pixels
+    sigma, intensity, edge_blur, edge_factor : float
+        As for HarmonyIndex
+    falloff_type : str
+        The type of falloff function to use ('gaussian' or 'inverse_square')
+    """
+
+    _MAX_CACHED_BASES = 4
+
+    def __init__(self, sources: Sequence[Source], polygon: Sequence[Tuple[float, float]], size: int = 500,
+                 sigma: float = 0.30, intensity: float = 1.2, edge_blur: float = 0.5, edge_factor: float = 0.5,
+                 falloff_type: str = 'gaussian'):
+        if not sources:
+            raise ValueError("At least one source is required")
+        if falloff_type not in FALLOFF_TYPES:
+            raise ValueError(f"Unknown falloff type '{falloff_type}', expected one of {FALLOFF_TYPES}")
+        self.sources = tuple(sources)
+        self.polygon = tuple((float(px), float(py)) for px, py in polygon)
+        self.size = size
+        self.sigma = sigma
+        self.intensity = intensity
+        self.edge_blur = edge_blur
+        self.edge_factor = edge_factor
+        self.falloff_type = falloff_type
+
+        self.mask, x, y = _polygon_geometry(size, self.polygon)
+        self._dist_sq = np.stack([(x - sx)**2 + (y - sy)**2 for sx, sy in (s.position for s in self.sources)],
+                                 axis=-1)
+        self._colors = np.array([s.color for s in self.sources], dtype=np.float64)
+        self._bases = {}
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(source.name for source in self.sources)
+
+    @classmethod
+    def marshall_triangle(cls, harmony, falloff_type='gaussian') -> 'SourceEngine':
+        """
+        The K=3 Marshall Triangle preset for a HarmonyIndex's settings.
+
+        Red (privacy), green (performance) and blue (personalization) sources
+        sit at the midpoints of the triangle's left, right and bottom edges and
+        are weighted by the state's 'r', 'g' and 'b' channels.
+        """
+        vertices = harmony._define_triangle()
+        colors = {'r': (1.0, 0.0, 0.0), 'g': (0.0, 1.0, 0.0), 'b': (0.0, 0.0, 1.0)}
+        sources = [Source(name=key, position=position, color=colors[key])
+                   for key, position in zip(['r', 'g', 'b'], harmony._calculate_midpoints(vertices))]
+        return cls(sources, vertices, size=harmony.size, sigma=harmony.sigma, intensity=harmony.intensity,
+                   edge_blur=harmony.edge_blur, edge_factor=harmony.edge_factor, falloff_type=falloff_type)
+
+    @classmethod
+    def regular(cls, sources: Sequence[Tuple[str, Tuple[float, float, float]]], **kwargs) -> 'SourceEngine':
+        """
+        Sources at the edge midpoints of a regular polygon with one edge per source.
+
+        Parameters:
+        -----------
+        sources : Sequence[Tuple[str, Tuple[float, float, float]]]
+            (name, RGB colour) for each source, at least three
+        **kwargs
+            Remaining SourceEngine parameters (size, sigma, ...)
+        """
+        polygon = regular_polygon(len(sources))
+        positions = edge_midpoints(polygon)
+        return cls([Source(name=name, position=position, color=tuple(color))
+                    for (name, color), position in zip(sources, positions)], polygon, **kwargs)
+
+    def _vector(self, values: Optional[Weights], low: float) -> np.ndarray:
+        if values is None:
+            return np.ones(len(self.sources))
+        if isinstance(values, dict):
+            values = [values.get(name, 1.0) for name in self.names]
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape != (len(self.sources),):
+            raise ValueError(f"Expected {len(self.sources)} values, got shape {values.shape}")
+        return np.clip(values, low, 1.0)
+
+    def calibration_scale(self, calibration: Optional[Weights] = None) -> np.ndarray:
+        """Per-source factors that make the calibration state render as balanced."""
+        calibration = self._vector(calibration, 0.01)
+        return calibration.max() / calibration
+
+    def basis(self, sigma: Optional[float] = None) -> np.ndarray:
+        """
+        The (n_inside x K) falloff of every source at every inside pixel, scaled by intensity.
+
+        Cached per sigma; treat the result as read-only.
+        """
+        sigma = self.sigma if sigma is None else sigma
+        basis = self._bases.get(sigma)
+        if basis is None:
+            basis = source_falloff(self._dist_sq, self.falloff_type, sigma, self.intensity)
+            if len(self._bases) >= self._MAX_CACHED_BASES:
+                self._bases.pop(next(iter(self._bases)))
+            self._bases[sigma] = basis
+        return basis
+
+    def color_matrix(self, state: Optional[Weights] = None, calibration: Optional[Weights] = None) -> np.ndarray:
+        """The (K x 3) matrix of source colours scaled by calibrated state weights."""
+        weights = self._vector(state, 0.0) * self.calibration_scale(calibration)
+        return weights[:, None] * self._colors
+
+    def render_array(self, state: Optional[Weights] = None, calibration: Optional[Weights] = None,
+                     sigma: Optional[float] = None) -> np.ndarray:
+        """
+        Render to a (size, size, 3) uint8 array, before blur.
+
+        Parameters:
+        -----------
+        state : Dict[str, float] or Sequence[float], optional
+            Source weights in [0, 1]; missing names default to 1.0
+        calibration : Dict[str, float] or Sequence[float], optional
+            State to render as balanced; defaults to all 1.0
+        sigma : float, optional
+            Gaussian sigma; defaults to the engine's sigma
+        """
+        rgb = self.basis(sigma) @ self.color_matrix(state, calibration)
+
+        channels = np.zeros((self.size, self.size, 3))
+        channels[self.mask] = rgb
+        # render attenuates the one-pixel ring just outside the mask by
+        # edge_factor; every channel is zero there, so that step is omitted
+        norm = np.minimum(np.maximum(channels.max(axis=-1), 1e-10), 1.0)
+        mask_norm = norm > 0.1
+        channels[mask_norm] /= norm[mask_norm, None]
+        return (np.clip(channels, 0, 1) * 255).astype(np.uint8)
+
+    def render(self, state: Optional[Weights] = None, calibration: Optional[Weights] = None,
+               sigma: Optional[float] = None) -> Image.Image:
+        """
+        Render one image; parameters as for render_array.
+
+        Returns:
+        --------
+        PIL.Image.Image
+            The blurred rendering
+        """
+        img = Image.fromarray(self.render_array(state, calibration, sigma))
+        return img.filter(ImageFilter.GaussianBlur(radius=self.edge_blur))
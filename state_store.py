@@ -0,0 +1,193 @@
+"""
+Marshall Triangle Saved State Store
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_DB_PATH = os.environ.get(
+    'MARSHALL_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'harmony_presets.db')
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS marshall_states (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    icon_params TEXT NOT NULL,
+    r REAL NOT NULL,
+    g REAL NOT NULL,
+    b REAL NOT NULL,
+    calibration TEXT NOT NULL,
+    thumbnail BLOB,
+    updated_at REAL NOT NULL,
+    UNIQUE (owner, name)
+);
+CREATE INDEX IF NOT EXISTS idx_marshall_states_name ON marshall_states (name);
+
+CREATE TABLE IF NOT EXISTS rendering_presets (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    params TEXT NOT NULL,
+    thumbnail BLOB,
+    updated_at REAL NOT NULL,
+    UNIQUE (owner, name)
+);
+CREATE INDEX IF NOT EXISTS idx_rendering_presets_name ON rendering_presets (name);
+"""
+
+# Tables whose rows can be listed, fetched and deleted by (owner, name)
+_TABLES = ('marshall_states', 'rendering_presets')
+
+
+class StateStore:
+    """
+    SQLite-backed store for saved Marshall states and rendering presets.
+
+    Rows are keyed by (owner, name) and thumbnails are kept as binary blobs
+    that listing never loads, so galleries page through metadata and fetch
+    thumbnails only for what is on screen. A local stand-in for the Postgres
+    module listed in .replit; every method is safe to call from any thread.
+
+    Parameters:
+    -----------
+    path : str
+        SQLite database file (created on first use)
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _list(self, table: str, owner: str, limit: Optional[int], offset: int) -> List[sqlite3.Row]:
+        columns = 'name, icon_params, r, g, b, calibration' if table == 'marshall_states' else 'name, params'
+        query = (f"SELECT {columns}, thumbnail IS NOT NULL AS has_thumbnail, updated_at "
+                 f"FROM {table} WHERE owner = ? ORDER BY id LIMIT ? OFFSET ?")
+        return self._connect().execute(query, (owner, -1 if limit is None else limit, offset)).fetchall()
+
+    def count(self, table: str, owner: str) -> int:
+        """Number of saved rows for an owner in 'marshall_states' or 'rendering_presets'."""
+        if table not in _TABLES:
+            raise ValueError(f"Unknown table '{table}'")
+        return self._connect().execute(f"SELECT COUNT(*) FROM {table} WHERE owner = ?", (owner,)).fetchone()[0]
+
+    def delete(self, table: str, owner: str, name: str) -> bool:
+        """Delete a row by name; returns whether it existed."""
+        if table not in _TABLES:
+            raise ValueError(f"Unknown table '{table}'")
+        with self._connect() as conn:
+            return conn.execute(f"DELETE FROM {table} WHERE owner = ? AND name = ?", (owner, name)).rowcount > 0
+
+    def thumbnails(self, table: str, owner: str, names: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Fetch thumbnail blobs for the given names in one query."""
+        if table not in _TABLES:
+            raise ValueError(f"Unknown table '{table}'")
+        names = list(names)
+        if not names:
+            return {}
+        placeholders = ', '.join('?' for _ in names)
+        rows = self._connect().execute(
+            f"SELECT name, thumbnail FROM {table} WHERE owner = ? AND name IN ({placeholders})", (owner, *names)
+        ).fetchall()
+        return {row['name']: row['thumbnail'] for row in rows}
+
+    def save_state(self, owner: str, name: str, icon_params: Dict, target: Dict[str, float],
+                   calibration: Optional[Dict[str, float]] = None, thumbnail: Optional[bytes] = None):
+        """Insert or replace a saved Marshall state."""
+        calibration = calibration or {'r': 1.0, 'g': 1.0, 'b': 1.0}
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO marshall_states (owner, name, icon_params, r, g, b, calibration, thumbnail, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (owner, name) DO UPDATE SET
+                    icon_params = excluded.icon_params, r = excluded.r, g = excluded.g, b = excluded.b,
+                    calibration = excluded.calibration, thumbnail = excluded.thumbnail, updated_at = excluded.updated_at
+                """,
+                (owner, name, json.dumps(icon_params), target['r'], target['g'], target['b'],
+                 json.dumps(calibration), thumbnail, time.time())
+            )
+
+    def list_states(self, owner: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """
+        List saved Marshall states without their thumbnails.
+
+        Returns:
+        --------
+        List[Dict]
+            Dicts with 'name', 'icon_params', 'target', 'calibration',
+            'has_thumbnail' and 'updated_at', oldest first
+        """
+        return [
+            {
+                'name': row['name'],
+                'icon_params': json.loads(row['icon_params']),
+                'target': {'r': row['r'], 'g': row['g'], 'b': row['b']},
+                'calibration': json.loads(row['calibration']),
+                'has_thumbnail': bool(row['has_thumbnail']),
+                'updated_at': row['updated_at'],
+            }
+            for row in self._list('marshall_states', owner, limit, offset)
+        ]
+
+    def save_preset(self, owner: str, name: str, params: Dict, thumbnail: Optional[bytes] = None):
+        """Insert or replace a rendering preset."""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO rendering_presets (owner, name, params, thumbnail, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (owner, name) DO UPDATE SET
+                    params = excluded.params, thumbnail = excluded.thumbnail, updated_at = excluded.updated_at
+                """,
+                (owner, name, json.dumps(params), thumbnail, time.time())
+            )
+
+    def list_presets(self, owner: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """
+        List rendering presets without their thumbnails.
+
+        Returns:
+        --------
+        List[Dict]
+            Dicts with 'name', 'params', 'has_thumbnail' and 'updated_at', oldest first
+        """
+        return [
+            {
+                'name': row['name'],
+                'params': json.loads(row['params']),
+                'has_thumbnail': bool(row['has_thumbnail']),
+                'updated_at': row['updated_at'],
+            }
+            for row in self._list('rendering_presets', owner, limit, offset)
+        ]
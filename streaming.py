@@ -0,0 +1,330 @@
+"""
+Marshall Triangle Live Streaming Renderer
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterable, Callable, Dict, Iterable, Iterator, AsyncIterator, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from harmony_index import HarmonyIndex, FrameRenderer
+
+# A source item is a (timestamp, state) pair or a StateSample
+SourceItem = Union[Tuple[float, Dict[str, float]], 'StateSample']
+
+
+@dataclass(frozen=True)
+class StateSample:
+    """A timestamped state vector from a live metrics feed."""
+    timestamp: float
+    state: Dict[str, float]
+
+
+@dataclass(frozen=True)
+class StreamFrame:
+    """A rendered frame and the sample it shows."""
+    image: Image.Image
+    state: Dict[str, float]
+    timestamp: float
+    sequence: int
+    latency: float
+
+
+@dataclass(frozen=True)
+class StreamStats:
+    """
+    Backpressure and latency counters for a stream.
+
+    received counts samples read from the source, coalesced the samples that
+    were replaced by a newer one before being rendered, skipped_unchanged the
+    samples whose quantized state matched the frame on screen. Latency is
+    measured from a sample's arrival to the emission of its frame.
+    """
+    received: int
+    coalesced: int
+    skipped_unchanged: int
+    rendered: int
+    pending: bool
+    latency_p50: float
+    latency_p95: float
+    latency_max: float
+
+
+class _LatestSample:
+    # Single-slot mailbox: a newer sample replaces an unconsumed one, so a slow
+    # renderer never builds a backlog
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._sample = None
+        self._arrived_at = 0.0
+        self._closed = False
+        self.received = 0
+        self.coalesced = 0
+
+    def put(self, sample: StateSample):
+        with self._condition:
+            if self._sample is not None:
+                self.coalesced += 1
+            self._sample = sample
+            self._arrived_at = time.monotonic()
+            self.received += 1
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def take(self, timeout: Optional[float] = None):
+        """Wait for a sample; returns (sample, arrived_at), or None once closed and drained."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._sample is not None or self._closed, timeout=timeout)
+            if self._sample is None:
+                return None
+            sample, arrived_at = self._sample, self._arrived_at
+            self._sample = None
+            return sample, arrived_at
+
+    def take_nowait(self):
+        with self._condition:
+            if self._sample is None:
+                return None
+            sample, arrived_at = self._sample, self._arrived_at
+            self._sample = None
+            return sample, arrived_at
+
+    @property
+    def pending(self) -> bool:
+        return self._sample is not None
+
+    @property
+    def closed(self) -> bool:
+        return self._closed and self._sample is None
+
+
+def _as_sample(item: SourceItem) -> StateSample:
+    if isinstance(item, StateSample):
+        return item
+    timestamp, state = item
+    return StateSample(timestamp=float(timestamp), state=dict(state))
+
+
+class StreamingRenderer:
+    """
+    Render a continuous feed of state vectors at a bounded frame rate.
+
+    Samples are read as fast as the source produces them, but only the most
+    recent one is rendered at each frame tick; intermediate samples are
+    coalesced. A sample whose quantized state equals the frame already shown
+    is not re-rendered. Frames come from a FrameRenderer, so geometry and
+    falloff fields are shared across the whole stream.
+
+    Parameters:
+    -----------
+    harmony : HarmonyIndex
+        Renderer providing size, sigma, intensity, edge settings and calibration
+    falloff_type : str
+        The type of falloff function to use ('gaussian' or 'inverse_square')
+    target_fps : float
+        Maximum frames emitted per second
+    quantum : float
+        State channels are rounded to this step before comparing and rendering
+    sigma_for_state : Callable, optional
+        Chooses sigma per frame from its state (e.g. adaptive sigma)
+    latency_window : int
+        Number of recent frames kept for latency percentiles
+    """
+
+    def __init__(self, harmony: HarmonyIndex, falloff_type='gaussian', target_fps: float = 10.0,
+                 quantum: float = 0.01, sigma_for_state: Optional[Callable[[Dict[str, float]], float]] = None,
+                 latency_window: int = 256):
+        self.renderer = FrameRenderer(harmony, falloff_type=falloff_type)
+        self.period = 1.0 / target_fps
+        self.quantum = quantum
+        self.sigma_for_state = sigma_for_state
+        self._slot = _LatestSample()
+        self._latencies = deque(maxlen=latency_window)
+        self._last_key = None
+        self._sequence = 0
+        self._rendered = 0
+        self._skipped = 0
+
+    def _quantize(self, state: Dict[str, float]) -> Dict[str, float]:
+        steps = 1.0 / self.quantum
+        return {key: round(max(0.0, min(1.0, state.get(key, 1.0))) * steps) / steps for key in ['r', 'g', 'b']}
+
+    def _render(self, sample: StateSample, arrived_at: float) -> Optional[StreamFrame]:
+        state = self._quantize(sample.state)
+        key = (state['r'], state['g'], state['b'])
+        if key == self._last_key:
+            self._skipped += 1
+            return None
+
+        sigma = None
+        if self.sigma_for_state is not None:
+            sigma = round(self.sigma_for_state(state), 3)
+        image = self.renderer.render_frame(state, sigma=sigma)
+        self._last_key = key
+        self._rendered += 1
+        self._sequence += 1
+
+        latency = time.monotonic() - arrived_at
+        self._latencies.append(latency)
+        return StreamFrame(image=image, state=state, timestamp=sample.timestamp, sequence=self._sequence, latency=latency)
+
+    @property
+    def stats(self) -> StreamStats:
+        """Snapshot of backpressure and latency counters."""
+        latencies = np.array(self._latencies) if self._latencies else np.zeros(1)
+        return StreamStats(
+            received=self._slot.received,
+            coalesced=self._slot.coalesced,
+            skipped_unchanged=self._skipped,
+            rendered=self._rendered,
+            pending=self._slot.pending,
+            latency_p50=float(np.percentile(latencies, 50)),
+            latency_p95=float(np.percentile(latencies, 95)),
+            latency_max=float(latencies.max())
+        )
+
+    def frames(self, source: Iterable[SourceItem]) -> Iterator[StreamFrame]:
+        """
+        Render frames from a blocking iterator of samples.
+
+        The source is drained on a background thread; the generator finishes
+        once the source is exhausted and its last sample has been handled. An
+        error raised by the source is raised here after the samples before it;
+        when the generator is closed early, the thread stops at the next sample.
+        """
+        stop = threading.Event()
+        failure = []
+
+        def pump():
+            try:
+                for item in source:
+                    if stop.is_set():
+                        break
+                    self._slot.put(_as_sample(item))
+            except Exception as error:
+                failure.append(error)
+            finally:
+                self._slot.close()
+
+        threading.Thread(target=pump, name="marshall-stream-source", daemon=True).start()
+
+        next_due = time.monotonic()
+        try:
+            while True:
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                taken = self._slot.take()
+                if taken is None:
+                    if failure:
+                        raise failure[0]
+                    return
+                frame = self._render(*taken)
+                if frame is not None:
+                    # Never accumulate frame debt: when behind, the next tick is one period from now
+                    next_due = max(next_due + self.period, time.monotonic())
+                    yield frame
+        finally:
+            stop.set()
+
+    async def aframes(self, source: AsyncIterable[SourceItem]) -> AsyncIterator[StreamFrame]:
+        """
+        Render frames from an asyncio stream of samples.
+
+        Rendering runs in the default executor so the event loop stays responsive.
+        """
+        loop = asyncio.get_running_loop()
+        arrived = asyncio.Event()
+
+        async def pump():
+            try:
+                async for item in source:
+                    self._slot.put(_as_sample(item))
+                    arrived.set()
+            finally:
+                self._slot.close()
+                arrived.set()
+
+        pump_task = asyncio.create_task(pump())
+        next_due = loop.time()
+        try:
+            while True:
+                delay = next_due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                taken = self._slot.take_nowait()
+                if taken is None:
+                    if self._slot.closed:
+                        # Raises the source's error, if it failed
+                        await pump_task
+                        return
+                    arrived.clear()
+                    if not self._slot.pending and not self._slot.closed:
+                        await arrived.wait()
+                    continue
+                frame = await loop.run_in_executor(None, self._render, *taken)
+                if frame is not None:
+                    next_due = max(next_due + self.period, loop.time())
+                    yield frame
+        finally:
+            pump_task.cancel()
+
+
+def _read_json_lines(stream) -> Iterator[StateSample]:
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        yield StateSample(timestamp=float(record.get('timestamp', time.time())),
+                          state={key: float(record.get(key, 1.0)) for key in ['r', 'g', 'b']})
+
+
+def main(argv=None):
+    """Render JSON-lines states from stdin to an image file that a dashboard can poll."""
+    parser = argparse.ArgumentParser(description="Stream Marshall Triangle frames from JSON-lines states on stdin.")
+    parser.add_argument("--output", default="live_triangle.png", help="Image file rewritten on every frame")
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--fps", type=float, default=5.0)
+    parser.add_argument("--quantum", type=float, default=0.01)
+    args = parser.parse_args(argv)
+
+    streamer = StreamingRenderer(HarmonyIndex(size=args.size), target_fps=args.fps, quantum=args.quantum)
+    for frame in streamer.frames(_read_json_lines(sys.stdin)):
+        tmp_path = f"{args.output}.tmp"
+        frame.image.save(tmp_path, format='PNG')
+        os.replace(tmp_path, args.output)
+        stats = streamer.stats
+        print(f"frame {frame.sequence}: latency {frame.latency * 1000:.1f} ms, "
+              f"received {stats.received}, coalesced {stats.coalesced}, unchanged {stats.skipped_unchanged}",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
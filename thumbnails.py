@@ -0,0 +1,191 @@
+"""
+Marshall Triangle Thumbnail Pipeline
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+"""
+
+import hashlib
+import io
+import math
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, features
+
+THUMBNAIL_SIZE = 100
+
+# Sprite sheets are written here and served by Streamlit's static file serving
+# (see .streamlit/config.toml) under app/static/gallery/<digest>.<ext>
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+GALLERY_DIR = os.path.join(STATIC_DIR, 'gallery')
+GALLERY_URL = 'app/static/gallery'
+# Sheets kept in GALLERY_DIR; publishing beyond this removes the least recently published
+GALLERY_MAX_SHEETS = 256
+
+
+@dataclass(frozen=True)
+class SpriteSheet:
+    """A packed gallery image plus the offset of every tile inside it."""
+    data: bytes
+    digest: str
+    extension: str
+    tile_size: int
+    positions: Tuple[Tuple[int, int], ...]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.digest}.{self.extension}"
+
+    @property
+    def url(self) -> str:
+        return f"{GALLERY_URL}/{self.filename}"
+
+
+def downsample(img: Image.Image, size: int = THUMBNAIL_SIZE) -> Image.Image:
+    """
+    Downsample an already-rendered Marshall Triangle to thumbnail size.
+
+    Parameters:
+    -----------
+    img : PIL.Image.Image
+        A full-size rendering (square)
+    size : int
+        Edge length of the thumbnail in pixels
+
+    Returns:
+    --------
+    PIL.Image.Image
+        The thumbnail image
+    """
+    if img.size == (size, size):
+        return img.copy()
+    # reducing_gap lets PIL do a cheap box pre-reduction before the Lanczos pass
+    return img.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def encode_thumbnail(img: Image.Image) -> bytes:
+    """Encode a thumbnail as PNG bytes for storage alongside a saved state or preset."""
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def _sheet_format() -> Tuple[str, str, Dict]:
+    """Pick the sprite sheet codec, preferring WebP when PIL was built with it."""
+    if features.check('webp'):
+        return 'WEBP', 'webp', {'quality': 90, 'method': 4}
+    return 'PNG', 'png', {}
+
+
+def build_sprite_sheet(thumbnails: List[Optional[bytes]], tile_size: int = THUMBNAIL_SIZE) -> Optional[SpriteSheet]:
+    """
+    Pack a gallery of thumbnails into a single image with a content hash.
+
+    Parameters:
+    -----------
+    thumbnails : List[Optional[bytes]]
+        Encoded thumbnails in gallery order; None entries keep their slot empty
+    tile_size : int
+        Edge length of each tile in the sheet
+
+    Returns:
+    --------
+    SpriteSheet or None
+        The packed sheet, or None if there are no thumbnails to pack
+    """
+    if not any(thumbnails):
+        return None
+
+    columns = max(1, math.ceil(math.sqrt(len(thumbnails))))
+    rows = math.ceil(len(thumbnails) / columns)
+    sheet = Image.new('RGB', (columns * tile_size, rows * tile_size), (0, 0, 0))
+
+    positions = []
+    for index, data in enumerate(thumbnails):
+        x, y = (index % columns) * tile_size, (index // columns) * tile_size
+        positions.append((x, y))
+        if not data:
+            continue
+        with Image.open(io.BytesIO(data)) as tile:
+            tile = tile.convert('RGB')
+            if tile.size != (tile_size, tile_size):
+                tile = downsample(tile, tile_size)
+            sheet.paste(tile, (x, y))
+
+    image_format, extension, options = _sheet_format()
+    buf = io.BytesIO()
+    sheet.save(buf, format=image_format, **options)
+    data = buf.getvalue()
+
+    return SpriteSheet(
+        data=data,
+        digest=hashlib.sha256(data).hexdigest()[:16],
+        extension=extension,
+        tile_size=tile_size,
+        positions=tuple(positions)
+    )
+
+
+def publish_sprite_sheet(sheet: SpriteSheet) -> str:
+    """
+    Write a sprite sheet into the static gallery directory and return its URL.
+
+    Files are content-addressed, so an unchanged gallery maps to the same URL
+    and the browser serves it from cache on every rerun. Publish on every
+    rerun that shows the sheet: that marks it recently used, and rewrites it
+    if it was pruned.
+    """
+    path = os.path.join(GALLERY_DIR, sheet.filename)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        os.makedirs(GALLERY_DIR, exist_ok=True)
+        # Unique per thread: sessions are threads of one process and may publish the same sheet at once
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(sheet.data)
+        os.replace(tmp_path, path)
+        prune_gallery()
+    return sheet.url
+
+
+def prune_gallery(max_sheets: int = GALLERY_MAX_SHEETS) -> int:
+    """Remove the least recently published sheets beyond max_sheets; returns how many were removed."""
+    sheets = []
+    for entry in os.scandir(GALLERY_DIR):
+        if entry.is_file() and not entry.name.endswith('.tmp'):
+            try:
+                sheets.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    removed = 0
+    for _, path in sorted(sheets)[:max(0, len(sheets) - max_sheets)]:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            # Another session pruned it first
+            continue
+    return removed
+
+
+def sprite_tile_html(sheet: SpriteSheet, index: int, url: str) -> str:
+    """HTML for a single gallery tile that shows its slice of the sprite sheet."""
+    x, y = sheet.positions[index]
+    return (
+        f"<div style='width: {sheet.tile_size}px; height: {sheet.tile_size}px; margin: 0 auto; "
+        f"background: url({url}) -{x}px -{y}px no-repeat;'></div>"
+    )
@@ -0,0 +1,385 @@
+"""
+Marshall Triangle Deep-Zoom Tile Server
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+
+The renderer's [-1, 1] square is a tile pyramid: zoom level z has 2^z x 2^z
+tiles of TILE_SIZE pixels, numbered x rightwards and y downwards from the top
+left (the usual z/x/y scheme). Tiles are evaluated directly from the
+continuous colour model, so the cost of a view depends on the viewport, not
+on the effective image size (256 * 2^z pixels).
+
+Configuration (environment):
+    MARSHALL_TILE_DIR       Disk tile cache directory (default: tiles/ next to this file)
+    MARSHALL_TILE_CACHE_MB  In-memory tile cache budget (default 64)
+    MARSHALL_TILE_DISK_MB   Disk tile cache budget (default 512)
+    MARSHALL_TILE_DISK_KEYS Tile pyramids kept on disk (default 1024)
+    MARSHALL_TILE_PORT      Serve /tiles/<key>/<z>/<x>/<y>.png on this local port
+"""
+
+import io
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from harmony_index import HarmonyIndex
+from image_output import EncodeOptions, encode_image
+from render_spec import RenderSpec
+
+TILE_SIZE = 256
+MAX_ZOOM = 16
+
+DEFAULT_TILE_DIR = os.environ.get(
+    'MARSHALL_TILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tiles'))
+
+# Tiles favour encode speed; they are small and mostly smooth
+TILE_ENCODING = EncodeOptions(codec='png', level=1)
+
+_TILE_PATH = re.compile(r'^/tiles/([0-9a-f]{16})/(\d+)/(\d+)/(\d+)\.png$')
+
+
+def tile_spec(spec: RenderSpec) -> RenderSpec:
+    """
+    The spec a tile pyramid is keyed on: only the colour model's inputs.
+
+    Size, edge blur and edge factor are raster settings of a full rendering
+    and do not apply to tiles, so they are fixed.
+    """
+    return spec.replace(size=TILE_SIZE, edge_blur=0.0, edge_factor=0.5)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(left, bottom, right, top) of a tile in the renderer's [-1, 1] space (y up)."""
+    span = 2.0 / (1 << z)
+    return -1.0 + x * span, 1.0 - (y + 1) * span, -1.0 + (x + 1) * span, 1.0 - y * span
+
+
+def _check_tile(z: int, x: int, y: int):
+    if not 0 <= z <= MAX_ZOOM:
+        raise ValueError(f"Zoom {z} is outside 0-{MAX_ZOOM}")
+    if not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        raise ValueError(f"Tile {x}/{y} does not exist at zoom {z}")
+
+
+def render_tile(spec: RenderSpec, z: int, x: int, y: int) -> np.ndarray:
+    """
+    Evaluate one tile from the colour model (HarmonyIndex.query_colors).
+
+    Pixels are sampled at their centres; raster post-processing (edge blur)
+    is not applied at tile scale.
+
+    Returns:
+    --------
+    numpy.ndarray
+        (TILE_SIZE, TILE_SIZE, 3) uint8
+    """
+    _check_tile(z, x, y)
+    harmony = HarmonyIndex.from_spec(spec)
+    left, bottom, right, top = tile_bounds(z, x, y)
+    vertices = np.array(harmony._define_triangle())
+    if (right < vertices[:, 0].min() or left > vertices[:, 0].max() or
+            top < vertices[:, 1].min() or bottom > vertices[:, 1].max()):
+        return np.zeros((TILE_SIZE, TILE_SIZE, 3), dtype=np.uint8)
+
+    offsets = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    xs = left + offsets * (right - left)
+    ys = top - offsets * (top - bottom)
+    xg, yg = np.meshgrid(xs, ys)
+    return harmony.query_colors(xg, yg, spec.harmony_state, spec.falloff_type, as_uint8=True)
+
+
+class TileCache:
+    """
+    Encoded tiles in a byte-bounded in-memory LRU backed by a byte-bounded disk cache.
+
+    Disk tiles live at <directory>/<key>/<z>/<x>/<y>.png next to the
+    pyramid's <key>/spec.json. A key directory is the unit of disk eviction:
+    when the byte budget or the key count is exceeded, the least recently
+    used directories (by the newest modification time inside, refreshed on
+    every disk hit and registration) are removed whole.
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_TILE_DIR, memory_bytes: int = 64 << 20,
+                 disk_bytes: int = 512 << 20, disk_keys: int = 1024):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.disk_keys = disk_keys
+        self._memory: OrderedDict = OrderedDict()
+        self._memory_used = 0
+        self._disk_used: Optional[int] = None
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    def _path(self, key: str, z: int, x: int, y: int) -> str:
+        return os.path.join(self.directory, key, str(z), str(x), f"{y}.png")
+
+    def get(self, key: str, z: int, x: int, y: int) -> Optional[bytes]:
+        tile = (key, z, x, y)
+        with self._lock:
+            data = self._memory.get(tile)
+            if data is not None:
+                self._memory.move_to_end(tile)
+                self.stats['memory_hits'] += 1
+                return data
+        if self.directory is not None:
+            path = self._path(*tile)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                data = None
+            if data is not None:
+                self._remember(tile, data)
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                return data
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, key: str, z: int, x: int, y: int, data: bytes, persist: bool = True):
+        self._remember((key, z, x, y), data)
+        if self.directory is None or not persist:
+            return
+        self._write(key, self._path(key, z, x, y), data)
+
+    def get_spec(self, key: str) -> Optional[Dict]:
+        """The spec document stored with a key's pyramid on disk, if any."""
+        if self.directory is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, key, 'spec.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_spec(self, key: str, document: Dict):
+        """Store the spec document of a key's pyramid, or mark it recently used if it is already stored."""
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, key, 'spec.json')
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._write(key, path, json.dumps(document).encode('utf-8'))
+
+    def _write(self, key: str, path: str, data: bytes):
+        # Disk is a cache: a write that fails (say, into a directory pruned meanwhile) only loses the disk copy
+        new_key = not os.path.isdir(os.path.join(self.directory, key))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_used is None:
+                self._disk_used = self._scan_disk()
+            else:
+                self._disk_used += len(data)
+            over_budget = self._disk_used > self.disk_bytes
+        if over_budget or (new_key and len(os.listdir(self.directory)) > self.disk_keys):
+            self._prune_disk()
+
+    def _remember(self, tile, data: bytes):
+        with self._lock:
+            previous = self._memory.pop(tile, None)
+            if previous is not None:
+                self._memory_used -= len(previous)
+            self._memory[tile] = data
+            self._memory_used += len(data)
+            while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted)
+
+    def _disk_keys(self):
+        # (last used, bytes, path) of every key directory: its newest modification time and total size
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.is_dir()]
+        except OSError:
+            return
+        for entry in entries:
+            newest, size = 0.0, 0
+            for root, _, names in os.walk(entry.path):
+                for name in names:
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    newest = max(newest, stat.st_mtime)
+                    size += stat.st_size
+            yield newest, size, entry.path
+
+    def _scan_disk(self) -> int:
+        return sum(size for _, size, _ in self._disk_keys())
+
+    def _prune_disk(self):
+        # Remove least recently used key directories, spec and tiles together, until the cache is
+        # at 90% of its byte budget and within its key count
+        keys = sorted(self._disk_keys())
+        used = sum(size for _, size, _ in keys)
+        remaining = len(keys)
+        for _, size, path in keys:
+            if used <= self.disk_bytes * 0.9 and remaining <= self.disk_keys:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            used -= size
+            remaining -= 1
+        with self._lock:
+            self._disk_used = used
+
+
+class TileServer:
+    """
+    Tile pyramids for registered specs, rendered on demand through a TileCache.
+
+    Parameters:
+    -----------
+    cache : TileCache, optional
+        Where tiles are kept; defaults to one configured from the environment
+    """
+
+    def __init__(self, cache: Optional[TileCache] = None):
+        self.cache = cache or TileCache(
+            memory_bytes=int(float(os.environ.get('MARSHALL_TILE_CACHE_MB', 64)) * (1 << 20)),
+            disk_bytes=int(float(os.environ.get('MARSHALL_TILE_DISK_MB', 512)) * (1 << 20)),
+            disk_keys=int(os.environ.get('MARSHALL_TILE_DISK_KEYS', 1024)))
+        self._specs: Dict[str, RenderSpec] = {}
+        self._lock = threading.Lock()
+        self._blank: Optional[bytes] = None
+
+    def register(self, spec: RenderSpec) -> str:
+        """Make a spec's pyramid servable; returns its key (stable across processes)."""
+        spec = tile_spec(spec)
+        with self._lock:
+            self._specs[spec.key] = spec
+        self.cache.put_spec(spec.key, {'params': spec.to_params(), 'state': spec.harmony_state,
+                                       'calibration': spec.calibrated_white_point})
+        return spec.key
+
+    def spec_for(self, key: str) -> Optional[RenderSpec]:
+        """The registered spec for a key, also found on disk after a restart."""
+        with self._lock:
+            spec = self._specs.get(key)
+        if spec is None:
+            data = self.cache.get_spec(key)
+            if data is None:
+                return None
+            spec = tile_spec(RenderSpec.from_params(data['params'], data['state'], data['calibration']))
+            if spec.key != key:
+                return None
+            with self._lock:
+                self._specs[key] = spec
+        return spec
+
+    def tile(self, key: str, z: int, x: int, y: int) -> bytes:
+        """
+        PNG bytes of one tile.
+
+        Raises:
+        -------
+        KeyError
+            If the key is not registered
+        ValueError
+            If the tile is outside the pyramid
+        """
+        _check_tile(z, x, y)
+        data = self.cache.get(key, z, x, y)
+        if data is not None:
+            return data
+        spec = self.spec_for(key)
+        if spec is None:
+            raise KeyError(f"No tile pyramid registered for '{key}'")
+        pixels = render_tile(spec, z, x, y)
+        if not pixels.any():
+            # Tiles off the triangle are all black: one shared encoding, remembered but not written to disk
+            if self._blank is None:
+                self._blank = encode_image(Image.fromarray(pixels), TILE_ENCODING).data
+            self.cache.put(key, z, x, y, self._blank, persist=False)
+            return self._blank
+        data = encode_image(Image.fromarray(pixels), TILE_ENCODING).data
+        self.cache.put(key, z, x, y, data)
+        return data
+
+    def viewport(self, key: str, z: int, center: Tuple[float, float], width: int = 512,
+                 height: int = 512) -> Image.Image:
+        """
+        Compose a width x height view at zoom z centred on a point of the [-1, 1] space.
+
+        Only the (at most ceil(width / 256) + 1) x (ceil(height / 256) + 1)
+        tiles under the view are read or rendered; area outside the pyramid
+        is black.
+        """
+        _check_tile(z, 0, 0)
+        tiles = 1 << z
+        extent = TILE_SIZE * tiles
+        left = int(round((center[0] + 1) / 2 * extent - width / 2))
+        top = int(round((1 - center[1]) / 2 * extent - height / 2))
+
+        view = Image.new('RGB', (width, height))
+        for ty in range(math.floor(top / TILE_SIZE), math.floor((top + height - 1) / TILE_SIZE) + 1):
+            for tx in range(math.floor(left / TILE_SIZE), math.floor((left + width - 1) / TILE_SIZE) + 1):
+                if not (0 <= tx < tiles and 0 <= ty < tiles):
+                    continue
+                with Image.open(io.BytesIO(self.tile(key, z, tx, ty))) as tile:
+                    view.paste(tile.convert('RGB'), (tx * TILE_SIZE - left, ty * TILE_SIZE - top))
+        return view
+
+
+class _TileHandler(BaseHTTPRequestHandler):
+    server_tiles: TileServer = None
+
+    def do_GET(self):
+        match = _TILE_PATH.match(self.path.split('?')[0])
+        if match is None:
+            self.send_error(404)
+            return
+        key, z, x, y = match.group(1), *(int(value) for value in match.groups()[1:])
+        try:
+            body = self.server_tiles.tile(key, z, x, y)
+        except (KeyError, ValueError) as e:
+            self.send_error(404, str(e))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        # A key names an immutable pyramid, so tiles never change
+        self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(tiles: TileServer, port: int, address: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve tiles at http://address:port/tiles/<key>/<z>/<x>/<y>.png on a daemon thread."""
+    handler = type('TileHandler', (_TileHandler,), {'server_tiles': tiles})
+    server = ThreadingHTTPServer((address, port), handler)
+    threading.Thread(target=server.serve_forever, name="marshall-tiles-http", daemon=True).start()
+    return server
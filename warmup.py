@@ -0,0 +1,234 @@
+"""
+Marshall Triangle Warm-Start Cache Priming
+
+Author: Paul W. Marshall
+Entity: Fidelitas LLC – Series 1
+Year: 2026
+
+License Summary:
+- Source code: MIT License (see LICENSE-MIT)
+- Generated figures/visual outputs: CC BY-NC 4.0 (see LICENSE-CC-BY-NC-4.0)
+- Conceptual framework (Marshall Triangle, sovereign perceptual geometry):
+  All Rights Reserved, governed via Story Protocol
+  Minted asset: marshall_triangle-v1-sovereign
+
+Repository: https://github.com/Paul-W-Marshall/marshall-triangle
+
+Usage (measure cold-start cost outside the server):
+    python warmup.py
+    python warmup.py --manifest my_manifest.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from render_spec import RenderSpec
+
+DEFAULT_MANIFEST_PATH = os.environ.get(
+    'MARSHALL_WARMUP_MANIFEST',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warmup_manifest.json')
+)
+
+# Imported in this order; matplotlib and scipy dominate a cold import
+RENDERING_STACK = ('numpy', 'scipy.ndimage', 'PIL.Image', 'PIL.ImageFilter', 'matplotlib.figure',
+                   'matplotlib.backends.backend_agg', 'render_spec', 'image_output', 'source_engine',
+                   'harmony_index', 'render_pipeline', 'thumbnails')
+
+
+@dataclass(frozen=True)
+class WarmupManifest:
+    """
+    What to prime at process start.
+
+    Attributes:
+    -----------
+    specs : Tuple[RenderSpec, ...]
+        Export specs, in priority order
+    layouts : Tuple[str, ...]
+        Page layouts whose on-screen size is primed for every spec
+    encodings : Tuple[str, ...]
+        Output encoding presets to encode each primed rendering with
+    geometry_sizes : Tuple[int, ...]
+        Extra sizes whose triangle geometry is precomputed (spec sizes are always included)
+    background : bool
+        Whether the app runs warm-up on a background thread
+    """
+    specs: Tuple[RenderSpec, ...] = ()
+    layouts: Tuple[str, ...] = ('centered',)
+    encodings: Tuple[str, ...] = ()
+    geometry_sizes: Tuple[int, ...] = ()
+    background: bool = True
+
+
+@dataclass
+class WarmupReport:
+    """Timings of one warm-up run, in seconds."""
+    import_seconds: float = 0.0
+    geometry_seconds: float = 0.0
+    renders: List[Tuple[str, float]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    total_seconds: float = 0.0
+
+    def summary(self) -> str:
+        render_seconds = sum(seconds for _, seconds in self.renders)
+        text = (f"warm-up {self.total_seconds:.2f} s (imports {self.import_seconds:.2f} s, "
+                f"geometry {self.geometry_seconds:.2f} s, {len(self.renders)} renders {render_seconds:.2f} s)")
+        if self.errors:
+            text += f", {len(self.errors)} error(s): {'; '.join(self.errors)}"
+        return text
+
+
+def load_manifest(path: str = DEFAULT_MANIFEST_PATH) -> WarmupManifest:
+    """
+    Load a warm-up manifest, or an empty one if the file does not exist.
+
+    Each entry of 'specs' holds rendering params as presets store them, plus
+    optional 'state' and 'calibration' dicts.
+    """
+    if not os.path.exists(path):
+        return WarmupManifest()
+    with open(path) as f:
+        data = json.load(f)
+    return WarmupManifest(
+        specs=tuple(RenderSpec.from_params(entry, entry.get('state'), entry.get('calibration'))
+                    for entry in data.get('specs', [])),
+        layouts=tuple(data.get('layouts', ('centered',))),
+        encodings=tuple(data.get('encodings', ())),
+        geometry_sizes=tuple(int(size) for size in data.get('geometry_sizes', ())),
+        background=bool(data.get('background', True))
+    )
+
+
+def preimport_rendering_stack(modules=RENDERING_STACK) -> float:
+    """Import the rendering stack so the first session does not pay for it; returns seconds spent."""
+    start = time.perf_counter()
+    for name in modules:
+        importlib.import_module(name)
+    return time.perf_counter() - start
+
+
+def run_warmup(manifest: WarmupManifest, render: Callable[[RenderSpec], object],
+               encode: Optional[Callable[[RenderSpec, str], object]] = None,
+               resolve: Optional[Callable[[RenderSpec, str], RenderSpec]] = None) -> WarmupReport:
+    """
+    Prime imports, geometry and renderings listed in a manifest.
+
+    Parameters:
+    -----------
+    manifest : WarmupManifest
+        What to prime
+    render : Callable[[RenderSpec], object]
+        Renders a spec; the app passes its cached render so the cache is filled
+    encode : Callable[[RenderSpec, str], object], optional
+        Encodes a spec with an encoding preset name, for each of manifest.encodings
+    resolve : Callable[[RenderSpec, str], RenderSpec], optional
+        Maps an export spec and layout to the spec actually rendered on screen
+        (display size, adaptive sigma); defaults to the export spec itself
+
+    Returns:
+    --------
+    WarmupReport
+        Timings; failures are recorded rather than raised
+    """
+    start = time.perf_counter()
+    report = WarmupReport(import_seconds=preimport_rendering_stack())
+
+    from harmony_index import triangle_geometry
+
+    specs: List[RenderSpec] = []
+    for spec in manifest.specs:
+        for layout in manifest.layouts or ('centered',):
+            resolved = resolve(spec, layout) if resolve is not None else spec
+            if resolved not in specs:
+                specs.append(resolved)
+
+    geometry_start = time.perf_counter()
+    for size in dict.fromkeys([spec.size for spec in specs] + list(manifest.geometry_sizes)):
+        triangle_geometry(size)
+    report.geometry_seconds = time.perf_counter() - geometry_start
+
+    for spec in specs:
+        label = f"{spec.size}px {spec.falloff_type} {spec.key}"
+        render_start = time.perf_counter()
+        try:
+            render(spec)
+            for encoding in (manifest.encodings if encode is not None else ()):
+                encode(spec, encoding)
+        except Exception as e:
+            report.errors.append(f"{label}: {e}")
+            continue
+        report.renders.append((label, time.perf_counter() - render_start))
+
+    report.total_seconds = time.perf_counter() - start
+    return report
+
+
+class WarmupHandle:
+    """A warm-up running on a background thread; report is set once it finishes."""
+
+    def __init__(self, thread: threading.Thread):
+        self.thread = thread
+        self.report: Optional[WarmupReport] = None
+
+    @property
+    def done(self) -> bool:
+        return self.report is not None
+
+
+def start_background_warmup(manifest: WarmupManifest, render: Callable[[RenderSpec], object],
+                            encode: Optional[Callable[[RenderSpec, str], object]] = None,
+                            resolve: Optional[Callable[[RenderSpec, str], RenderSpec]] = None,
+                            prepare_thread: Optional[Callable[[threading.Thread], None]] = None) -> WarmupHandle:
+    """
+    Run run_warmup on a daemon thread and log its summary to stderr when done.
+
+    prepare_thread is called with the thread before it starts (the app uses it
+    to attach its script run context, so cached functions can be called).
+    """
+    def work():
+        handle.report = run_warmup(manifest, render, encode=encode, resolve=resolve)
+        print(f"Marshall Triangle {handle.report.summary()}", file=sys.stderr)
+
+    thread = threading.Thread(target=work, name="marshall-warmup", daemon=True)
+    handle = WarmupHandle(thread)
+    if prepare_thread is not None:
+        prepare_thread(thread)
+    thread.start()
+    return handle
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the warm-up manifest in a fresh process and report timings.")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH)
+    parser.add_argument("--engine", choices=['reference', 'matrix', 'pipeline', 'adaptive'], default='pipeline',
+                        help="Render engine, as the app uses")
+    args = parser.parse_args(argv)
+
+    renders: Dict[str, object] = {}
+
+    # Imported lazily so the report includes the cold import of the rendering stack
+    def render(spec: RenderSpec):
+        from harmony_index import HarmonyIndex
+        renders[spec.key] = HarmonyIndex.from_spec(spec).render(spec=spec, engine=args.engine)
+        return renders[spec.key]
+
+    def encode(spec: RenderSpec, encoding: str):
+        from image_output import PRESETS, encode_image
+        return encode_image(renders[spec.key], PRESETS[encoding])
+
+    report = run_warmup(load_manifest(args.manifest), render, encode=encode)
+    for label, seconds in report.renders:
+        print(f"{label}: {seconds:.2f} s")
+    print(report.summary())
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())